@@ -0,0 +1,250 @@
+"""
+Admission Control for ClarityOS
+Bounded, prioritised, deadline-aware access to an upstream (the NIM API).
+
+- At most `limit` calls are in flight; the rest wait in a priority queue,
+  finalization turns ahead of gathering turns ahead of batch work.
+- A call that cannot start in time to meet its deadline is rejected at
+  once with Overloaded (-> 503 + Retry-After) instead of queueing until
+  it times out. When the queue is full, the lowest-priority waiter is
+  shed to make room for a more important call.
+- The limit adapts to observed upstream latency (AIMD): it creeps up
+  while the upstream keeps up, and is cut when recent latency climbs well
+  above the usual level or calls fail upstream (timeouts, 429, 5xx).
+  Latency is compared per output token, since a long answer is slow
+  without the upstream being congested, and only successful calls are
+  sampled.
+"""
+import math
+import time
+import heapq
+import asyncio
+import itertools
+from collections import deque
+from statistics import median
+from contextlib import asynccontextmanager
+import metrics
+
+# Priorities: lower is served first
+FINALIZE = 0    # the turn that produces / confirms the document
+REVIEW = 1      # turns while the user reviews the draft pack
+GATHER = 2      # early information-gathering turns, one-off scribe calls
+BATCH = 3       # offline work (scribe batches)
+
+PRIORITY_NAMES = {FINALIZE: "finalize", REVIEW: "review", GATHER: "gather", BATCH: "batch"}
+
+# Latency is normalised per (output tokens + this allowance for the prompt
+# and time to first token), so short answers aren't judged per token alone
+PREFILL_TOKENS = 20
+# Samples before the baseline is trusted for decreases
+MIN_SAMPLES = 20
+
+admission_rejected = metrics.Counter(
+    "clarity_admission_rejected_total", "Upstream calls refused by admission control", ("upstream", "priority", "reason")
+)
+
+
+class Overloaded(Exception):
+    """The upstream is saturated; retry after `retry_after` seconds."""
+
+    def __init__(self, reason: str, retry_after: float):
+        super().__init__(f"Upstream overloaded ({reason})")
+        self.reason = reason
+        self.retry_after = max(1, min(60, math.ceil(retry_after)))
+
+
+class UpstreamCall:
+    """Handle yielded by AdmissionController.slot(); set `output_tokens` once known."""
+    __slots__ = ("output_tokens",)
+
+    def __init__(self):
+        self.output_tokens = None
+
+
+class AdmissionController:
+    def __init__(self, name: str, max_limit: int, min_limit: int = 2, max_queue: int = 256,
+                 latency_tolerance: float = 2.0, window: int = 500):
+        self.name = name
+        self.max_limit = max_limit
+        self.min_limit = min(min_limit, max_limit)
+        self.max_queue = max_queue
+        self.latency_tolerance = latency_tolerance
+        self.limit = float(max_limit)
+        self.in_flight = 0
+        self._queue = []  # heap of [priority, seq, future]
+        self._seq = itertools.count()
+        self._samples = deque(maxlen=window)  # seconds per token of recent successful calls
+        self._recent = None  # short EWMA of the same
+        self._service_time = None  # EWMA of call latency (seconds)
+        self._waits = {}  # priority -> EWMA of time spent queued (seconds)
+        self._last_decrease = 0.0
+        metrics.register_collector(self._collect_metrics)
+
+    # --- ESTIMATES ---
+
+    def expected_service(self) -> float:
+        return self._service_time if self._service_time is not None else 1.0
+
+    def expected_wait(self, priority: int) -> float:
+        """
+        Rough queueing delay for a new call: waiters ahead / limit * service
+        time, or what calls of this priority recently waited if that is
+        longer (more important calls keep jumping ahead of it).
+        """
+        if self.in_flight < int(self.limit) and not self._queue:
+            return 0.0
+        ahead = sum(1 for p, _, f in self._queue if p <= priority and not f.done())
+        return max((ahead + 1) / max(int(self.limit), 1) * self.expected_service(), self._waits.get(priority, 0.0))
+
+    def _note_wait(self, priority: int, waited: float):
+        previous = self._waits.get(priority)
+        self._waits[priority] = waited if previous is None else 0.8 * previous + 0.2 * waited
+
+    # --- ADMISSION ---
+
+    @asynccontextmanager
+    async def slot(self, priority: int = GATHER, deadline: float = None):
+        """
+        Hold one upstream slot for the duration of the block; yields an
+        UpstreamCall. `deadline` is a time.monotonic() value the call must
+        finish by. Raises Overloaded if it can't be admitted in time.
+        """
+        await self.acquire(priority, deadline)
+        call = UpstreamCall()
+        started = time.monotonic()
+        latency, ok = None, True  # no sample if the caller goes away mid-call
+        try:
+            yield call
+            latency = time.monotonic() - started
+        except Exception as e:
+            # Upstream trouble is a congestion signal; anything else (e.g. a
+            # bad request) says nothing about the upstream and is not sampled
+            if _is_upstream_failure(e):
+                ok = False
+            raise
+        finally:
+            self.release(latency, ok, call.output_tokens)
+
+    async def acquire(self, priority: int = GATHER, deadline: float = None):
+        queued_at = time.monotonic()
+        if self.in_flight < int(self.limit) and not self._queue:
+            self.in_flight += 1
+            self._note_wait(priority, 0.0)
+            return
+
+        if deadline is not None:
+            budget = deadline - time.monotonic() - self.expected_service()
+            if self.expected_wait(priority) > budget:
+                self._reject(priority, "deadline", self.expected_wait(priority))
+
+        if len(self._queue) >= self.max_queue:
+            worst = max((e for e in self._queue if not e[2].done()), key=lambda e: (e[0], e[1]), default=None)
+            if worst is None or worst[0] <= priority:
+                self._reject(priority, "queue_full", self.expected_wait(priority))
+            # Shed the least important waiter to make room
+            admission_rejected.inc(upstream=self.name, priority=PRIORITY_NAMES.get(worst[0], worst[0]), reason="shed")
+            worst[2].set_exception(Overloaded("shed", self.expected_wait(worst[0])))
+            self._queue.remove(worst)
+            heapq.heapify(self._queue)
+
+        future = asyncio.get_running_loop().create_future()
+        entry = [priority, next(self._seq), future]
+        heapq.heappush(self._queue, entry)
+        timeout = None if deadline is None else max(deadline - time.monotonic() - self.expected_service(), 0)
+        try:
+            await asyncio.wait_for(asyncio.shield(future), timeout)
+        except asyncio.TimeoutError:
+            self._abandon(entry)
+            # It would have waited longer still: don't average this one down
+            self._waits[priority] = max(self._waits.get(priority, 0.0), time.monotonic() - queued_at)
+            self._reject(priority, "deadline", self.expected_wait(priority))
+        except asyncio.CancelledError:
+            self._abandon(entry)
+            raise
+        waited = time.monotonic() - queued_at
+        self._note_wait(priority, waited)
+        metrics.observe_stage("llm_queue", waited)
+
+    def _abandon(self, entry: list):
+        """A waiter gave up; if it was granted a slot meanwhile, hand it on."""
+        future = entry[2]
+        if entry in self._queue:
+            self._queue.remove(entry)
+            heapq.heapify(self._queue)
+        if future.done() and not future.cancelled() and future.exception() is None:
+            self.release()
+        elif not future.done():
+            future.cancel()
+
+    def _reject(self, priority: int, reason: str, retry_after: float):
+        admission_rejected.inc(upstream=self.name, priority=PRIORITY_NAMES.get(priority, priority), reason=reason)
+        raise Overloaded(reason, retry_after)
+
+    def release(self, latency: float = None, ok: bool = True, output_tokens: int = None):
+        """Free a slot, feed the call's outcome to the limiter, wake the next waiter."""
+        self.in_flight -= 1
+        if latency is not None or not ok:
+            self._observe(latency, ok, output_tokens)
+        while self._queue and self.in_flight < int(self.limit):
+            _, _, future = heapq.heappop(self._queue)
+            if not future.done():
+                self.in_flight += 1
+                future.set_result(None)
+
+    # --- ADAPTIVE LIMIT ---
+
+    def baseline(self) -> float:
+        """Usual seconds per token: the median of the sample window."""
+        return median(self._samples) if self._samples else None
+
+    def _observe(self, latency: float, ok: bool, output_tokens: int = None):
+        now = time.monotonic()
+        congested = not ok
+        if ok:
+            sample = latency / ((output_tokens or 0) + PREFILL_TOKENS)
+            self._recent = sample if self._recent is None else 0.9 * self._recent + 0.1 * sample
+            self._service_time = latency if self._service_time is None else 0.8 * self._service_time + 0.2 * latency
+            congested = len(self._samples) >= MIN_SAMPLES and self._recent > self.baseline() * self.latency_tolerance
+            # Congested samples stay out of the baseline so it doesn't drift
+            # up under sustained overload; at the floor the upstream is just
+            # slower now, and that becomes the new normal
+            if not congested or self.limit <= self.min_limit:
+                self._samples.append(sample)
+        if congested:
+            # Multiplicative decrease, at most once per typical call duration
+            # so one slow burst doesn't collapse the limit
+            if now - self._last_decrease >= self.expected_service():
+                self.limit = max(self.min_limit, self.limit * 0.9)
+                self._last_decrease = now
+        elif self.in_flight + 1 >= int(self.limit):
+            # Additive increase, only while the limit is what holds calls back
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+
+    def stats(self) -> dict:
+        return {
+            "limit": int(self.limit),
+            "in_flight": self.in_flight,
+            "queued": sum(1 for _, _, f in self._queue if not f.done()),
+            "service_time_seconds": round(self.expected_service(), 3),
+            "baseline_seconds_per_token": round(self.baseline(), 5) if self._samples else None,
+            "recent_seconds_per_token": round(self._recent, 5) if self._recent is not None else None
+        }
+
+    def _collect_metrics(self) -> list:
+        stats = self.stats()
+        prefix = f"clarity_admission_{self.name}"
+        return [
+            (f"{prefix}_limit", "gauge", "Current adaptive concurrency limit", stats["limit"]),
+            (f"{prefix}_in_flight", "gauge", "Upstream calls in flight", stats["in_flight"]),
+            (f"{prefix}_queued", "gauge", "Calls waiting for a slot", stats["queued"]),
+        ]
+
+
+def _is_upstream_failure(error: Exception) -> bool:
+    """Timeouts, connection errors and 429/5xx responses."""
+    status = getattr(error, "status_code", None)
+    if status is not None:
+        return status == 429 or status >= 500
+    return isinstance(error, TimeoutError) or type(error).__name__ in (
+        "APITimeoutError", "APIConnectionError", "TimeoutException", "ConnectError"
+    )
@@ -1,17 +1,98 @@
 import os
 import json
+import time
+import asyncio
+from contextlib import asynccontextmanager
 from typing import List, Optional
-from fastapi import FastAPI, HTTPException, UploadFile, File
+from fastapi import FastAPI, HTTPException, Request
 from pydantic import BaseModel
 from fastapi.middleware.cors import CORSMiddleware
-from openai import OpenAI
-from file_processor import extract_text_from_file
+from fastapi.responses import StreamingResponse, FileResponse, PlainTextResponse, JSONResponse, Response
+import file_processor
+from file_processor import FileTooLargeError
+from extraction_cache import extraction_cache
 from dotenv import load_dotenv
+import llm_client
+from llm_client import MODEL_ID
+from admission import Overloaded, FINALIZE, REVIEW, GATHER
+from llm_cache import llm_cache
+from llm_parser import ReplyStreamExtractor, parse_llm_json, DIAGNOSIS_SCHEMA
+import session_scribe
+from session_store import create_store, new_session, new_session_id
+from catalog import mentor_catalog
+from mentor_cards import encode_payload
+from database import db
+from document_jobs import document_jobs
+from prompt_builder import build_prompt, log_prompt_stats, tokenizer_name
+import metrics
+from metrics import stage, MetricsMiddleware
+from structured_logging import get_logger
 
 # Load environment variables from .env.local
 load_dotenv('.env.local')
 
-app = FastAPI(title="ClarityOS API")
+logger = get_logger("backend")
+
+
+# --- STARTUP STATE ---
+# The server accepts connections immediately; /livez answers at once and
+# /readyz turns 200 when warm_up() has loaded the mentor catalog and built
+# the LLM and Neo4j clients, so the load balancer only routes traffic then.
+STARTUP = {"ready": False, "error": None, "started_at": time.time(), "ready_seconds": None, "parsers_warm": False}
+
+
+def load_dependencies():
+    """
+    Blocking part of the warm-up: mentor catalog + index, openai SDK and
+    client, prompt tokenizer, neo4j package. One thread, in sequence: imports are CPU-bound
+    and parallel threads only contend for the GIL and the import lock.
+    """
+    mentor_catalog.current()
+    llm_client.get_client()
+    tokenizer_name()  # tiktoken import + encoding load
+    import neo4j  # noqa: F401  (db.connect() below then only builds the driver)
+
+
+async def warm_up():
+    """Load everything the hot paths need, off the event loop."""
+    started = time.perf_counter()
+    try:
+        await asyncio.to_thread(load_dependencies)
+        await db.connect()
+    except Exception as e:
+        STARTUP["error"] = str(e)
+        logger.exception("Startup warm-up failed")
+        return
+    STARTUP["ready"] = True
+    STARTUP["ready_seconds"] = round(time.perf_counter() - started, 3)
+    logger.info("Ready", extra={
+        "model": MODEL_ID, "mentors_indexed": len(mentor_catalog), "tokenizer": tokenizer_name(),
+        "seconds": STARTUP["ready_seconds"]
+    })
+
+    # Parser imports in the extraction workers don't gate readiness
+    if not file_processor.EXTRACTION_PREWARM:
+        return
+    try:
+        await asyncio.to_thread(file_processor.prewarm)
+        STARTUP["parsers_warm"] = True
+    except Exception as e:
+        logger.warning("Extraction worker pre-warm failed", extra={"error": str(e)})
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    warm = asyncio.create_task(warm_up())
+    yield
+    warm.cancel()
+    # Release pooled upstream connections on shutdown
+    await llm_client.close()
+    await db.close()
+    file_processor.shutdown_pool()
+    document_jobs.shutdown()
+
+
+app = FastAPI(title="ClarityOS API", lifespan=lifespan)
 
 # Allow CORS for local testing/injection
 app.add_middleware(
@@ -21,25 +102,19 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# --- NVIDIA NIM CONFIGURATION ---
-NVIDIA_API_KEY = os.getenv("NVIDIA_API_KEY", "")
-NVIDIA_BASE_URL = os.getenv("NVIDIA_BASE_URL", "https://integrate.api.nvidia.com/v1")
-MODEL_ID = os.getenv("NVIDIA_MODEL_ID", "openai/gpt-oss-20b")
+# Request latency, per-stage timings (Server-Timing) and request ids
+app.add_middleware(MetricsMiddleware)
 
-client = OpenAI(
-    base_url=NVIDIA_BASE_URL,
-    api_key=NVIDIA_API_KEY
-)
+# --- ADMISSION ---
+# A chat turn must get its LLM answer within this many seconds, or it is
+# refused up front with 503 + Retry-After (see admission.py)
+CHAT_DEADLINE_SECONDS = float(os.getenv("CHAT_DEADLINE_SECONDS", "30"))
 
-print(f"Connected to NVIDIA NIM")
-print(f"Model Loaded: {MODEL_ID}")
+# --- SESSION STORE ---
+SESSIONS = create_store()
 
-# --- MOCK DB & CONFIG ---
-try:
-    with open("mentor_knowledge_base.json", "r") as f:
-        MENTOR_DB = json.load(f)
-except FileNotFoundError:
-    MENTOR_DB = [] # Fallback if scraper hasn't run
+# Uploads are also written as JSON under data_extracted_from_file_from_<name>/ here
+EXTRACTED_FILES_DIR = os.path.dirname(os.path.abspath(__file__))
 
 SYSTEM_PROMPT_DIAGNOSIS = """
 You are ClarityOS, an AI startup advisor. Your job is to gather enough information to create a comprehensive "Mentor Context Pack" document.
@@ -97,131 +172,314 @@ Finalize document when user says: "done", "looks good", "perfect", "that's fine"
 }
 """
 
-SYSTEM_PROMPT_SCRIBE = """
-You are the Session Scribe. 
-Extract 3 distinct Action Items from the transcript.
-Return JSON: {"action_plan": [{"task": "...", "why": "...", "due": "...", "metric": "..."}], "clarity_score": 0-100, "reason": "..."}
-"""
-
-
-
 # --- MODELS ---
 class ChatMessage(BaseModel):
     role: str
     content: str
 
 class ChatRequest(BaseModel):
-    history: List[ChatMessage]
+    # Legacy mode: the widget sends the full history every turn
+    history: List[ChatMessage] = []
     file_context: Optional[str] = None
+    # Session mode: only the new message; history lives server-side
+    session_id: Optional[str] = None
+    message: Optional[str] = None
 
 class AnalysisRequest(BaseModel):
     transcript: str
 
 
 # --- HELPER FUNCTIONS ---
-def simple_rag_search(query: str, category: str):
+def simple_rag_search(query: str, category: str) -> list:
     """
-    MVP Semantic Search Simulation.
-    In prod, use OpenAIEmbeddings + Faiss.
+    Hybrid retrieval over the mentor catalog.
+    BM25 over name + bio + outcomes, plus a boost when the profile
+    mentions the category, blended with embedding similarity when the
+    scraper has built the ANN index. Returns the top 3 mentors' cards,
+    JSON-encoded with their reason for `category` when the catalog
+    version was built (see mentor_cards.py).
     """
-    results = []
-    query_terms = set(query.lower().split())
-    
-    for mentor in MENTOR_DB:
-        # Simple weighted scoring
-        score = 0
-        text_blob = (mentor['name'] + " " + mentor['bio'] + " " + mentor['outcomes']).lower()
-        
-        # Category boost
-        if category and category.lower() in text_blob:
-            score += 5
-            
-        # Keyword match
-        for term in query_terms:
-            if term in text_blob:
-                score += 1
-                
-        if score > 0:
-            results.append({"mentor": mentor, "score": score})
-            
-    # Sort by score
-    results.sort(key=lambda x: x['score'], reverse=True)
-    return [r['mentor'] for r in results[:3]]
+    return mentor_catalog.current().match_cards(query, category, k=3)
 
 # --- ENDPOINTS ---
 
 @app.get("/")
 def health_check():
-    return {"status": "ClarityOS Online", "mentors_indexed": len(MENTOR_DB), "model": MODEL_ID}
+    return {"status": "ClarityOS Online", "mentors_indexed": len(mentor_catalog), "model": MODEL_ID}
+
+@app.get("/livez")
+def liveness():
+    """The process is up and serving HTTP."""
+    return {"status": "alive", "uptime_seconds": round(time.time() - STARTUP["started_at"], 1)}
+
+@app.get("/readyz")
+def readiness():
+    """200 once startup warm-up has finished, 503 before (or if it failed)."""
+    body = {
+        "status": "ready" if STARTUP["ready"] else "failed" if STARTUP["error"] else "starting",
+        "mentors_indexed": len(mentor_catalog),
+        "llm_client": llm_client.is_ready(),
+        "parsers_warm": STARTUP["parsers_warm"],
+        "ready_seconds": STARTUP["ready_seconds"],
+        "error": STARTUP["error"]
+    }
+    return JSONResponse(body, status_code=200 if STARTUP["ready"] else 503)
+
+@app.post("/catalog/reload")
+def reload_catalog():
+    """
+    Rebuild the mentor catalog from mentor_knowledge_base.json now and swap
+    it in. Requests keep using the previous version until the swap.
+    """
+    try:
+        version = mentor_catalog.reload()
+    except Exception as e:
+        raise HTTPException(status_code=422, detail=f"Catalog reload failed: {e}")
+    return version.info()
+
+@app.get("/metrics")
+def metrics_endpoint():
+    """Prometheus text exposition of request, stage, LLM and cache metrics."""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/llm/cache")
+def llm_cache_stats():
+    """Hit/miss/coalescing counters for the LLM response cache."""
+    return llm_cache.stats()
+
+@app.get("/upload/cache")
+def upload_cache_stats():
+    """Hit/miss counters for the upload extraction cache."""
+    return extraction_cache.stats()
+
+UPLOAD_FORM_SCHEMA = {
+    "requestBody": {
+        "required": True,
+        "content": {"multipart/form-data": {"schema": {
+            "type": "object",
+            "required": ["file"],
+            "properties": {
+                "file": {"type": "string", "format": "binary"},
+                "session_id": {"type": "string"}
+            }
+        }}}
+    }
+}
 
-@app.post("/upload")
-async def upload_file(file: UploadFile = File(...)):
+@app.post("/upload", openapi_extra=UPLOAD_FORM_SCHEMA)
+async def upload_file(request: Request):
     """
     Upload and parse a file (PDF, DOCX, CSV, XLSX, PPTX, TXT, MD).
     Saves to Neo4j and JSON file.
+    The multipart body is read straight off the request stream, so an
+    upload over MAX_UPLOAD_BYTES gets a 413 before it is buffered.
+    Extraction results are cached by content hash, extension and extractor
+    version, so re-uploading the same file skips parsing and storage. If the Neo4j write fails, neo4j_doc_id
+    is null and nothing is cached.
+    If a session_id is given (or "new"), the extracted text becomes that
+    session's file context.
     Returns extracted text content.
     """
-    import os
     import re
-    from database import db
     
+    filename = None
     try:
-        content = await extract_text_from_file(file)
-        
-        # Get filename without extension
-        filename_base = os.path.splitext(file.filename)[0]
-        filename_safe = re.sub(r'[^\w\-]', '_', filename_base)
-        file_type = os.path.splitext(file.filename)[1].replace('.', '')
-        
-        # Create folder and save JSON
-        folder_name = f"data_extracted_from_file_from_{filename_safe}"
-        folder_path = os.path.join(os.path.dirname(__file__), folder_name)
-        os.makedirs(folder_path, exist_ok=True)
-        
-        json_path = os.path.join(folder_path, f"{filename_safe}.json")
-        with open(json_path, 'w', encoding='utf-8') as f:
-            import json as json_module
-            json_module.dump({
-                "filename": file.filename,
-                "file_type": file_type,
-                "content": content,
-                "extracted_at": str(import_datetime())
-            }, f, indent=2, ensure_ascii=False)
+        with stage("upload_spool"):
+            path, content_hash, filename, fields = await file_processor.receive_upload(request)
+        session_id = fields.get("session_id") or None
+        try:
+            cache_key = file_processor.extraction_key(content_hash, filename)
+            cached = extraction_cache.get(cache_key)
+            if cached is None:
+                with stage("file_extraction"):
+                    content = await file_processor.extract_text_from_spooled(path, filename)
+        finally:
+            os.unlink(path)
         
-        # Save to Neo4j
-        doc_id = db.save_file_content(file.filename, content, file_type)
+        if cached is not None:
+            content = cached["content"]
+            doc_id = cached["neo4j_doc_id"]
+            json_path = cached["json_path"]
+        else:
+            # Get filename without extension
+            filename_base = os.path.splitext(filename)[0]
+            filename_safe = re.sub(r'[^\w\-]', '_', filename_base)
+            file_type = os.path.splitext(filename)[1].replace('.', '')
+            
+            # Create folder and save JSON (named by content, so same-named uploads don't overwrite it)
+            folder_name = f"data_extracted_from_file_from_{filename_safe}"
+            folder_path = os.path.join(EXTRACTED_FILES_DIR, folder_name)
+            os.makedirs(folder_path, exist_ok=True)
+            
+            json_path = os.path.join(folder_path, f"{content_hash}.json")
+            with open(json_path, 'w', encoding='utf-8') as f:
+                json.dump({
+                    "filename": filename,
+                    "file_type": file_type,
+                    "content_hash": content_hash,
+                    "content": content,
+                    "extracted_at": str(import_datetime())
+                }, f, indent=2, ensure_ascii=False)
+            
+            # Save to Neo4j (MERGE on the content hash)
+            with stage("neo4j_write"):
+                doc_id = await db.save_file_content(filename, content, file_type, content_hash)
+            
+            # Only cache a stored document: a failed write is retried on the next upload
+            if doc_id is not None and not file_processor.is_extraction_error(content):
+                extraction_cache.put(cache_key, {
+                    "content": content,
+                    "neo4j_doc_id": doc_id,
+                    "json_path": json_path
+                })
         
-        return {
-            "filename": file.filename,
+        response_payload = {
+            "filename": filename,
             "content": content,
             "status": "success",
+            "cached": cached is not None,
+            "content_hash": content_hash,
             "saved_to": {
                 "neo4j_doc_id": doc_id,
                 "json_path": json_path
             }
         }
+        
+        # Attach to the server-side session
+        if session_id:
+            if session_id == "new":
+                session_id = new_session_id()
+            SESSIONS.update(session_id, {"file_context": content})
+            response_payload["session_id"] = session_id
+        
+        return response_payload
+    except FileTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
     except Exception as e:
-        print(f"Upload error: {e}")
+        logger.warning("Upload failed", extra={"upload_filename": filename, "error": str(e)})
         raise HTTPException(status_code=400, detail=str(e))
 
+@app.delete("/chat/session/{session_id}/file")
+def clear_session_file(session_id: str):
+    """Detach the uploaded file context from a session."""
+    session = SESSIONS.get(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Session not found")
+    SESSIONS.update(session_id, {"file_context": None})
+    return {"status": "success", "session_id": session_id}
+
+@app.get("/chat/session/{session_id}/document")
+def get_session_document(session_id: str):
+    """
+    The session's current Mentor Context Pack: preview text, HTML export
+    and the .docx render job, all from the same stored revision.
+    """
+    from document_generator import render_pack_html
+
+    session = SESSIONS.get(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Session not found")
+    artifact = session.get("document")
+    if artifact is None:
+        raise HTTPException(status_code=404, detail="No document for this session yet")
+
+    job = document_jobs.status(artifact["job_id"]) if artifact["job_id"] else None
+    if job and job["status"] == "done":
+        job["download_url"] = f"/documents/jobs/{job['job_id']}/download"
+    return {
+        "session_id": session_id,
+        "revision": artifact["revision"],
+        "preview": artifact["preview"],
+        "html": render_pack_html(artifact["doc_data"]),
+        "job": job
+    }
+
 def import_datetime():
     from datetime import datetime
     return datetime.now().isoformat()
 
-@app.post("/chat/message")
-async def chat_handler(request: ChatRequest):
+def load_chat_session(request: ChatRequest):
     """
-    Main conversational loop with document generation flow.
-    States: gathering_info -> reviewing_doc -> finalized -> show_mentors
+    Resolve the conversation for this turn.
+    With a session_id or message, history and file context come from the
+    session store and only the new message is appended. Otherwise the full
+    `history` payload is used as before.
+    Returns (session_id, session); session_id is None in legacy mode. The
+    session is this request's copy: nothing is stored until
+    save_chat_session, so a refused or failed turn leaves no trace.
     """
-    import re
-    from document_generator import create_addressible_docx, extract_document_data
-    
-    user_msg = request.history[-1].content
-    sanitized = [{"role": "assistant" if m.role == "bot" else m.role, "content": m.content} for m in request.history]
+    if request.session_id is None and request.message is None:
+        history = [{"role": "assistant" if m.role == "bot" else m.role, "content": m.content} for m in request.history]
+        return None, {
+            "history": history,
+            "file_context": request.file_context,
+            "user_message_count": len([m for m in history if m["role"] == "user"])
+        }
+
+    if not request.message:
+        raise HTTPException(status_code=422, detail="message is required when using session_id")
+
+    session_id = request.session_id or new_session_id()
+    session = SESSIONS.get(session_id) or new_session()
+    if request.file_context:
+        session["file_context"] = request.file_context
+    session["history"].append({"role": "user", "content": request.message})
+    session["user_message_count"] += 1
+    return session_id, session
+
+
+# Session fields a chat turn owns; the rest (file_context) is left to /upload
+TURN_FIELDS = ("history", "user_message_count", "document")
+
+
+def save_chat_session(session_id: Optional[str], session: dict, response_payload: dict,
+                      file_context: bool = False):
+    """
+    Record the assistant turn and persist the session (session mode only).
+    Only the turn's own fields are merged into the stored session (plus
+    `file_context` when the request sent one), so an upload made while
+    the turn was in flight is kept.
+    """
+    if session_id is None:
+        return
+    session["history"].append({"role": "assistant", "content": response_payload["reply"]})
+    changes = {field: session.get(field) for field in TURN_FIELDS}
+    if file_context:
+        changes["file_context"] = session["file_context"]
+    SESSIONS.update(session_id, changes)
+    response_payload["session_id"] = session_id
+
+
+def turn_priority(session: dict, user_message_count: int, is_done_signal: bool) -> int:
+    """
+    Admission priority of a chat turn: turns that finalize the document
+    first, then turns reviewing a draft, then information gathering.
+    """
+    if user_message_count >= 7 or (is_done_signal and session.get("document")):
+        return FINALIZE
+    if session.get("document"):
+        return REVIEW
+    return GATHER
+
+
+def overloaded_error(e: Overloaded) -> HTTPException:
+    return HTTPException(
+        status_code=503,
+        detail="The assistant is busy right now. Please try again shortly.",
+        headers={"Retry-After": str(e.retry_after)}
+    )
+
+
+def build_chat_messages(session: dict):
+    """
+    Assemble the NIM prompt for a chat turn.
+    Returns (messages, user_msg, user_message_count, is_done_signal).
+    """
+    sanitized = session["history"]
+    user_msg = sanitized[-1]["content"]
     
     # Count user messages
-    user_message_count = len([m for m in request.history if m.role == "user"])
+    user_message_count = session["user_message_count"]
     
     # Detect "done" signals for document finalization
     done_signals = ["done", "looks good", "perfect", "no changes", "all good", 
@@ -239,44 +497,188 @@ async def chat_handler(request: ChatRequest):
     if is_done_signal:
         system_content += " User indicated they're satisfied. Set document_finalized=true."
     
-    if request.file_context:
-        system_content += f"\n\nUSER FILE CONTEXT (analyze and mention insights):\n{request.file_context[:6000]}"
-    
-    messages = [{"role": "system", "content": system_content}] + sanitized
+    # Fit system prompt + relevant file chunks + (compacted) history into the token budget
+    with stage("prompt_build"):
+        messages, prompt_stats = build_prompt(system_content, sanitized, session["file_context"])
+    log_prompt_stats(prompt_stats)
+    return messages, user_msg, user_message_count, is_done_signal
+
+
+def parse_llm_output(llm_raw: str, json_text: str = None) -> dict:
+    """
+    Parse and validate the diagnosis JSON from a completion.
+    Falls back to treating the whole completion as the reply.
+    """
+    with stage("json_parse"):
+        ai_data, errors = parse_llm_json(llm_raw, DIAGNOSIS_SCHEMA, json_text)
+    if errors:
+        logger.warning("Diagnosis output issues", extra={"issues": errors})
+    if ai_data is None:
+        metrics.fallbacks.inc(reason="unparseable_output")
+        return {
+            "reply": llm_raw,
+            "category": "General",
+            "conversation_state": "gathering_info",
+            "ready_for_document": False
+        }
+    return ai_data
+
+
+def llm_error_fallback(error: Exception) -> dict:
+    logger.error("NVIDIA API Error", extra={"error": str(error), "error_type": type(error).__name__})
+    metrics.fallbacks.inc(reason="llm_error")
+    return {
+        "reply": "I'm having trouble processing. Could you describe your main challenge in a few sentences?",
+        "category": "General",
+        "conversation_state": "gathering_info"
+    }
+
+
+def sse_event(event: str, data: dict) -> str:
+    """Format a Server-Sent Event frame."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@app.post("/chat/message")
+async def chat_handler(request: ChatRequest):
+    """
+    Main conversational loop with document generation flow.
+    States: gathering_info -> reviewing_doc -> finalized -> show_mentors
+    """
+    session_id, session = load_chat_session(request)
+    messages, user_msg, user_message_count, is_done_signal = build_chat_messages(session)
 
     # NVIDIA NIM Call
     try:
-        completion = client.chat.completions.create(
-            model=MODEL_ID,
-            messages=messages,
-            temperature=0.3,
-            max_tokens=1500
-        )
-        llm_raw = completion.choices[0].message.content
-        
-        # Parse JSON from LLM response
-        try:
-            json_match = re.search(r'\{[\s\S]*\}', llm_raw)
-            if json_match:
-                ai_data = json.loads(json_match.group())
-            else:
-                raise ValueError("No JSON found")
-        except:
-            ai_data = {
-                "reply": llm_raw,
-                "category": "General",
-                "conversation_state": "gathering_info",
-                "ready_for_document": False
-            }
-        
+        with stage("llm_call"):
+            llm_raw = await llm_client.chat_completion(
+                messages,
+                temperature=0.3,
+                max_tokens=1500,
+                json_mode=True,
+                priority=turn_priority(session, user_message_count, is_done_signal),
+                deadline=time.monotonic() + CHAT_DEADLINE_SECONDS
+            )
+        ai_data = parse_llm_output(llm_raw)
+    except Overloaded as e:
+        # The session isn't saved, so a retry doesn't repeat the message
+        raise overloaded_error(e)
     except Exception as e:
-        print(f"NVIDIA API Error: {e}")
-        ai_data = {
-            "reply": "I'm having trouble processing. Could you describe your main challenge in a few sentences?",
-            "category": "General",
-            "conversation_state": "gathering_info"
+        ai_data = llm_error_fallback(e)
+
+    response_payload = build_chat_response(session, ai_data, user_msg, user_message_count, is_done_signal, session_id)
+    save_chat_session(session_id, session, response_payload, file_context=bool(request.file_context))
+    # Mentor cards are already JSON; splice them in rather than re-encoding
+    return Response(encode_payload(response_payload), media_type="application/json")
+
+
+@app.post("/chat/message/stream")
+async def chat_stream_handler(request: ChatRequest):
+    """
+    Streaming variant of /chat/message (Server-Sent Events).
+    Emits `token` events with reply text as it is generated, then a single
+    `done` event carrying the same payload /chat/message would return.
+    """
+    session_id, session = load_chat_session(request)
+    messages, user_msg, user_message_count, is_done_signal = build_chat_messages(session)
+
+    started = time.perf_counter()
+    deltas = llm_client.stream_chat_completion(
+        messages,
+        temperature=0.3,
+        max_tokens=1500,
+        json_mode=True,
+        priority=turn_priority(session, user_message_count, is_done_signal),
+        deadline=time.monotonic() + CHAT_DEADLINE_SECONDS
+    )
+    # Wait for the first delta before starting the response, so a refusal
+    # from admission control can still be a plain 503
+    first_delta, first_error = None, None
+    try:
+        first_delta = await deltas.__anext__()
+        metrics.observe_stage("llm_first_token", time.perf_counter() - started)
+    except Overloaded as e:
+        # The session isn't saved, so a retry doesn't repeat the message
+        raise overloaded_error(e)
+    except StopAsyncIteration:
+        pass
+    except Exception as e:
+        first_error = e
+
+    async def event_stream():
+        extractor = ReplyStreamExtractor()
+        try:
+            if first_error is not None:
+                raise first_error
+            if first_delta is not None:
+                text = extractor.feed(first_delta)
+                if text:
+                    yield sse_event("token", {"text": text})
+                async for delta in deltas:
+                    text = extractor.feed(delta)
+                    if text:
+                        yield sse_event("token", {"text": text})
+            metrics.observe_stage("llm_call", time.perf_counter() - started)
+            ai_data = parse_llm_output(extractor.text(), extractor.json_text())
+        except Exception as e:
+            ai_data = llm_error_fallback(e)
+        finally:
+            await deltas.aclose()
+
+        response_payload = build_chat_response(session, ai_data, user_msg, user_message_count, is_done_signal, session_id)
+        save_chat_session(session_id, session, response_payload, file_context=bool(request.file_context))
+        yield b"event: done\ndata: " + encode_payload(response_payload) + b"\n\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+def ensure_document_artifact(session: dict, ai_data: dict, confirmed: bool = False) -> dict:
+    """
+    The session's Mentor Context Pack, built once per content revision.
+    The preview is only re-rendered when the pack's fields change; the
+    stored artifact is reused by finalization and the HTML export.
+    When the user `confirmed` the preview, the stored pack is finalized
+    as shown unless the LLM returned new pack fields with the reply.
+    """
+    from document_generator import render_preview_text, extract_document_data, pack_revision, PACK_FIELDS
+
+    artifact = session.get("document")
+    if confirmed and artifact is not None and not any(ai_data.get(f) for f in PACK_FIELDS):
+        return artifact
+    doc_data = extract_document_data(session["history"], ai_data)
+    revision = pack_revision(doc_data)
+    if artifact is None or artifact["revision"] != revision:
+        artifact = {
+            "revision": revision,
+            "doc_data": doc_data,
+            "preview": None,
+            "job_id": None
         }
+        with stage("doc_preview"):
+            artifact["preview"] = render_preview_text(**doc_data)
+        session["document"] = artifact
+    return artifact
+
+
+def document_filename(session_id: Optional[str], revision: str) -> str:
+    """Per-session output path (relative to generated_documents/) for a pack revision."""
+    import re
 
+    folder = re.sub(r'[^\w\-]', '_', session_id)[:64] if session_id else "shared"
+    return os.path.join(folder, f"mentor_context_pack_{revision}.docx")
+
+
+def build_chat_response(session: dict, ai_data: dict, user_msg: str,
+                        user_message_count: int, is_done_signal: bool,
+                        session_id: Optional[str] = None) -> dict:
+    """
+    Apply conversation-state rules to the parsed LLM output and build the
+    response payload (document preview, finalization, mentor cards).
+    """
     # Extract AI response data
     reply = ai_data.get("reply", "Tell me more about your challenge.")
     category = ai_data.get("category", "General")
@@ -312,14 +714,13 @@ async def chat_handler(request: ChatRequest):
         "message_count": user_message_count
     }
 
+    show_preview = ready_for_document and conversation_state != "finalized"
+    artifact = ensure_document_artifact(session, ai_data, confirmed=is_done_signal) \
+        if show_preview or document_finalized else None
+
     # Handle document generation
-    if ready_for_document and conversation_state != "finalized":
-        # Generate document preview
-        doc_data = extract_document_data(
-            [{"role": m.role, "content": m.content} for m in request.history],
-            ai_data
-        )
-        _, doc_preview = create_addressible_docx(**doc_data)
+    if show_preview:
+        doc_preview = artifact["preview"]
         
         response_payload["document_preview"] = doc_preview
         response_payload["show_review_buttons"] = True
@@ -327,106 +728,120 @@ async def chat_handler(request: ChatRequest):
 
     # Handle document finalization
     if document_finalized:
-        doc_data = extract_document_data(
-            [{"role": m.role, "content": m.content} for m in request.history],
-            ai_data
+        # Render the .docx in the background; the widget polls the job.
+        # The same revision always maps to the same file, so repeat
+        # finalizations reuse the existing job.
+        job_id = document_jobs.enqueue(
+            artifact["doc_data"],
+            filename=document_filename(session_id, artifact["revision"])
         )
-        file_path, doc_preview = create_addressible_docx(**doc_data, filename="addressible.docx")
+        artifact["job_id"] = job_id
         
         response_payload["document_saved"] = True
-        response_payload["document_path"] = file_path
-        response_payload["reply"] = f"✅ **Document saved!** (`{file_path}`)\n\n🎯 Now let me recommend the perfect mentors for your situation..."
+        response_payload["document_job_id"] = job_id
+        response_payload["document_status_url"] = f"/documents/jobs/{job_id}"
+        response_payload["reply"] = "✅ **Document finalized!** Your Mentor Context Pack is being generated.\n\n🎯 Now let me recommend the perfect mentors for your situation..."
         
         # Get mentor matches with reasons
-        matches = simple_rag_search(user_msg + " " + " ".join(keywords), category)
-        for m in matches:
-            m["why_this_mentor"] = generate_mentor_reason(m, category, ai_data.get("problem_summary", ""))
-        response_payload["cards"] = matches
+        with stage("rag_search"):
+            response_payload["cards"] = simple_rag_search(user_msg + " " + " ".join(keywords), category)
         response_payload["show_mentors"] = True
 
     return response_payload
 
 
-def generate_mentor_reason(mentor: dict, category: str, problem_summary: str) -> str:
-    """Generate a specific reason why this mentor matches the user's needs."""
-    name = mentor.get("name", "This mentor")
-    bio = mentor.get("bio", "")
-    outcomes = mentor.get("outcomes", "")
-    
-    if "fundraising" in category.lower():
-        return f"{name} has deep experience in fundraising. {outcomes} Their background in {bio[:50]}... makes them ideal for your funding needs."
-    elif "growth" in category.lower():
-        return f"{name} specializes in scaling businesses. {outcomes} Perfect for tackling your growth challenges."
-    else:
-        return f"{name} is a proven expert. {outcomes} Their experience aligns well with your situation."
+class DocumentJobRequest(BaseModel):
+    user_summary: str
+    category: str = "General"
+    insights: List[str] = []
+    metrics: dict = {}
+    questions_for_mentor: List[str] = []
+
+
+@app.post("/documents/jobs")
+def enqueue_document_job(request: DocumentJobRequest):
+    """Queue a Mentor Context Pack .docx render."""
+    job_id = document_jobs.enqueue(request.model_dump())
+    return document_jobs.status(job_id)
+
+
+@app.get("/documents/jobs/{job_id}")
+def get_document_job(job_id: str):
+    """Poll a render job: queued | running | done | failed."""
+    job = document_jobs.status(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job["status"] == "done":
+        job["download_url"] = f"/documents/jobs/{job_id}/download"
+    return job
+
+
+@app.get("/documents/jobs/{job_id}/download")
+def download_document(job_id: str):
+    """Download the rendered .docx once the job is done."""
+    job = document_jobs.status(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job["status"] != "done":
+        raise HTTPException(status_code=409, detail=f"Document is {job['status']}")
+    return FileResponse(
+        job["file_path"],
+        media_type="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+        filename=os.path.basename(job["file_path"])
+    )
+
 
 @app.post("/generate-pdf")
 async def generate_context_pdf(
-    user_summary: str,
-    category: str,
-    mentors: List[str]
+    mentors: List[str],
+    user_summary: str = "",
+    category: str = "General",
+    session_id: Optional[str] = None
 ):
     """
     Generate a Mentor Context Pack PDF.
     Returns a simple HTML version (can be converted to PDF with a library).
+    With a session_id, the session's stored pack is exported as-is.
     """
-    from datetime import datetime
-    
-    html_content = f"""
-    <!DOCTYPE html>
-    <html>
-    <head><title>Mentor Context Pack</title></head>
-    <body style="font-family: Arial, sans-serif; padding: 40px; max-width: 800px; margin: auto;">
-        <h1 style="color: #2563EB;">🎯 Mentor Context Pack</h1>
-        <p style="color: #6B7280;">Generated on {datetime.now().strftime('%B %d, %Y')}</p>
-        <hr>
-        
-        <h2>Problem Summary</h2>
-        <p style="background: #F3F4F6; padding: 16px; border-radius: 8px;">{user_summary}</p>
-        
-        <h2>Category: {category}</h2>
-        
-        <h2>Recommended Mentors</h2>
-        <ul>
-            {"".join([f"<li><b>{m}</b></li>" for m in mentors])}
-        </ul>
-        
-        <h2>Questions to Prepare</h2>
-        <ul>
-            <li>What specific outcome do you want from this session?</li>
-            <li>What have you already tried?</li>
-            <li>What constraints are you working with?</li>
-        </ul>
-        
-        <hr>
-        <p style="color: #9CA3AF; font-size: 12px;">Powered by ClarityOS | ExpertBells</p>
-    </body>
-    </html>
-    """
-    
+    from document_generator import render_pack_html
+
+    session = SESSIONS.get(session_id) if session_id else None
+    if session and session.get("document"):
+        return {"html": render_pack_html(session["document"]["doc_data"], mentors=mentors), "status": "success"}
+
+    html_content = render_pack_html(
+        {
+            "user_summary": user_summary,
+            "category": category,
+            "questions_for_mentor": [
+                "What specific outcome do you want from this session?",
+                "What have you already tried?",
+                "What constraints are you working with?"
+            ]
+        },
+        mentors=mentors
+    )
+
     return {"html": html_content, "status": "success"}
 
 
+@app.post("/session/analyze")
 async def analyze_session(request: AnalysisRequest):
     """
     The Scribe: Generates Action Plan from text using NVIDIA NIM.
+    Long transcripts are chunked and the partial plans merged
+    (see session_scribe.py, which also runs overnight batches).
     """
     try:
-        completion = client.chat.completions.create(
-            model=MODEL_ID,
-            messages=[
-                {"role": "system", "content": SYSTEM_PROMPT_SCRIBE},
-                {"role": "user", "content": request.transcript}
-            ],
-            temperature=0.1
+        return await session_scribe.analyze_transcript(
+            request.transcript,
+            deadline=time.monotonic() + CHAT_DEADLINE_SECONDS
         )
-        # Assuming the model returns valid JSON string
-        content = completion.choices[0].message.content
-        # In prod: validation logic here
-        return json.loads(content)
-        
+    except Overloaded as e:
+        raise overloaded_error(e)
     except Exception as e:
-        print(f"Error: {e}")
+        logger.error("Scribe failed", extra={"error": str(e)})
+        metrics.fallbacks.inc(reason="scribe_error")
         # Fallback for demo
         return {
             "action_plan": [
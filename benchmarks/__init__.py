@@ -0,0 +1,5 @@
+"""
+Benchmarks for ClarityOS
+Load and regression harnesses that run the real backend against local
+stand-ins (stub_llm.py for NVIDIA NIM). See the Testing section of the README.
+"""
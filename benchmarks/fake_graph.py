@@ -0,0 +1,102 @@
+"""
+Fake Graph for ClarityOS benchmarks
+In-process stand-in for the Neo4j-backed `database.db`, so the backend
+can be benchmarked without a graph server.
+
+FakeGraph keeps mentors and documents in dicts and implements the
+Database methods the app calls (uploads, mentor matching, schema and
+bulk load). Every call sleeps FAKE_GRAPH_LATENCY seconds to stand in for
+the Bolt round-trip. Document writes MERGE on the content hash like
+SAVE_DOCUMENTS_QUERY does.
+
+Run the backend on it with `uvicorn benchmarks.serve:app` (see serve.py).
+"""
+import os
+import uuid
+import asyncio
+from database import Database, mentor_search_text
+
+FAKE_GRAPH_LATENCY = float(os.getenv("FAKE_GRAPH_LATENCY", "0.002"))
+
+
+class FakeGraph(Database):
+    def __init__(self, latency: float = FAKE_GRAPH_LATENCY):
+        super().__init__()
+        self.latency = latency
+        self.mentors = {}
+        self.documents = {}
+        self._by_hash = {}
+        self.calls = {}
+
+    async def _round_trip(self, name: str):
+        self.calls[name] = self.calls.get(name, 0) + 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+    async def connect(self):
+        return None
+
+    async def close(self):
+        pass
+
+    async def _run(self, query: str, **params) -> list:
+        raise NotImplementedError("FakeGraph does not run Cypher")
+
+    async def _write(self, query: str, **params):
+        raise NotImplementedError("FakeGraph does not run Cypher")
+
+    async def verify_connection(self):
+        await self._round_trip("verify_connection")
+        return True
+
+    async def ensure_schema(self):
+        await self._round_trip("ensure_schema")
+
+    async def hot_path_scans(self, category: str = "Growth", keywords: list = None) -> list:
+        return []
+
+    async def add_mentors(self, mentors: list):
+        await self._round_trip("add_mentors")
+        for m in mentors:
+            self.mentors[m["id"]] = dict(m, search_text=mentor_search_text(m))
+
+    async def get_mentor_matches(self, category: str, keywords: list, k: int = 3):
+        """Term-overlap scoring over search_text; the category phrase is required unless "General"."""
+        await self._round_trip("get_mentor_matches")
+        category = (category or "").lower()
+        terms = [kw.lower() for kw in keywords if kw and kw.strip()]
+        if not terms and category in ("", "general"):
+            return []
+        matches = []
+        for m in self.mentors.values():
+            text = m["search_text"]
+            if category not in ("", "general") and category not in text:
+                continue
+            score = sum(text.count(t) for t in terms) + (2.0 if category not in ("", "general") else 0.0)
+            matches.append({
+                "name": m.get("name"), "bio": m.get("bio"), "id": m["id"], "link": m.get("link"),
+                "outcomes": list(m.get("outcomes", [])), "expertise": list(m.get("expertise", [])),
+                "score": score
+            })
+        matches.sort(key=lambda r: -r["score"])
+        return matches[:k]
+
+    async def save_file_contents(self, files: list):
+        await self._round_trip("save_file_contents")
+        ids = []
+        for f in files:
+            content_hash = f.get("content_hash")
+            doc_id = self._by_hash.get(content_hash) if content_hash else None
+            if doc_id is None:
+                doc_id = str(uuid.uuid4())[:8]
+                self.documents[doc_id] = {
+                    "filename": f["filename"], "content": f["content"][:50000], "file_type": f["file_type"]
+                }
+                if content_hash:
+                    self._by_hash[content_hash] = doc_id
+            ids.append(doc_id)
+        return ids
+
+    async def get_document(self, doc_id: str):
+        await self._round_trip("get_document")
+        return self.documents.get(doc_id)
@@ -0,0 +1,189 @@
+"""
+Benchmark Harness for ClarityOS
+Starts the stub LLM and the backend as subprocesses on free local ports
+and collects latency statistics. Shared by the benchmark scripts.
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import signal
+import socket
+import platform
+import subprocess
+from contextlib import contextmanager
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_for_port(port: int, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        with socket.socket() as s:
+            if s.connect_ex(("127.0.0.1", port)) == 0:
+                return
+        time.sleep(0.1)
+    raise TimeoutError(f"Nothing listening on port {port} after {timeout}s")
+
+
+@contextmanager
+def stub_llm(latency: float = 0.2, capacity: int = 0, token_delay: float = 0.0):
+    """Run benchmarks/stub_llm.py; yields its /v1 base URL."""
+    port = free_port()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.stub_llm", "--port", str(port), "--latency", str(latency),
+         "--capacity", str(capacity), "--token-delay", str(token_delay)],
+        cwd=ROOT
+    )
+    try:
+        wait_for_port(port)
+        yield f"http://127.0.0.1:{port}/v1"
+    finally:
+        process.terminate()
+        process.wait()
+
+
+@contextmanager
+def backend(llm_base_url: str, env: dict = None, workers: int = 1, app: str = "backend:app"):
+    """
+    Run `uvicorn <app>` against the stub; yields (base URL, Popen).
+    app="benchmarks.serve:app" runs it on the in-process fake graph.
+    """
+    port = free_port()
+    process_env = {
+        **os.environ,
+        "NVIDIA_API_KEY": "stub",
+        "NVIDIA_BASE_URL": llm_base_url,
+        "LOG_LEVEL": "ERROR",
+        "EXTRACTION_PREWARM": "false",
+        **(env or {})
+    }
+    command = [sys.executable, "-m", "uvicorn", app, "--port", str(port), "--log-level", "error"]
+    if workers > 1:
+        command += ["--workers", str(workers)]
+    process = subprocess.Popen(command, cwd=ROOT, env=process_env)
+    children = []
+    try:
+        wait_for_port(port, timeout=60)
+        yield f"http://127.0.0.1:{port}", process
+    finally:
+        if os.path.isdir("/proc"):
+            children = process_tree(process.pid)[1:]
+        process.terminate()
+        process.wait()
+        # Pool workers (extraction, rendering) can outlive a terminated server
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except OSError:
+                pass
+
+
+async def wait_ready(client, timeout: float = 60.0, parsers: bool = False):
+    """Poll /readyz until the backend's warm-up is done (and, with `parsers`, the extraction pool's)."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        response = await client.get("/readyz")
+        if response.status_code == 200 and (not parsers or response.json()["parsers_warm"]):
+            return
+        await asyncio.sleep(0.2)
+    raise TimeoutError("Backend not ready")
+
+
+def percentiles(values: list, points: tuple = (50, 90, 95, 99)) -> dict:
+    """{"p50": ..., ...} in milliseconds (nearest rank); empty input gives {}."""
+    if not values:
+        return {}
+    ordered = sorted(values)
+    return {
+        f"p{p}": round(ordered[min(len(ordered) - 1, max(0, round(p / 100 * len(ordered)) - 1))] * 1000, 2)
+        for p in points
+    }
+
+
+def _proc_status(pid: int) -> dict:
+    fields = {}
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            key, _, value = line.partition(":")
+            fields[key] = value.strip()
+    return fields
+
+
+def process_tree(pid: int) -> list:
+    """pid and all its descendants (Linux /proc)."""
+    parents = {}
+    for entry in os.listdir("/proc"):
+        if entry.isdigit():
+            try:
+                with open(f"/proc/{entry}/stat") as f:
+                    # ppid is the 2nd field after the parenthesised command name
+                    parents[int(entry)] = int(f.read().rsplit(")", 1)[1].split()[1])
+            except (OSError, IndexError, ValueError):
+                continue
+    tree, frontier = [pid], [pid]
+    while frontier:
+        children = [child for child, parent in parents.items() if parent in frontier]
+        tree.extend(children)
+        frontier = children
+    return tree
+
+
+def memory_usage(pid: int) -> dict:
+    """
+    Resident memory of a process tree (e.g. uvicorn + workers + extraction
+    and render pools) in MB: current and peak RSS per process and summed.
+    Empty where /proc is unavailable.
+    """
+    processes = []
+    for p in process_tree(pid) if os.path.isdir("/proc") else []:
+        try:
+            status = _proc_status(p)
+        except OSError:
+            continue
+        processes.append({
+            "pid": p,
+            "name": status.get("Name"),
+            "rss_mb": round(int(status.get("VmRSS", "0 kB").split()[0]) / 1024, 1),
+            "peak_rss_mb": round(int(status.get("VmHWM", "0 kB").split()[0]) / 1024, 1),
+        })
+    if not processes:
+        return {}
+    return {
+        "rss_mb": round(sum(p["rss_mb"] for p in processes), 1),
+        "peak_rss_mb": round(sum(p["peak_rss_mb"] for p in processes), 1),
+        "processes": processes
+    }
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def write_results(name: str, results: dict, output: str = None) -> dict:
+    """Stamp results with the revision and machine, print and optionally save them as JSON."""
+    record = {
+        "benchmark": name,
+        "revision": git_revision(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": platform.python_version(),
+        "cpus": os.cpu_count(),
+        **results
+    }
+    text = json.dumps(record, indent=2)
+    print(text)
+    if output:
+        with open(output, "w") as f:
+            f.write(text + "\n")
+    return record
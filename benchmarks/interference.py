@@ -0,0 +1,127 @@
+"""
+Interference Benchmark for ClarityOS
+Chat latency while heavy work runs next to it: does parsing uploads or
+rendering .docx packs slow down /chat/message?
+
+One backend (stub LLM, in-process fake graph) runs three phases of
+--duration seconds, each with the same closed-loop chat users:
+    baseline   - chat only
+    uploads    - plus clients uploading a sample file in a loop (fresh
+                 bytes every time, so each upload is parsed)
+    documents  - plus clients queueing Mentor Context Pack renders and
+                 waiting for each to finish
+Reports chat latency percentiles per phase and the throughput and latency
+of the background work.
+
+Usage:
+    python -m benchmarks.interference --chat-users 8 --background 4 --duration 20 --output interference.json
+"""
+import os
+import time
+import asyncio
+import itertools
+import tempfile
+import httpx
+from benchmarks.harness import stub_llm, backend, wait_ready, percentiles, memory_usage, write_results
+from benchmarks.samples import sample_uploads
+
+PHASES = ("baseline", "uploads", "documents")
+PACK = {
+    "user_summary": "D2C skincare brand at $30k MRR with 40% first-month churn",
+    "category": "Growth",
+    "insights": ["Churn is concentrated in the first 30 days", "Paid social drives most first orders"],
+    "metrics": {"MRR": "$30k", "Churn": "40%"},
+    "questions_for_mentor": ["How do I diagnose early churn?", "Which retention levers come first?"],
+}
+
+
+async def chat_user(client, end: float, counter, latencies: list, errors: list):
+    while time.monotonic() < end:
+        message = f"We sell skincare online; question {next(counter)} is about retention"  # unique: no cache hits
+        started = time.monotonic()
+        response = await client.post("/chat/message", json={"message": message})
+        (latencies if response.status_code == 200 else errors).append(time.monotonic() - started)
+
+
+async def upload_user(client, end: float, counter, path: str, latencies: list, errors: list):
+    with open(path, "rb") as f:
+        data = f.read()
+    while time.monotonic() < end:
+        body = data + f"\n% interference upload {next(counter)}\n".encode("ascii")
+        started = time.monotonic()
+        response = await client.post("/upload", files={"file": (os.path.basename(path), body)})
+        (latencies if response.status_code == 200 else errors).append(time.monotonic() - started)
+
+
+async def document_user(client, end: float, counter, latencies: list, errors: list):
+    while time.monotonic() < end:
+        started = time.monotonic()
+        job = (await client.post("/documents/jobs", json=dict(PACK, user_summary=f"{PACK['user_summary']} #{next(counter)}"))).json()
+        while job["status"] not in ("done", "failed"):
+            await asyncio.sleep(0.02)
+            job = (await client.get(f"/documents/jobs/{job['job_id']}")).json()
+        (latencies if job["status"] == "done" else errors).append(time.monotonic() - started)
+
+
+async def drive(base_url: str, chat_users: int, background: int, duration: float, upload_path: str) -> dict:
+    counter = itertools.count()
+    phases = {}
+    limits = httpx.Limits(max_connections=chat_users + background + 10)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=120) as client:
+        await wait_ready(client, parsers=True)
+        for phase in PHASES:
+            chat, chat_errors, work, work_errors = [], [], [], []
+            end = time.monotonic() + duration
+            users = [chat_user(client, end, counter, chat, chat_errors) for _ in range(chat_users)]
+            if phase == "uploads":
+                users += [upload_user(client, end, counter, upload_path, work, work_errors) for _ in range(background)]
+            elif phase == "documents":
+                users += [document_user(client, end, counter, work, work_errors) for _ in range(background)]
+            await asyncio.gather(*users)
+            phases[phase] = {
+                "chat": {"count": len(chat), "errors": len(chat_errors), **percentiles(chat)},
+            }
+            if phase != "baseline":
+                phases[phase]["background"] = {
+                    "count": len(work), "errors": len(work_errors),
+                    "per_second": round(len(work) / duration, 2), **percentiles(work)
+                }
+    baseline = phases["baseline"]["chat"].get("p95")
+    for phase in PHASES[1:]:
+        p95 = phases[phase]["chat"].get("p95")
+        phases[phase]["chat_p95_vs_baseline"] = round(p95 / baseline, 2) if p95 and baseline else None
+    return phases
+
+
+def run(chat_users: int, background: int, duration: float, upload_kind: str, latency: float, env: dict) -> dict:
+    upload_path = sample_uploads()[upload_kind]
+    with tempfile.TemporaryDirectory(prefix="clarity_interference_") as scratch:
+        backend_env = {
+            "LLM_CACHE_ENABLED": "false",
+            "EXTRACTION_PREWARM": "true",
+            "EXTRACTION_CACHE_DIR": os.path.join(scratch, "extraction_cache"),
+            **env
+        }
+        with stub_llm(latency=latency) as llm_url:
+            with backend(llm_url, backend_env, app="benchmarks.serve:app") as (base_url, process):
+                phases = asyncio.run(drive(base_url, chat_users, background, duration, upload_path))
+                return {"phases": phases, "memory": memory_usage(process.pid)}
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Chat latency while uploads are parsed and documents rendered")
+    parser.add_argument("--chat-users", type=int, default=8, help="closed-loop chat users")
+    parser.add_argument("--background", type=int, default=4, help="upload / render clients in the busy phases")
+    parser.add_argument("--duration", type=float, default=20, help="seconds per phase")
+    parser.add_argument("--upload-kind", default="pdf", choices=["pdf", "docx", "pptx", "xlsx", "csv"])
+    parser.add_argument("--latency", type=float, default=0.2, help="stub seconds per call")
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE", help="extra backend environment")
+    parser.add_argument("--output", help="write JSON results here")
+    args = parser.parse_args()
+    env = dict(item.split("=", 1) for item in args.env)
+    write_results("interference", {
+        "config": {"chat_users": args.chat_users, "background": args.background, "duration": args.duration,
+                   "upload_kind": args.upload_kind, "stub_latency": args.latency, "env": env},
+        **run(args.chat_users, args.background, args.duration, args.upload_kind, args.latency, env)
+    }, args.output)
@@ -0,0 +1,474 @@
+"""
+Component Benchmarks for ClarityOS
+In-process measurements of the pieces behind the hot paths, each with
+the checks that guard it. Run all sections or pick some with --only:
+
+    search           BM25 index build time and query latency, 5 -> 100k mentors
+    recall           IVF ANN recall@3 and latency against brute-force cosine, 10k -> 1M vectors
+    catalog          memory per mentor at 100k: raw JSON dicts, records, full version, mapped pack
+    docx             Mentor Context Pack renders per second, compiled template vs the python-docx baseline
+    parser           parse success over recorded LLM outputs + random truncation/corruption fuzz
+    imports          `python -X importtime -c "import backend"` against a budget; heavy SDKs stay deferred
+    instrumentation  per-request cost of MetricsMiddleware + stage timings, per JSON log line
+    scribe           Session Scribe batch throughput against the stub LLM
+
+Results are JSON (see harness.write_results); the command exits non-zero
+if a check fails.
+
+Usage:
+    python -m benchmarks.micro --output micro.json
+    python -m benchmarks.micro --only search recall --sizes 5 1000 --recall-sizes 10000
+"""
+import os
+import io
+import gc
+import re
+import sys
+import json
+import time
+import random
+import asyncio
+import tempfile
+import tracemalloc
+import subprocess
+import numpy as np
+from benchmarks.harness import ROOT, stub_llm, percentiles, write_results
+
+LLM_OUTPUTS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "llm_outputs.json")
+
+# Must not be imported by `import backend` (loaded by the warm-up or on first use)
+DEFERRED_MODULES = ("openai", "neo4j", "scipy", "pandas", "docx", "pypdf", "pptx", "openpyxl")
+
+FIRST_NAMES = ["Arjun", "Priya", "Ravi", "Asha", "Karan", "Meera", "Vikram", "Nisha", "Rahul", "Ananya",
+               "Sanjay", "Divya", "Aditya", "Kavya", "Rohan", "Isha", "Manish", "Pooja", "Nikhil", "Sneha"]
+LAST_NAMES = ["Vaidya", "Sharma", "Iyer", "Mehta", "Reddy", "Kapoor", "Nair", "Gupta", "Rao", "Bose",
+              "Joshi", "Menon", "Kulkarni", "Das", "Pillai", "Shah", "Verma", "Chopra", "Bhat", "Sen"]
+DOMAINS = ["fundraising", "growth marketing", "D2C scaling", "product-market fit", "B2B SaaS sales",
+           "supply chain", "fintech compliance", "pricing strategy", "hiring", "brand building",
+           "customer retention", "marketplaces", "unit economics", "enterprise sales", "community building"]
+COMPANY_WORDS = ["Bright", "Kite", "Nimbus", "Saffron", "Orbit", "Lotus", "Monsoon", "Pixel", "Harbor", "Cedar"]
+OUTCOMES = ["Scaled to ₹{}Cr ARR", "Raised ${}M Series A", "Grew retention by {}%", "Exited to a strategic buyer in {} months"]
+CATEGORIES = ["Fundraising", "Growth", "Product-Market Fit", "General"]
+
+
+def iter_synthetic_mentors(count: int, seed: int = 0):
+    """Deterministic catalog entries shaped like mentor_knowledge_base.json, one at a time."""
+    rng = random.Random(seed)
+    for i in range(count):
+        first, second = rng.sample(DOMAINS, 2)
+        company = rng.choice(COMPANY_WORDS) + rng.choice(COMPANY_WORDS).lower()
+        yield {
+            "id": f"m{i + 1}",
+            "name": f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+            "bio": f"Founder of {company} ({rng.randint(2005, 2023)}). Expert in {first} and {second}.",
+            "outcomes": rng.choice(OUTCOMES).format(rng.randint(2, 500)),
+            "link": f"https://expertbells.com/mentor/{i + 1}",
+        }
+
+
+def synthetic_mentors(count: int, seed: int = 0) -> list:
+    return list(iter_synthetic_mentors(count, seed))
+
+
+def synthetic_vectors(count: int, batch: int = 50000) -> np.ndarray:
+    """Embeddings of synthetic_mentors(count), built in batches so the dicts are never all held at once."""
+    from itertools import islice
+    from mentor_index import mentor_text
+    from semantic_search import embed_texts
+    mentors = iter_synthetic_mentors(count)
+    vectors = None
+    for start in range(0, count, batch):
+        chunk = embed_texts([mentor_text(m) for m in islice(mentors, batch)])
+        if vectors is None:
+            vectors = np.empty((count, chunk.shape[1]), dtype=chunk.dtype)
+        vectors[start:start + len(chunk)] = chunk
+    return vectors
+
+
+def synthetic_queries(count: int, seed: int = 1) -> list:
+    """(query, category) pairs like the ones simple_rag_search receives."""
+    rng = random.Random(seed)
+    return [(" ".join(rng.sample(DOMAINS, 2)) + " " + rng.choice(["churn", "investors", "cac", "scale", "pricing"]),
+             rng.choice(CATEGORIES)) for _ in range(count)]
+
+
+def _timed(fn, *args) -> float:
+    started = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - started
+
+
+# --- SECTIONS ---
+
+def bench_search(sizes: list, queries: int = 200) -> dict:
+    from mentor_index import MentorIndex
+    results = {}
+    for size in sizes:
+        mentors = synthetic_mentors(size)
+        started = time.perf_counter()
+        index = MentorIndex(mentors)
+        build = time.perf_counter() - started
+        latencies = [_timed(index.search_ids, query, category) for query, category in synthetic_queries(queries)]
+        results[str(size)] = {"build_seconds": round(build, 3), "query_ms": percentiles(latencies)}
+    return {"sizes": results}
+
+
+def bench_recall(sizes: list, min_recall: float, queries: int = 100) -> dict:
+    """
+    recall@3 of IVFIndex.search against exact cosine top-3. A hit is any
+    result at least as similar as the exact third-best, so ties between
+    identical synthetic profiles don't count as misses.
+    """
+    from semantic_search import embed_texts, IVFIndex, ANN_NPROBE
+    results, checks = {}, {}
+    query_texts = [q for q, _ in synthetic_queries(queries)]
+    for size in [s for s in sizes if s >= 100]:
+        started = time.perf_counter()
+        vectors = synthetic_vectors(size)
+        embed = time.perf_counter() - started
+        started = time.perf_counter()
+        ann = IVFIndex.build(vectors)
+        build = time.perf_counter() - started
+        hits, ann_times, exact_times = 0, [], []
+        for query in embed_texts(query_texts):
+            started = time.perf_counter()
+            sims = vectors @ query
+            cutoff = sims[np.argpartition(-sims, 2)[:3]].min()
+            exact_times.append(time.perf_counter() - started)
+            started = time.perf_counter()
+            ids, _ = ann.search(query, 3)
+            ann_times.append(time.perf_counter() - started)
+            hits += int((sims[ids] >= cutoff - 1e-6).sum())
+        recall = hits / (3 * queries)
+        results[str(size)] = {
+            "recall_at_3": round(recall, 3), "nprobe": ANN_NPROBE, "lists": len(ann.centroids),
+            "embed_seconds": round(embed, 2), "build_seconds": round(build, 2),
+            "ann_ms": percentiles(ann_times), "brute_force_ms": percentiles(exact_times),
+        }
+        checks[f"recall_at_3_{size}"] = recall >= min_recall
+    return {"sizes": results, "checks": checks}
+
+
+def _heap_bytes(build) -> tuple:
+    """(object built by build(), Python heap bytes it holds), via tracemalloc."""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    value = build()
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return value, after - before
+
+
+def bench_catalog(size: int) -> dict:
+    from catalog import read_source, load_version, map_version
+    from catalog_pack import ensure_pack, pack_path_for
+    with tempfile.TemporaryDirectory(prefix="clarity_catalog_") as folder:
+        path = os.path.join(folder, "mentor_knowledge_base.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(synthetic_mentors(size), f, ensure_ascii=False)
+        ensure_pack(path)  # built once up front; map_version below only maps it
+        per_mentor = {}
+        for name, build in (
+            ("json_dicts", lambda: json.load(open(path, encoding="utf-8"))),
+            ("records", lambda: read_source(path)[1]),
+            ("version", lambda: load_version(path)),
+            ("mapped_version", lambda: map_version(path)),
+        ):
+            value, heap = _heap_bytes(build)
+            per_mentor[name] = round(heap / size)
+            del value
+        pack_bytes = os.path.getsize(pack_path_for(path))
+    return {
+        "mentors": size,
+        "heap_bytes_per_mentor": per_mentor,
+        "pack_file_bytes_per_mentor": round(pack_bytes / size),
+        "checks": {"mapped_version_smaller_than_loaded": per_mentor["mapped_version"] < per_mentor["version"]},
+    }
+
+
+def render_docx_baseline(fields: dict, stream):
+    """
+    The python-docx renderer the compiled template replaced (building the
+    document paragraph by paragraph on every render), kept as the baseline.
+    """
+    from docx import Document
+    from docx.shared import Pt
+    from docx.enum.text import WD_ALIGN_PARAGRAPH
+    doc = Document()
+    title = doc.add_heading("🎯 Mentor Context Pack", 0)
+    title.alignment = WD_ALIGN_PARAGRAPH.CENTER
+    doc.add_paragraph(f"Generated: {fields['generated']}")
+    doc.add_paragraph(f"Category: {fields['category']}")
+    doc.add_paragraph("─" * 50)
+    doc.add_heading("Problem Summary", level=1)
+    doc.add_paragraph(fields["user_summary"])
+    doc.add_heading("Key Insights", level=1)
+    for i, insight in enumerate(fields["insights"], 1):
+        doc.add_paragraph(f"{i}. {insight}", style="List Number")
+    if fields["metrics"]:
+        doc.add_heading("Key Metrics", level=1)
+        for key, value in fields["metrics"].items():
+            doc.add_paragraph(f"• {key}: {value}")
+    doc.add_heading("Questions for Mentor to Address", level=1)
+    for q in fields["questions_for_mentor"]:
+        doc.add_paragraph(f"• {q}")
+    doc.add_paragraph("─" * 50)
+    footer = doc.add_paragraph("Powered by ClarityOS | ExpertBells")
+    footer.runs[0].font.size = Pt(10)
+    doc.save(stream)
+
+
+def bench_docx(renders: int = 300) -> dict:
+    from document_generator import get_template, render_preview_text
+    fields = {
+        "generated": "January 01, 2026 at 09:00 AM",
+        "category": "Growth",
+        "user_summary": "D2C skincare brand at $30k MRR with 40% first-month churn",
+        "insights": ["Churn is concentrated in the first 30 days", "Email re-engagement has not moved retention"],
+        "metrics": {"MRR": "$30k", "Churn": "40%", "CAC": "$38"},
+        "questions_for_mentor": ["How do I diagnose early churn?", "Which retention levers come first?"],
+    }
+    compile_seconds = _timed(get_template)
+    template = get_template()
+    started = time.perf_counter()
+    for _ in range(renders):
+        template.render_docx(fields, io.BytesIO())
+    docx_seconds = time.perf_counter() - started
+    render_docx_baseline(fields, io.BytesIO())  # python-docx imports and loads its default template once
+    started = time.perf_counter()
+    for _ in range(renders):
+        render_docx_baseline(fields, io.BytesIO())
+    baseline_seconds = time.perf_counter() - started
+    preview_fields = {k: v for k, v in fields.items() if k != "generated"}
+    started = time.perf_counter()
+    for _ in range(renders):
+        render_preview_text(**preview_fields)
+    preview_seconds = time.perf_counter() - started
+    return {
+        "renders": renders,
+        "template_compile_seconds": round(compile_seconds, 3),
+        "docx_per_second": round(renders / docx_seconds, 1),
+        "baseline_docx_per_second": round(renders / baseline_seconds, 1),
+        "speedup": round(baseline_seconds / docx_seconds, 1),
+        "preview_per_second": round(renders / preview_seconds, 1),
+        "checks": {"compiled_faster_than_baseline": docx_seconds < baseline_seconds},
+    }
+
+
+# Numbers Python's json accepts that don't fit an int field
+EXTREME_NUMBERS = ("1e999", "-1e999", "NaN", "Infinity", "-Infinity", '"Infinity"', '"nan"', "1" + "0" * 400)
+NUMBER_PATTERN = re.compile(r"-?\d+(?:\.\d+)?")
+
+
+def _mutate(text: str, rng: random.Random) -> str:
+    kind = rng.randrange(5)
+    if kind == 4:
+        numbers = list(NUMBER_PATTERN.finditer(text))
+        if numbers:  # a number swapped for an extreme value
+            match = rng.choice(numbers)
+            return text[:match.start()] + rng.choice(EXTREME_NUMBERS) + text[match.end():]
+        kind = rng.randrange(4)
+    i = rng.randrange(len(text) + 1)
+    if kind == 0:
+        return text[:i]  # cut off mid-stream
+    if kind == 1:
+        return text[:i] + text[i + rng.randint(1, 8):]  # dropped characters
+    if kind == 2:
+        return text[:i] + rng.choice('{}[]",:\\`') + text[i:]  # stray structural character
+    return text[:i] + text[rng.randrange(len(text) + 1):]  # spliced fragments
+
+
+def bench_parser(fuzz: int = 3000, seed: int = 0) -> dict:
+    from llm_parser import parse_llm_json, DIAGNOSIS_SCHEMA, SCRIBE_SCHEMA
+    schemas = {"diagnosis": DIAGNOSIS_SCHEMA, "scribe": SCRIBE_SCHEMA}
+    with open(LLM_OUTPUTS_PATH, "r", encoding="utf-8") as f:
+        outputs = json.load(f)
+
+    parsed, failed, times = 0, [], []
+    for case in outputs:
+        started = time.perf_counter()
+        data, _ = parse_llm_json(case["text"], schemas[case["schema"]])
+        times.append(time.perf_counter() - started)
+        if case["schema"] == "diagnosis":
+            ok = data is not None and data.get("reply") == case["reply"]
+        else:
+            ok = data is not None and bool(data.get("action_plan")) and data["action_plan"][0]["task"] == case["task"]
+        parsed += ok
+        if not ok:
+            failed.append(case["name"])
+
+    rng = random.Random(seed)
+    exceptions = []
+    for _ in range(fuzz):
+        case = rng.choice(outputs)
+        text = _mutate(case["text"], rng)
+        try:
+            parse_llm_json(text, schemas[case["schema"]])
+        except Exception as e:
+            exceptions.append(f"{type(e).__name__}: {e} <- {text[:80]!r}")
+    return {
+        "recorded": len(outputs),
+        "success_rate": round(parsed / len(outputs), 3),
+        "failed": failed,
+        "parse_ms": percentiles(times),
+        "fuzz_cases": fuzz,
+        "fuzz_exceptions": len(exceptions),
+        "fuzz_examples": exceptions[:5],
+        "checks": {"all_recorded_outputs_parse": not failed, "fuzz_never_raises": not exceptions},
+    }
+
+
+def _import_profile() -> list:
+    """(module, self_us, cumulative_us) rows of a cold `import backend`."""
+    env = dict(os.environ, LOG_LEVEL="ERROR")
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import backend"],
+                            cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+    rows = []
+    for line in result.stderr.splitlines():
+        if line.startswith("import time:") and "|" in line and "self [us]" not in line:
+            own, cumulative, name = line[len("import time:"):].split("|")
+            rows.append((name.strip(), int(own), int(cumulative)))
+    return rows
+
+
+def bench_imports(budget_ms: float, runs: int = 3) -> dict:
+    profiles = [_import_profile() for _ in range(runs)]
+    totals = [next(c for name, _, c in rows if name == "backend") for rows in profiles]
+    best = profiles[totals.index(min(totals))]
+    loaded = {name for name, _, _ in best}
+    deferred = [m for m in DEFERRED_MODULES if m in loaded]
+    top = sorted(((c, name) for name, _, c in best if "." not in name and name != "backend"), reverse=True)[:8]
+    return {
+        "backend_import_ms": round(min(totals) / 1000, 1),
+        "budget_ms": budget_ms,
+        "slowest_top_level_ms": {name: round(c / 1000, 1) for c, name in top},
+        "deferred_modules_imported": deferred,
+        "checks": {"import_within_budget": min(totals) / 1000 <= budget_ms, "heavy_modules_deferred": not deferred},
+    }
+
+
+def bench_instrumentation(requests: int = 2000, log_lines: int = 20000) -> dict:
+    import logging
+    import httpx
+    from fastapi import FastAPI
+    from metrics import MetricsMiddleware, stage
+    from structured_logging import JsonFormatter
+
+    def make_app(instrumented: bool):
+        app = FastAPI()
+
+        @app.get("/ping")
+        def ping():
+            with stage("work"):
+                pass
+            return {"ok": True}
+
+        if instrumented:
+            app.add_middleware(MetricsMiddleware)
+        return app
+
+    async def per_request(app) -> float:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            for _ in range(50):
+                await client.get("/ping")
+            started = time.perf_counter()
+            for _ in range(requests):
+                await client.get("/ping")
+            return (time.perf_counter() - started) / requests
+
+    # Alternate the two apps and keep the best round of each, to damp noise
+    plain, instrumented = [], []
+    for _ in range(3):
+        plain.append(asyncio.run(per_request(make_app(False))))
+        instrumented.append(asyncio.run(per_request(make_app(True))))
+
+    logger = logging.getLogger("benchmarks.instrumentation")
+    logger.propagate = False
+    handler = logging.StreamHandler(io.StringIO())
+    handler.setFormatter(JsonFormatter())
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    started = time.perf_counter()
+    for i in range(log_lines):
+        logger.info("Benchmark line", extra={"stage": "llm_call", "attempt": i})
+    log_seconds = time.perf_counter() - started
+    logger.removeHandler(handler)
+
+    return {
+        "request_us": {"plain": round(min(plain) * 1e6, 1), "instrumented": round(min(instrumented) * 1e6, 1)},
+        "middleware_overhead_us": round((min(instrumented) - min(plain)) * 1e6, 1),
+        "json_log_line_us": round(log_seconds / log_lines * 1e6, 2),
+    }
+
+
+def bench_scribe(transcripts: int, concurrency: int, latency: float) -> dict:
+    rng = random.Random(7)
+    lines = ["Mentor: What moved churn last month?", "Founder: Onboarding calls helped a little.",
+             "Mentor: Call ten churned customers by Friday.", "Founder: We can also test an annual plan."]
+    with tempfile.TemporaryDirectory(prefix="clarity_scribe_") as folder:
+        source, output = os.path.join(folder, "transcripts.jsonl"), os.path.join(folder, "plans.jsonl")
+        with open(source, "w", encoding="utf-8") as f:
+            for i in range(transcripts):
+                transcript = "\n".join(rng.choice(lines) for _ in range(rng.randint(20, 400)))
+                f.write(json.dumps({"id": f"t{i}", "transcript": f"Session {i}\n{transcript}"}) + "\n")
+        with stub_llm(latency=latency) as llm_url:
+            env = dict(os.environ, NVIDIA_API_KEY="stub", NVIDIA_BASE_URL=llm_url,
+                       LLM_CACHE_ENABLED="false", LOG_LEVEL="ERROR")
+            result = subprocess.run(
+                [sys.executable, "-m", "session_scribe", source, output, "--concurrency", str(concurrency)],
+                cwd=ROOT, env=env, capture_output=True, text=True, check=True
+            )
+    import ast
+    stats = ast.literal_eval(result.stdout.strip().rsplit("Scribe batch done: ", 1)[1])
+    return {
+        "transcripts": transcripts, "concurrency": concurrency, "stub_latency": latency, **stats,
+        "checks": {"no_failed_transcripts": stats["failed"] == 0 and stats["processed"] == transcripts},
+    }
+
+
+SECTIONS = ("search", "recall", "catalog", "docx", "parser", "imports", "instrumentation", "scribe")
+
+
+def run(args) -> dict:
+    runners = {
+        "search": lambda: bench_search(args.sizes),
+        "recall": lambda: bench_recall(args.recall_sizes, args.min_recall),
+        "catalog": lambda: bench_catalog(args.catalog_size),
+        "docx": lambda: bench_docx(args.docx_renders),
+        "parser": lambda: bench_parser(args.fuzz),
+        "imports": lambda: bench_imports(args.import_budget_ms),
+        "instrumentation": lambda: bench_instrumentation(),
+        "scribe": lambda: bench_scribe(args.transcripts, args.scribe_concurrency, args.latency),
+    }
+    results = {}
+    for name in args.only or SECTIONS:
+        started = time.perf_counter()
+        results[name] = runners[name]()
+        results[name]["section_seconds"] = round(time.perf_counter() - started, 2)
+    return results
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Component benchmarks and their checks")
+    parser.add_argument("--only", nargs="+", choices=SECTIONS, help="sections to run (default: all)")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[5, 1000, 10000, 100000], help="catalog sizes for search")
+    parser.add_argument("--recall-sizes", type=int, nargs="+", default=[10000, 100000, 1000000],
+                        help="synthetic vector counts for recall")
+    parser.add_argument("--min-recall", type=float, default=0.9, help="recall@3 the ANN index must reach")
+    parser.add_argument("--catalog-size", type=int, default=100000, help="mentors for the memory measurement")
+    parser.add_argument("--docx-renders", type=int, default=300, help="renders per .docx renderer")
+    parser.add_argument("--fuzz", type=int, default=3000, help="random parser inputs")
+    parser.add_argument("--import-budget-ms", type=float, default=1500, help="cold `import backend` budget")
+    parser.add_argument("--transcripts", type=int, default=200, help="scribe batch size")
+    parser.add_argument("--scribe-concurrency", type=int, default=16)
+    parser.add_argument("--latency", type=float, default=0.2, help="stub seconds per call (scribe)")
+    parser.add_argument("--output", help="write JSON results here")
+    args = parser.parse_args()
+    results = run(args)
+    write_results("micro", {"sections": results}, args.output)
+    if not all(all(section.get("checks", {}).values()) for section in results.values()):
+        sys.exit(1)
@@ -0,0 +1,106 @@
+"""
+Overload Benchmark for ClarityOS
+Goodput of /chat/message when offered load exceeds what the LLM upstream
+can serve, with and without admission control.
+
+A capacity-limited stub LLM (default 8 concurrent x 0.5 s = 16 calls/s)
+is driven by closed-loop users: one in five is finalizing a document
+(7-message history), the rest are on their first turn. Goodput counts
+replies that arrive within the SLO; a 503 sends the user away for its
+Retry-After before trying again.
+
+Modes:
+    unbounded  - the pre-admission behaviour: a fixed limit of
+                 LLM_MAX_CONCURRENCY, no deadline, an unbounded queue
+    admission  - the defaults: adaptive limit, priorities, deadlines
+
+Usage:
+    python -m benchmarks.overload --users 120 --duration 30 --output overload.json
+"""
+import time
+import asyncio
+import itertools
+import httpx
+from benchmarks.harness import stub_llm, backend, wait_ready, percentiles, write_results
+
+MODES = {
+    "unbounded": {"LLM_MIN_CONCURRENCY": "32", "LLM_MAX_CONCURRENCY": "32",
+                  "CHAT_DEADLINE_SECONDS": "100000", "LLM_MAX_QUEUE": "1000000"},
+    "admission": {},
+}
+FINALIZE_SHARE = 5  # every 5th user is finalizing
+
+
+async def drive(base_url: str, users: int, duration: float, slo: float, deadline: float) -> dict:
+    outcomes = {"finalize": [], "gather": []}
+    counter = itertools.count()
+
+    async def user(i, client, end):
+        kind = "finalize" if i % FINALIZE_SHARE == 0 else "gather"
+        while time.monotonic() < end:
+            n = next(counter)  # unique text: no LLM cache hits
+            history = [{"role": "user", "content": f"Turn {k} of conversation {n}"}
+                       for k in range(7 if kind == "finalize" else 1)]
+            started = time.monotonic()
+            try:
+                response = await client.post("/chat/message", json={"history": history}, timeout=deadline * 3)
+            except httpx.TimeoutException:
+                outcomes[kind].append(("timeout", time.monotonic() - started))
+                continue
+            except httpx.TransportError:
+                outcomes[kind].append(("error", time.monotonic() - started))
+                continue
+            elapsed = time.monotonic() - started
+            if response.status_code == 503:
+                outcomes[kind].append(("rejected", elapsed))
+                await asyncio.sleep(float(response.headers.get("retry-after", 1)))
+            elif response.status_code != 200 or "trouble processing" in response.json()["reply"]:
+                outcomes[kind].append(("error", elapsed))
+            else:
+                outcomes[kind].append(("good" if elapsed <= slo else "late", elapsed))
+
+    async with httpx.AsyncClient(base_url=base_url, limits=httpx.Limits(max_connections=users + 10)) as client:
+        await wait_ready(client)
+        end = time.monotonic() + duration
+        await asyncio.gather(*[user(i, client, end) for i in range(users)])
+
+    summary = {}
+    for kind, rows in outcomes.items():
+        counts = {}
+        for outcome, _ in rows:
+            counts[outcome] = counts.get(outcome, 0) + 1
+        summary[kind] = {
+            "outcomes": counts,
+            "goodput_per_second": round(counts.get("good", 0) / duration, 2),
+            "good_latency_ms": percentiles([t for o, t in rows if o == "good"]),
+            "rejected_latency_ms": percentiles([t for o, t in rows if o == "rejected"]),
+        }
+    summary["goodput_per_second"] = round(sum(s["goodput_per_second"] for s in summary.values()), 2)
+    return summary
+
+
+def run(mode: str, users: int, duration: float, slo: float, latency: float, capacity: int) -> dict:
+    env = dict(MODES[mode])
+    env.setdefault("CHAT_DEADLINE_SECONDS", str(slo))
+    with stub_llm(latency=latency, capacity=capacity) as llm_url:
+        with backend(llm_url, env) as (base_url, _):
+            return asyncio.run(drive(base_url, users, duration, slo, float(env["CHAT_DEADLINE_SECONDS"])))
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Goodput of /chat/message under upstream overload")
+    parser.add_argument("--mode", choices=[*MODES, "both"], default="both")
+    parser.add_argument("--users", type=int, default=120, help="closed-loop users")
+    parser.add_argument("--duration", type=float, default=30, help="seconds per mode")
+    parser.add_argument("--slo", type=float, default=5.0, help="seconds a reply may take to count as good")
+    parser.add_argument("--latency", type=float, default=0.5, help="stub seconds per call")
+    parser.add_argument("--capacity", type=int, default=8, help="stub calls served at once")
+    parser.add_argument("--output", help="write JSON results here")
+    args = parser.parse_args()
+    modes = list(MODES) if args.mode == "both" else [args.mode]
+    write_results("overload", {
+        "config": {"users": args.users, "duration": args.duration, "slo": args.slo,
+                   "stub_latency": args.latency, "stub_capacity": args.capacity},
+        "modes": {mode: run(mode, args.users, args.duration, args.slo, args.latency, args.capacity) for mode in modes}
+    }, args.output)
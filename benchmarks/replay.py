@@ -0,0 +1,324 @@
+"""
+Replay Benchmark for ClarityOS
+Replays recorded diagnosis conversations (benchmarks/data/conversations.json)
+against the real backend, running on the stub LLM and the in-process
+fake graph, at a configurable concurrency.
+
+Each session uploads its sample file (PDF / DOCX / PPTX / XLSX / CSV,
+see samples.py) into a new session, sends the 7 recorded turns (the last
+one finalizes the Mentor Context Pack), sends one more "looks good" to
+check that finalizing again reuses the render job, and polls the job
+until the .docx is ready.
+
+Reports throughput, latency percentiles per endpoint, time to first token
+(--stream), request bytes and LLM tokens per turn, and the RSS of the
+backend's process tree (uvicorn workers plus the extraction and render
+pools), as JSON stamped with the git revision so runs can be compared
+across commits. Correctness checks (every session finalized, one document
+per session, repeat finalizations reuse their job, no errors) make the
+command exit non-zero when they fail.
+
+Usage:
+    python -m benchmarks.replay --sessions 60 --concurrency 12 --output replay.json
+    python -m benchmarks.replay --stream                       # SSE endpoint, time to first token
+    python -m benchmarks.replay --history                      # legacy full-history payloads
+    python -m benchmarks.replay --workers 1 4 16 --catalog-size 100000 --env CATALOG_MMAP=true   # RSS per worker count
+
+--catalog-size N serves a synthetic N-mentor catalog (with its embedding
+index) written to a scratch directory, instead of mentor_knowledge_base.json.
+"""
+import os
+import json
+import time
+import asyncio
+import tempfile
+import httpx
+from benchmarks.harness import stub_llm, backend, wait_ready, percentiles, memory_usage, write_results
+from benchmarks.samples import sample_uploads
+
+CONVERSATIONS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "conversations.json")
+REPEAT_FINALIZE = "Looks good"
+JOB_POLL_INTERVAL = 0.05
+JOB_TIMEOUT = 60.0
+# Every worker loads (or maps) the catalog before /readyz passes
+READY_TIMEOUT = 300.0
+
+
+def load_conversations(path: str = CONVERSATIONS_PATH) -> list:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+class Recorder:
+    """Latencies and errors per endpoint, plus per-turn payload sizes."""
+
+    def __init__(self, workers: int = 1):
+        self.workers = workers
+        self.latencies = {}
+        self.errors = {}
+        self.other_worker_polls = 0
+        self.ttfb = []
+        self.document_ready = []
+        self.request_bytes = []
+        self.response_bytes = []
+        self.failures = []
+
+    def add(self, endpoint: str, seconds: float, ok: bool = True):
+        self.latencies.setdefault(endpoint, []).append(seconds)
+        if not ok:
+            self.errors[endpoint] = self.errors.get(endpoint, 0) + 1
+
+    def fail(self, session: int, reason: str):
+        self.failures.append(f"session {session}: {reason}")
+
+    def endpoints(self) -> dict:
+        return {
+            endpoint: {"count": len(values), "errors": self.errors.get(endpoint, 0), **percentiles(values)}
+            for endpoint, values in sorted(self.latencies.items())
+        }
+
+
+# --- ONE SESSION ---
+
+async def upload(client, recorder: Recorder, path: str, trailer: bytes) -> dict:
+    with open(path, "rb") as f:
+        data = f.read() + trailer
+    started = time.monotonic()
+    response = await client.post("/upload", files={"file": (os.path.basename(path), data)}, data={"session_id": "new"})
+    recorder.add("POST /upload", time.monotonic() - started, response.status_code == 200)
+    response.raise_for_status()
+    return response.json()
+
+
+async def chat_turn(client, recorder: Recorder, body: dict, stream: bool) -> dict:
+    payload = json.dumps(body).encode("utf-8")
+    recorder.request_bytes.append(len(payload))
+    headers = {"content-type": "application/json"}
+    started = time.monotonic()
+    if not stream:
+        response = await client.post("/chat/message", content=payload, headers=headers)
+        recorder.add("POST /chat/message", time.monotonic() - started, response.status_code == 200)
+        response.raise_for_status()
+        recorder.response_bytes.append(len(response.content))
+        return response.json()
+
+    done, size, first = None, 0, None
+    async with client.stream("POST", "/chat/message/stream", content=payload, headers=headers) as response:
+        if response.status_code != 200:
+            recorder.add("POST /chat/message/stream", time.monotonic() - started, False)
+            response.raise_for_status()
+        event = None
+        async for line in response.aiter_lines():
+            size += len(line) + 1
+            if line.startswith("event: "):
+                event = line[7:]
+                if first is None:
+                    first = time.monotonic() - started
+            elif line.startswith("data: ") and event == "done":
+                done = json.loads(line[6:])
+    recorder.add("POST /chat/message/stream", time.monotonic() - started, done is not None)
+    recorder.ttfb.append(first if first is not None else time.monotonic() - started)
+    recorder.response_bytes.append(size)
+    if done is None:
+        raise RuntimeError("stream ended without a done event")
+    return done
+
+
+async def wait_for_document(client, recorder: Recorder, job_id: str, finalized_at: float) -> dict:
+    deadline = time.monotonic() + JOB_TIMEOUT
+    while time.monotonic() < deadline:
+        started = time.monotonic()
+        # Render jobs are tracked by the worker that queued them: with several
+        # workers, poll on a new connection each time until one reaches it
+        headers = {"Connection": "close"} if recorder.workers > 1 else None
+        response = await client.get(f"/documents/jobs/{job_id}", headers=headers)
+        if response.status_code == 404 and recorder.workers > 1:
+            recorder.other_worker_polls += 1
+            await asyncio.sleep(JOB_POLL_INTERVAL)
+            continue
+        recorder.add("GET /documents/jobs/{id}", time.monotonic() - started, response.status_code == 200)
+        job = response.json()
+        if job.get("status") in ("done", "failed"):
+            recorder.document_ready.append(time.monotonic() - finalized_at)
+            return job
+        await asyncio.sleep(JOB_POLL_INTERVAL)
+    raise TimeoutError(f"document job {job_id} not finished after {JOB_TIMEOUT}s")
+
+
+async def replay_session(client, recorder: Recorder, number: int, conversation: dict, samples: dict,
+                         stream: bool, history_mode: bool, identical_uploads: bool) -> dict:
+    """Run one recorded conversation; returns {"finalized", "job_id", "reused_job"}."""
+    session_id, file_context, history = None, None, []
+    if conversation.get("upload"):
+        trailer = b"" if identical_uploads else f"\n% replay session {number}\n".encode("ascii")
+        uploaded = await upload(client, recorder, samples[conversation["upload"]], trailer)
+        session_id, file_context = uploaded["session_id"], uploaded["content"]
+
+    reply = None
+    for message in conversation["turns"] + [REPEAT_FINALIZE]:
+        if history_mode:
+            history.append({"role": "user", "content": message})
+            body = {"history": history, "file_context": file_context}
+        else:
+            body = {"session_id": session_id, "message": message}
+        previous, reply = reply, await chat_turn(client, recorder, body, stream)
+        session_id = reply.get("session_id", session_id)
+        if history_mode:
+            history.append({"role": "bot", "content": reply["reply"]})
+        if reply.get("document_job_id") and previous is not None and not previous.get("document_job_id"):
+            finalized_at = time.monotonic()
+
+    first_job = previous.get("document_job_id")
+    result = {
+        "finalized": previous.get("conversation_state") == "finalized" and bool(previous.get("cards")),
+        "job_id": first_job,
+        "reused_job": first_job is not None and reply.get("document_job_id") == first_job,
+    }
+    if first_job:
+        job = await wait_for_document(client, recorder, first_job, finalized_at)
+        if job["status"] != "done":
+            recorder.fail(number, f"document job failed: {job.get('error')}")
+    return result
+
+
+# --- RUN ---
+
+async def drive(base_url: str, llm_url: str, sessions: int, concurrency: int, stream: bool,
+                history_mode: bool, identical_uploads: bool, workers: int = 1) -> dict:
+    conversations = load_conversations()
+    samples = sample_uploads()
+    recorder = Recorder(workers)
+    results = []
+    gate = asyncio.Semaphore(concurrency)
+    stats_url = llm_url.rsplit("/v1", 1)[0] + "/stats"
+
+    async def run(number: int):
+        async with gate:
+            try:
+                results.append(await replay_session(
+                    client, recorder, number, conversations[number % len(conversations)], samples,
+                    stream, history_mode, identical_uploads
+                ))
+            except Exception as e:
+                recorder.fail(number, f"{type(e).__name__}: {e}")
+
+    limits = httpx.Limits(max_connections=concurrency + 10)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=120) as client:
+        await wait_ready(client, timeout=READY_TIMEOUT, parsers=True)
+        llm_before = (await client.get(stats_url)).json()
+        started = time.monotonic()
+        await asyncio.gather(*[run(i) for i in range(sessions)])
+        seconds = time.monotonic() - started
+        llm_after = (await client.get(stats_url)).json()
+        upload_cache = (await client.get("/upload/cache")).json()
+
+    turns = len(recorder.request_bytes)
+    requests = sum(len(v) for v in recorder.latencies.values())
+    llm_calls = llm_after["requests"] - llm_before["requests"]
+    job_ids = [r["job_id"] for r in results if r["job_id"]]
+    checks = {
+        "sessions_completed": len(results) == sessions,
+        "all_finalized": len(results) == sessions and all(r["finalized"] for r in results),
+        "repeat_finalize_reused_job": len(results) == sessions and all(r["reused_job"] for r in results),
+        "no_errors": not recorder.errors and not recorder.failures,
+    }
+    if not history_mode:
+        # Without a session, identical packs share one file by design
+        checks["one_document_per_session"] = len(set(job_ids)) == sessions
+    summary = {
+        "seconds": round(seconds, 2),
+        "sessions": {"completed": len(results), "failed": sessions - len(results)},
+        "throughput": {
+            "sessions_per_second": round(len(results) / seconds, 2),
+            "turns_per_second": round(turns / seconds, 2),
+            "requests_per_second": round(requests / seconds, 2),
+        },
+        "latency_ms": recorder.endpoints(),
+        "document_ready_ms": percentiles(recorder.document_ready),
+        "per_turn": {
+            "request_bytes": round(sum(recorder.request_bytes) / max(turns, 1)),
+            "response_bytes": round(sum(recorder.response_bytes) / max(turns, 1)),
+            "llm_calls": round(llm_calls / max(turns, 1), 2),
+            "prompt_tokens": round((llm_after["prompt_tokens"] - llm_before["prompt_tokens"]) / max(llm_calls, 1)),
+            "completion_tokens": round((llm_after["completion_tokens"] - llm_before["completion_tokens"]) / max(llm_calls, 1)),
+        },
+        "upload_cache": upload_cache,
+        "checks": checks,
+        "failures": recorder.failures[:20],
+    }
+    if stream:
+        summary["time_to_first_event_ms"] = percentiles(recorder.ttfb)
+    if workers > 1:
+        summary["job_polls_on_other_worker"] = recorder.other_worker_polls
+    return summary
+
+
+def write_catalog(size: int, directory: str) -> str:
+    """A synthetic `size`-mentor catalog plus its embedding index in `directory`; returns its path."""
+    from benchmarks.micro import synthetic_mentors
+    from semantic_search import build_embedding_index
+    path = os.path.join(directory, "mentor_knowledge_base.json")
+    mentors = synthetic_mentors(size)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(mentors, f, ensure_ascii=False)
+    build_embedding_index(mentors, path)
+    return path
+
+
+def run(sessions: int, concurrency: int, workers: int, stream: bool, history_mode: bool,
+        identical_uploads: bool, latency: float, token_delay: float, env: dict) -> dict:
+    with tempfile.TemporaryDirectory(prefix="clarity_replay_") as scratch:
+        backend_env = {
+            # Recorded conversations repeat across sessions: every turn should reach the LLM
+            "LLM_CACHE_ENABLED": "false",
+            # Measure uploads against warm extraction workers, as in production
+            "EXTRACTION_PREWARM": "true",
+            "EXTRACTION_CACHE_DIR": os.path.join(scratch, "extraction_cache"),
+            **env
+        }
+        if workers > 1:
+            # Consecutive turns of a session land on different workers
+            backend_env.setdefault("SESSION_STORE", "sqlite")
+            backend_env.setdefault("SESSION_DB_PATH", os.path.join(scratch, "sessions.db"))
+        with stub_llm(latency=latency, token_delay=token_delay) as llm_url:
+            with backend(llm_url, backend_env, workers=workers, app="benchmarks.serve:app") as (base_url, process):
+                summary = asyncio.run(drive(base_url, llm_url, sessions, concurrency, stream,
+                                            history_mode, identical_uploads, workers))
+                summary["memory"] = memory_usage(process.pid)
+    return {"workers": workers, **summary}
+
+
+if __name__ == "__main__":
+    import sys
+    import argparse
+    parser = argparse.ArgumentParser(description="Replay recorded diagnosis conversations against the backend")
+    parser.add_argument("--sessions", type=int, default=60, help="conversations to replay")
+    parser.add_argument("--concurrency", type=int, default=12, help="sessions in flight")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1], help="uvicorn worker counts (one run each)")
+    parser.add_argument("--stream", action="store_true", help="use /chat/message/stream and report time to first event")
+    parser.add_argument("--history", action="store_true", help="send the full history each turn instead of a session_id")
+    parser.add_argument("--identical-uploads", action="store_true",
+                        help="upload identical bytes in every session (extraction cache hits)")
+    parser.add_argument("--latency", type=float, default=0.2, help="stub seconds per call")
+    parser.add_argument("--token-delay", type=float, default=0.0, help="stub seconds per output token")
+    parser.add_argument("--catalog-size", type=int, default=0,
+                        help="serve a synthetic catalog of this many mentors (default: mentor_knowledge_base.json)")
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE", help="extra backend environment")
+    parser.add_argument("--output", help="write JSON results here")
+    args = parser.parse_args()
+
+    env = dict(item.split("=", 1) for item in args.env)
+    with tempfile.TemporaryDirectory(prefix="clarity_catalog_") as catalog_dir:
+        if args.catalog_size:
+            env.setdefault("MENTOR_DB_PATH", write_catalog(args.catalog_size, catalog_dir))
+        runs = [run(args.sessions, args.concurrency, workers, args.stream, args.history, args.identical_uploads,
+                    args.latency, args.token_delay, env) for workers in args.workers]
+    write_results("replay", {
+        "config": {"sessions": args.sessions, "concurrency": args.concurrency, "stream": args.stream,
+                   "history": args.history, "identical_uploads": args.identical_uploads,
+                   "catalog_size": args.catalog_size or None,
+                   "stub_latency": args.latency, "stub_token_delay": args.token_delay, "env": env},
+        "runs": runs
+    }, args.output)
+    if not all(all(r["checks"].values()) for r in runs):
+        sys.exit(1)
@@ -0,0 +1,175 @@
+"""
+Sample Uploads for ClarityOS benchmarks
+Deterministic PDF / DOCX / PPTX / XLSX / CSV files shaped like what
+founders upload: a pitch memo, a board update, a pitch deck and a
+metrics workbook.
+
+Files are generated on first use into benchmarks/data/uploads/ (not
+committed) and are byte-for-byte identical across runs, except for the
+zip timestamps inside Office files. Every file contains SAMPLE_MARKER so
+tests can check that extraction found the text.
+
+Usage:
+    python -m benchmarks.samples            # (re)generate and list the files
+"""
+import os
+import csv
+import random
+import datetime
+
+SAMPLES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "uploads")
+SAMPLE_MARKER = "ClarityOS benchmark sample"
+
+PDF_PAGES = 20
+DOCX_PARAGRAPHS = 300
+PPTX_SLIDES = 20
+TABLE_ROWS = 5000
+
+SENTENCES = [
+    "Monthly recurring revenue grew from $18k to $30k over the last two quarters.",
+    "Churn in the first 30 days is 40% and has not moved with email re-engagement.",
+    "Customer acquisition cost on paid social rose 35% after the iOS privacy changes.",
+    "We are raising a $1.5M seed round to extend runway to 24 months.",
+    "Retail partnerships in Bengaluru and Pune account for a quarter of orders.",
+    "The subscription tier converts at 6% from trial, against 11% for competitors.",
+    "Gross margin is 58% after fulfilment and payment fees.",
+    "Two enterprise pilots are in procurement and could close next quarter.",
+]
+
+SLIDE_TITLES = ["Problem", "Solution", "Market", "Traction", "Business Model",
+                "Competition", "Go-to-market", "Team", "Financials", "The Ask"]
+
+REGIONS = ["North", "South", "East", "West"]
+
+
+def _paragraphs(count: int, seed: int) -> list:
+    rng = random.Random(seed)
+    return [" ".join(rng.sample(SENTENCES, 3)) for _ in range(count)]
+
+
+# --- WRITERS ---
+
+def _pdf_text(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def write_pdf(path: str, pages: int = PDF_PAGES):
+    """A text PDF written by hand (one Helvetica content stream per page); no PDF library needed."""
+    paragraphs = _paragraphs(pages * 6, seed=1)
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None, "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for page in range(pages):
+        lines = [f"{SAMPLE_MARKER} - pitch memo, page {page + 1}"]
+        for paragraph in paragraphs[page * 6:(page + 1) * 6]:
+            words, line = paragraph.split(), ""
+            for word in words:
+                if len(line) + len(word) > 90:
+                    lines.append(line)
+                    line = ""
+                line = f"{line} {word}".strip()
+            lines.append(line)
+        stream = "BT /F1 10 Tf 50 780 Td 13 TL " + " ".join(f"({_pdf_text(l)}) '" for l in lines) + " ET"
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                       f"/Resources << /Font << /F1 3 0 R >> >> /Contents {len(objects)} 0 R >>")
+        kids.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {pages} >>"
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n{body}\nendobj\n".encode("latin-1")
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode("latin-1")
+    out += "".join(f"{offset:010d} 00000 n \n" for offset in offsets).encode("latin-1")
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode("latin-1")
+    with open(path, "wb") as f:
+        f.write(out)
+
+
+def write_docx(path: str, paragraphs: int = DOCX_PARAGRAPHS):
+    import docx
+    document = docx.Document()
+    document.add_heading(f"{SAMPLE_MARKER} - board update", level=1)
+    for i, paragraph in enumerate(_paragraphs(paragraphs, seed=2)):
+        if i % 25 == 0:
+            document.add_heading(f"Section {i // 25 + 1}", level=2)
+        document.add_paragraph(paragraph)
+    document.save(path)
+
+
+def write_pptx(path: str, slides: int = PPTX_SLIDES):
+    from pptx import Presentation
+    presentation = Presentation()
+    layout = presentation.slide_layouts[1]  # title + content
+    bullets = _paragraphs(slides, seed=3)
+    for i in range(slides):
+        slide = presentation.slides.add_slide(layout)
+        slide.shapes.title.text = f"{SLIDE_TITLES[i % len(SLIDE_TITLES)]} ({SAMPLE_MARKER})"
+        slide.placeholders[1].text = bullets[i].replace(". ", ".\n")
+    presentation.save(path)
+
+
+def metric_rows(rows: int = TABLE_ROWS, seed: int = 4):
+    """(date, region, mrr, churn_pct, note) rows: MRR compounding ~1% a week with noise."""
+    rng = random.Random(seed)
+    start = datetime.date(2023, 1, 1)
+    mrr = 18000.0
+    for i in range(rows):
+        mrr *= 1 + rng.gauss(0.0015, 0.004)
+        yield (
+            (start + datetime.timedelta(days=i // 4)).isoformat(),
+            REGIONS[i % 4],
+            round(mrr / 4, 2),
+            f"{rng.uniform(2, 8):.1f}%",
+            SAMPLE_MARKER if i == 0 else ""
+        )
+
+
+def write_xlsx(path: str, rows: int = TABLE_ROWS):
+    import openpyxl
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet("Metrics")
+    sheet.append(["date", "region", "mrr", "churn_pct", "note"])
+    for row in metric_rows(rows):
+        sheet.append(list(row))
+    plan = workbook.create_sheet("Hiring plan")
+    plan.append(["role", "quarter", "cost"])
+    for i, role in enumerate(["Growth lead", "Backend engineer", "Designer", "Ops associate"]):
+        plan.append([role, f"Q{i % 4 + 1}", 24000 + 6000 * i])
+    workbook.save(path)
+
+
+def write_csv(path: str, rows: int = TABLE_ROWS):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["date", "region", "mrr", "churn_pct", "note"])
+        writer.writerows(metric_rows(rows))
+
+
+WRITERS = {
+    "pdf": ("pitch_memo.pdf", write_pdf),
+    "docx": ("board_update.docx", write_docx),
+    "pptx": ("pitch_deck.pptx", write_pptx),
+    "xlsx": ("metrics.xlsx", write_xlsx),
+    "csv": ("metrics.csv", write_csv),
+}
+
+
+def sample_uploads(directory: str = SAMPLES_DIR, refresh: bool = False) -> dict:
+    """{kind: path} of every sample, writing the missing ones."""
+    os.makedirs(directory, exist_ok=True)
+    paths = {}
+    for kind, (filename, write) in WRITERS.items():
+        path = os.path.join(directory, filename)
+        if refresh or not os.path.exists(path):
+            write(path + ".tmp")
+            os.replace(path + ".tmp", path)
+        paths[kind] = path
+    return paths
+
+
+if __name__ == "__main__":
+    for kind, path in sample_uploads(refresh=True).items():
+        print(f"{kind:5} {os.path.getsize(path):>9,} bytes  {path}")
@@ -0,0 +1,15 @@
+"""
+Benchmark Server for ClarityOS
+The backend app with FakeGraph installed as `database.db`. The fake is
+installed before backend is imported, so backend's `from database import db`
+binds to it. Every uvicorn worker imports this module and gets its own fake.
+
+Usage:
+    NVIDIA_BASE_URL=http://127.0.0.1:9001/v1 uvicorn benchmarks.serve:app --workers 2
+"""
+import database
+from benchmarks.fake_graph import FakeGraph
+
+database.db = FakeGraph()
+
+from backend import app  # noqa: E402,F401
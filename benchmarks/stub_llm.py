@@ -0,0 +1,165 @@
+"""
+Stub LLM for ClarityOS benchmarks
+A deterministic OpenAI-compatible /v1/chat/completions server standing in
+for NVIDIA NIM, with configurable latency and capacity.
+
+Answers follow the diagnosis flow: information-gathering replies until
+user message #6, then a document draft (which a "looks good" turn
+finalizes). Session Scribe calls get a 3-item action plan. The same
+request always gets the same answer.
+
+Latency is STUB_LATENCY seconds plus STUB_TOKEN_DELAY per output token.
+With STUB_CAPACITY > 0 at most that many requests are served at once and
+the rest queue, like a saturated upstream, so latency climbs with load.
+
+Usage:
+    python -m benchmarks.stub_llm --port 9001 --latency 0.5 --capacity 8
+    NVIDIA_BASE_URL=http://127.0.0.1:9001/v1 uvicorn backend:app
+"""
+import os
+import re
+import json
+import asyncio
+import hashlib
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+STUB_LATENCY = float(os.getenv("STUB_LATENCY", "0.2"))
+STUB_TOKEN_DELAY = float(os.getenv("STUB_TOKEN_DELAY", "0"))
+STUB_CAPACITY = int(os.getenv("STUB_CAPACITY", "0"))  # 0 = unlimited
+
+# One streamed chunk per ~4 characters, like a tokenizer would emit
+CHUNK_CHARS = 4
+TURN_PATTERN = re.compile(r"This is user message #(\d+)")
+# Older turns compacted into the system prompt by prompt_builder
+NOTE_PATTERN = re.compile(r"Earlier in this conversation the user said:\n- ([^\n]*)")
+
+app = FastAPI(title="ClarityOS stub LLM")
+_capacity = None
+stats = {"requests": 0, "in_flight": 0, "max_in_flight": 0, "prompt_tokens": 0, "completion_tokens": 0}
+
+
+def _digest(text: str) -> int:
+    return int(hashlib.blake2b(text.encode("utf-8"), digest_size=4).hexdigest(), 16)
+
+
+def diagnosis_answer(system: str, opener: str, user: str) -> dict:
+    """
+    Category and document follow the conversation's first message, so a
+    conversation keeps the same draft from turn to turn; the reply varies
+    with the latest message.
+    """
+    match = TURN_PATTERN.search(system)
+    turn = int(match.group(1)) if match else 1
+    seed = _digest(opener)
+    category = ("Fundraising", "Growth", "Product-Market Fit")[seed % 3]
+    # Replies of varying length, so output token counts vary like a real model's
+    reply = "Thanks, that helps. " + " ".join(["Could you tell me more about your metrics?"] * (1 + _digest(user) % 4))
+    answer = {
+        "reply": reply,
+        "category": category,
+        "conversation_state": "gathering_info",
+        "ready_for_document": False,
+        "keywords": ["churn", "retention", "growth"],
+    }
+    if turn >= 6:
+        answer.update({
+            "conversation_state": "reviewing_doc",
+            "ready_for_document": True,
+            "problem_summary": f"D2C brand at $30k MRR with {20 + seed % 30}% monthly churn",
+            "insights": ["Churn is concentrated in the first 30 days", "Email re-engagement has not moved retention"],
+            "metrics": {"MRR": "$30k", "Churn": f"{20 + seed % 30}%"},
+            "questions_for_mentor": ["How do I diagnose early churn?", "Which retention levers come first?"],
+        })
+    return answer
+
+
+def scribe_answer(transcript: str) -> dict:
+    seed = _digest(transcript)
+    return {
+        "action_plan": [
+            {"task": f"Follow-up {seed % 97}-{i}", "why": "Agreed in the session", "due": "Friday", "metric": "Done"}
+            for i in range(3)
+        ],
+        "clarity_score": 60 + seed % 40,
+        "reason": "Clear owners and dates"
+    }
+
+
+def answer_for(messages: list) -> str:
+    system = messages[0]["content"] if messages and messages[0]["role"] == "system" else ""
+    user = messages[-1]["content"] if messages else ""
+    if "Session Scribe" in system:
+        return json.dumps(scribe_answer(user))
+    note = NOTE_PATTERN.search(system)
+    opener = note.group(1) if note else next((m["content"] for m in messages if m["role"] == "user"), user)
+    return json.dumps(diagnosis_answer(system, opener, user), ensure_ascii=False)
+
+
+async def _serve(work):
+    global _capacity
+    stats["requests"] += 1
+    if STUB_CAPACITY and _capacity is None:
+        _capacity = asyncio.Semaphore(STUB_CAPACITY)
+    if _capacity is None:
+        return await work()
+    async with _capacity:
+        return await work()
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    text = answer_for(body["messages"])
+    tokens = max(len(text) // CHUNK_CHARS, 1)
+    prompt_tokens = sum(len(m["content"]) for m in body["messages"]) // CHUNK_CHARS
+    stats["prompt_tokens"] += prompt_tokens
+    stats["completion_tokens"] += tokens
+
+    if body.get("stream"):
+        async def events():
+            async def first_token():
+                await asyncio.sleep(STUB_LATENCY)
+            await _serve(first_token)
+            for i in range(0, len(text), CHUNK_CHARS):
+                chunk = {"id": "stub", "object": "chat.completion.chunk", "created": 0, "model": body.get("model", "stub"),
+                         "choices": [{"index": 0, "delta": {"content": text[i:i + CHUNK_CHARS]}, "finish_reason": None}]}
+                yield f"data: {json.dumps(chunk)}\n\n"
+                if STUB_TOKEN_DELAY:
+                    await asyncio.sleep(STUB_TOKEN_DELAY)
+            chunk["choices"] = [{"index": 0, "delta": {}, "finish_reason": "stop"}]
+            yield f"data: {json.dumps(chunk)}\n\n"
+            yield "data: [DONE]\n\n"
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    async def complete():
+        stats["in_flight"] += 1
+        stats["max_in_flight"] = max(stats["max_in_flight"], stats["in_flight"])
+        try:
+            await asyncio.sleep(STUB_LATENCY + STUB_TOKEN_DELAY * tokens)
+        finally:
+            stats["in_flight"] -= 1
+    await _serve(complete)
+    return {
+        "id": "stub", "object": "chat.completion", "created": 0, "model": body.get("model", "stub"),
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+        "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": tokens, "total_tokens": prompt_tokens + tokens}
+    }
+
+
+@app.get("/stats")
+def get_stats():
+    return stats
+
+
+if __name__ == "__main__":
+    import argparse
+    import uvicorn
+    parser = argparse.ArgumentParser(description="Deterministic OpenAI-compatible stub LLM")
+    parser.add_argument("--port", type=int, default=9001)
+    parser.add_argument("--latency", type=float, default=STUB_LATENCY, help="seconds per request")
+    parser.add_argument("--token-delay", type=float, default=STUB_TOKEN_DELAY, help="extra seconds per output token")
+    parser.add_argument("--capacity", type=int, default=STUB_CAPACITY, help="requests served at once (0 = unlimited)")
+    args = parser.parse_args()
+    STUB_LATENCY, STUB_TOKEN_DELAY, STUB_CAPACITY = args.latency, args.token_delay, args.capacity
+    uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="warning")
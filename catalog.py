@@ -0,0 +1,199 @@
+"""
+Mentor Catalog for ClarityOS
+Compact, hot-reloadable view of mentor_knowledge_base.json.
+
+Mentors are held as __slots__ records whose repeated strings are shared
+and whose lowercased search text is computed once at load. A catalog
+version (records + BM25 index + semantic scorer) is immutable: a reload
+builds the next version off to the side and swaps a single reference, so
+requests never wait for a rebuild and never see half a catalog.
+
+The source file is watched by mtime (checked at most every
+CATALOG_WATCH_INTERVAL seconds, rebuilt in a background thread);
+POST /catalog/reload forces a rebuild.
+
+With CATALOG_MMAP=true (for multiple uvicorn workers) a version is a
+read-only mapping of mentor_catalog.pack instead (see catalog_pack.py):
+one worker builds the pack, every worker maps the same pages.
+
+Mentor cards for recommendations are encoded once per version (see
+mentor_cards.py); requests only look them up.
+"""
+import os
+import json
+import time
+import threading
+from dotenv import load_dotenv
+from mentor_index import MentorIndex, mentor_text
+from mentor_cards import CardTable, encode_cards
+from semantic_search import SemanticScorer, catalog_checksum
+from structured_logging import get_logger
+
+# Load environment variables from .env.local
+load_dotenv('.env.local')
+
+logger = get_logger("catalog")
+
+MENTOR_DB_PATH = os.getenv("MENTOR_DB_PATH", "mentor_knowledge_base.json")
+CATALOG_WATCH_INTERVAL = float(os.getenv("CATALOG_WATCH_INTERVAL", "2"))  # seconds; 0 = no file watching
+CATALOG_MMAP = os.getenv("CATALOG_MMAP", "false").lower() in ("1", "true", "yes")
+
+
+class Mentor:
+    """One catalog entry. Read-only by convention: versions share records."""
+    __slots__ = ("id", "name", "bio", "outcomes", "link", "search_text")
+
+    def __init__(self, id: str, name: str, bio: str, outcomes: str, link: str, search_text: str):
+        self.id = id
+        self.name = name
+        self.bio = bio
+        self.outcomes = outcomes
+        self.link = link
+        self.search_text = search_text
+
+    @classmethod
+    def from_dict(cls, data: dict, shared: dict) -> "Mentor":
+        """Build a record; strings that repeat across mentors are stored once via `shared`."""
+        name = shared.setdefault(data.get("name", ""), data.get("name", ""))
+        bio = shared.setdefault(data.get("bio", ""), data.get("bio", ""))
+        outcomes = shared.setdefault(data.get("outcomes", ""), data.get("outcomes", ""))
+        search_text = mentor_text({"name": name, "bio": bio, "outcomes": outcomes})
+        return cls(str(data.get("id", "")), name, bio, outcomes, data.get("link", ""), search_text)
+
+    def to_dict(self) -> dict:
+        """Fresh dict for an API response; safe to modify."""
+        return {"id": self.id, "name": self.name, "bio": self.bio, "outcomes": self.outcomes, "link": self.link}
+
+
+class CatalogVersion:
+    """Immutable snapshot: the records, the indexes and the encoded mentor cards."""
+
+    def __init__(self, mentors, index: MentorIndex, mtime: int = None, checksum: str = "", cards=None):
+        self.mentors = mentors
+        self.index = index
+        self.cards = cards if cards is not None else CardTable.from_cards([])
+        self.mtime = mtime
+        self.checksum = checksum
+        self.loaded_at = time.time()
+
+    def __len__(self):
+        return len(self.mentors)
+
+    def search(self, query: str, category: str, k: int = 3) -> list:
+        return self.index.search(query, category, k=k)
+
+    def match_cards(self, query: str, category: str, k: int = 3) -> list:
+        """Pre-encoded JSON cards (with the category's reason) of the top-k mentors."""
+        return [self.cards.card(int(i), category) for i in self.index.search_ids(query, category, k=k)]
+
+    def info(self) -> dict:
+        return {
+            "mentors": len(self.mentors),
+            "checksum": self.checksum,
+            "semantic": self.index.semantic is not None,
+            "mmap": not isinstance(self.mentors, tuple),
+            "loaded_at": self.loaded_at
+        }
+
+
+def read_source(path: str) -> tuple:
+    """Parse the catalog file: (raw dicts, Mentor records, stat before reading, checksum)."""
+    stat = os.stat(path)
+    with open(path, "r") as f:
+        raw = json.load(f)
+    shared = {}
+    mentors = tuple(Mentor.from_dict(m, shared) for m in raw)
+    return raw, mentors, stat, catalog_checksum(raw)
+
+
+def load_version(path: str) -> CatalogVersion:
+    """Parse the catalog file and build its indexes in this process (blocking)."""
+    raw, mentors, stat, checksum = read_source(path)
+    semantic = SemanticScorer.load(raw, path)
+    index = MentorIndex(mentors, texts=[m.search_text for m in mentors], semantic=semantic)
+    return CatalogVersion(mentors, index, stat.st_mtime_ns, checksum, CardTable.from_cards(encode_cards(raw)))
+
+
+def map_version(path: str) -> CatalogVersion:
+    """Map the shared catalog pack for `path`, building it first if stale (blocking)."""
+    from catalog_pack import ensure_pack, PackedIndex, packed_cards
+    pack = ensure_pack(path)
+    checksum = pack.manifest["checksum"]
+    semantic = SemanticScorer.load_for(len(pack), checksum, path)
+    index = PackedIndex(pack, semantic=semantic)
+    return CatalogVersion(index.mentors, index, pack.manifest["source_mtime_ns"], checksum, packed_cards(pack))
+
+
+class MentorCatalog:
+    def __init__(self, path: str = MENTOR_DB_PATH, watch_interval: float = CATALOG_WATCH_INTERVAL,
+                 mmap: bool = CATALOG_MMAP):
+        self.path = path
+        self.watch_interval = watch_interval
+        self.mmap = mmap
+        self._version = None
+        self._next_check = 0.0
+        self._reloading = False
+        self._failed_mtime = None  # a source version that failed to load; not retried
+        self._lock = threading.Lock()
+
+    def current(self) -> CatalogVersion:
+        """
+        The live version. Never blocks on a rebuild once a version exists;
+        a changed source file is picked up in the background.
+        """
+        version = self._version
+        if version is None:
+            with self._lock:
+                if self._version is None:
+                    self._swap_in(self._build())
+                return self._version
+        if self.watch_interval > 0 and time.monotonic() >= self._next_check:
+            self._next_check = time.monotonic() + self.watch_interval
+            try:
+                mtime = os.stat(self.path).st_mtime_ns
+            except FileNotFoundError:
+                mtime = version.mtime  # Keep what we have if the scraper is rewriting it
+            if mtime not in (version.mtime, self._failed_mtime) and not self._reloading:
+                self._reloading = True
+                threading.Thread(target=self._reload_in_background, args=(mtime,), daemon=True).start()
+        return version
+
+    def _reload_in_background(self, mtime: int):
+        try:
+            self.reload()
+        except Exception as e:
+            self._failed_mtime = mtime
+            logger.error("Catalog reload failed; keeping the current version", extra={"error": str(e)})
+        finally:
+            self._reloading = False
+
+    def reload(self) -> CatalogVersion:
+        """Build a new version from the source file and swap it in."""
+        with self._lock:
+            self._swap_in(self._build())
+            return self._version
+
+    def _build(self) -> CatalogVersion:
+        started = time.perf_counter()
+        try:
+            version = map_version(self.path) if self.mmap else load_version(self.path)
+        except FileNotFoundError:
+            # Keep what we have if the scraper hasn't run (or is rewriting the file)
+            if self._version is not None:
+                return self._version
+            version = CatalogVersion((), MentorIndex([]))
+        logger.info("Mentor catalog loaded", extra={
+            "mentors": len(version), "mmap": self.mmap, "seconds": round(time.perf_counter() - started, 3)
+        })
+        return version
+
+    def _swap_in(self, version: CatalogVersion):
+        # A single reference assignment: readers see the old or the new version, whole
+        self._version = version
+
+    def __len__(self):
+        return len(self._version) if self._version is not None else 0
+
+
+# Global instance
+mentor_catalog = MentorCatalog()
@@ -0,0 +1,286 @@
+"""
+Catalog Pack for ClarityOS
+The mentor catalog and its BM25 index serialized into one flat file,
+mentor_catalog.pack (next to the JSON), that every uvicorn worker maps
+read-only. The pages live once in the OS page cache however many workers
+map them, instead of each worker parsing the JSON and building its own
+index.
+
+Layout: 8-byte magic, 8-byte manifest length, a JSON manifest, then
+64-byte-aligned arrays:
+    fields          int32 [n, 5]   string ids of id / name / bio / outcomes / link
+    string_offsets  int64 [s + 1]  into strings (deduplicated UTF-8)
+    text_offsets    int64 [n + 1]  into texts (lowercased search text, NUL-terminated)
+    vocab           S<w>  [t]      sorted terms, looked up with searchsorted
+    indptr          int64 [t + 1]  BM25 postings, one row per term
+    indices         int32          mentor ids
+    weights         float32        BM25 weights
+    card_offsets    int64 [n*k + 1] into cards, per (mentor, reason kind)
+    cards           uint8          encoded mentor card JSON (mentor_cards.py)
+
+The file is written under a temp name and renamed into place, so a
+reload is an atomic swap: workers still mapping the old file keep
+reading it until they remap.
+
+Usage (optional; workers build a missing or stale pack themselves):
+    python catalog_pack.py mentor_knowledge_base.json
+"""
+import os
+import json
+import mmap
+import struct
+from contextlib import contextmanager
+import numpy as np
+from catalog import Mentor, read_source
+from mentor_cards import CardTable, encode_cards
+from mentor_index import MentorIndex, tokenize, CATEGORY_BOOST
+
+MAGIC = b"CLRYCAT3"
+ALIGN = 64
+FIELDS = ("id", "name", "bio", "outcomes", "link")
+# Longer tokens are left out of the packed vocabulary (fixed-width entries)
+MAX_TERM_BYTES = 64
+
+
+def pack_path_for(catalog_path: str) -> str:
+    return os.path.join(os.path.dirname(os.path.abspath(catalog_path)), "mentor_catalog.pack")
+
+
+def _align(n: int) -> int:
+    return (n + ALIGN - 1) // ALIGN * ALIGN
+
+
+# --- WRITE ---
+
+def write_pack(mentors, index: MentorIndex, cards: list, path: str, meta: dict):
+    """Serialize records, BM25 postings and encoded cards to `path` (atomic replace)."""
+    string_ids, encoded = {}, []
+    fields = np.zeros((len(mentors), len(FIELDS)), dtype=np.int32)
+    for i, mentor in enumerate(mentors):
+        for j, name in enumerate(FIELDS):
+            value = getattr(mentor, name)
+            sid = string_ids.get(value)
+            if sid is None:
+                sid = string_ids[value] = len(encoded)
+                encoded.append(value.encode("utf-8"))
+            fields[i, j] = sid
+    string_offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    string_offsets[1:] = np.cumsum([len(s) for s in encoded])
+
+    texts = [m.search_text.encode("utf-8") + b"\0" for m in mentors]
+    text_offsets = np.zeros(len(texts) + 1, dtype=np.int64)
+    text_offsets[1:] = np.cumsum([len(t) for t in texts])
+
+    terms = sorted(
+        (term.encode("utf-8"), row) for term, row in index.vocab.items()
+        if len(term.encode("utf-8")) <= MAX_TERM_BYTES
+    )
+    width = max((len(t) for t, _ in terms), default=1)
+    vocab = np.array([t for t, _ in terms], dtype=f"S{width}")
+    postings = index.postings[[row for _, row in terms]] if terms else None
+
+    card_offsets = np.zeros(len(cards) + 1, dtype=np.int64)
+    card_offsets[1:] = np.cumsum([len(c) for c in cards])
+
+    arrays = {
+        "fields": fields,
+        "string_offsets": string_offsets,
+        "strings": np.frombuffer(b"".join(encoded), dtype=np.uint8),
+        "text_offsets": text_offsets,
+        "texts": np.frombuffer(b"".join(texts), dtype=np.uint8),
+        "vocab": vocab,
+        "indptr": postings.indptr.astype(np.int64) if terms else np.zeros(1, dtype=np.int64),
+        "indices": postings.indices.astype(np.int32) if terms else np.zeros(0, dtype=np.int32),
+        "weights": postings.data.astype(np.float32) if terms else np.zeros(0, dtype=np.float32),
+        "card_offsets": card_offsets,
+        "cards": np.frombuffer(b"".join(cards), dtype=np.uint8),
+    }
+
+    specs, offset = {}, 0
+    for name, array in arrays.items():
+        specs[name] = {"offset": offset, "dtype": array.dtype.str, "shape": list(array.shape)}
+        offset = _align(offset + array.nbytes)
+    manifest = json.dumps({"count": len(mentors), "arrays": specs, **meta}).encode("utf-8")
+    base = _align(16 + len(manifest))
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC + struct.pack("<Q", len(manifest)) + manifest)
+        for name, array in arrays.items():
+            f.seek(base + specs[name]["offset"])
+            f.write(np.ascontiguousarray(array).tobytes())
+        f.truncate(base + offset)
+    os.replace(tmp_path, path)
+
+
+def build_pack(catalog_path: str, pack_path: str = None) -> str:
+    """Parse the JSON catalog, build its index and write the pack."""
+    pack_path = pack_path or pack_path_for(catalog_path)
+    raw, mentors, stat, checksum = read_source(catalog_path)
+    index = MentorIndex(mentors, texts=[m.search_text for m in mentors])
+    write_pack(mentors, index, encode_cards(raw), pack_path, {
+        "source_mtime_ns": stat.st_mtime_ns,
+        "source_size": stat.st_size,
+        "checksum": checksum
+    })
+    return pack_path
+
+
+# --- READ ---
+
+class CatalogPack:
+    """A mapped pack file; arrays are zero-copy views of the mapping."""
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.mm[:8] != MAGIC:
+            raise ValueError(f"{path} is not a catalog pack")
+        (manifest_len,) = struct.unpack("<Q", self.mm[8:16])
+        self.manifest = json.loads(self.mm[16:16 + manifest_len])
+        base = _align(16 + manifest_len)
+        self.offsets = {}
+        self.arrays = {}
+        for name, spec in self.manifest["arrays"].items():
+            dtype = np.dtype(spec["dtype"])
+            count = int(np.prod(spec["shape"]))
+            self.offsets[name] = base + spec["offset"]
+            self.arrays[name] = np.frombuffer(
+                self.mm, dtype=dtype, count=count, offset=self.offsets[name]
+            ).reshape(spec["shape"])
+
+    def __len__(self):
+        return self.manifest["count"]
+
+    def is_fresh(self, stat: os.stat_result) -> bool:
+        """Built from the catalog file as it is now?"""
+        return (self.manifest.get("source_mtime_ns") == stat.st_mtime_ns
+                and self.manifest.get("source_size") == stat.st_size)
+
+
+class PackedMentors:
+    """Sequence of Mentor records, decoded from the pack on access."""
+
+    def __init__(self, pack: CatalogPack):
+        self.pack = pack
+        self._fields = pack.arrays["fields"]
+        self._string_offsets = pack.arrays["string_offsets"]
+        self._strings = pack.arrays["strings"]
+        self._text_offsets = pack.arrays["text_offsets"]
+        self._texts = pack.arrays["texts"]
+
+    def __len__(self):
+        return len(self._fields)
+
+    def __getitem__(self, i: int) -> Mentor:
+        values = [
+            self._strings[self._string_offsets[s]:self._string_offsets[s + 1]].tobytes().decode("utf-8")
+            for s in self._fields[i]
+        ]
+        text = self._texts[self._text_offsets[i]:self._text_offsets[i + 1] - 1].tobytes().decode("utf-8")
+        return Mentor(*values, search_text=text)
+
+
+def packed_cards(pack: CatalogPack) -> CardTable:
+    """The pack's encoded mentor cards, served straight from the mapping."""
+    start = pack.offsets["cards"]
+    return CardTable(memoryview(pack.mm)[start:start + len(pack.arrays["cards"])], pack.arrays["card_offsets"])
+
+
+class PackedIndex(MentorIndex):
+    """MentorIndex scoring over the mapped arrays (same ranking as in memory)."""
+
+    def __init__(self, pack: CatalogPack, semantic=None):
+        self.pack = pack
+        self.mentors = PackedMentors(pack)
+        self.semantic = semantic
+        self._category_masks = {}
+        self._vocab = pack.arrays["vocab"]
+        self._indptr = pack.arrays["indptr"]
+        self._indices = pack.arrays["indices"]
+        self._weights = pack.arrays["weights"]
+        self._text_offsets = pack.arrays["text_offsets"]
+        self._texts_start = pack.offsets["texts"]
+
+    def term_ids(self, query: str) -> np.ndarray:
+        terms = [t for t in {t.encode("utf-8") for t in tokenize(query)} if len(t) <= self._vocab.itemsize]
+        if not terms or not len(self._vocab):
+            return np.zeros(0, dtype=np.int64)
+        wanted = np.array(terms, dtype=self._vocab.dtype)
+        pos = np.minimum(np.searchsorted(self._vocab, wanted), len(self._vocab) - 1)
+        return np.unique(pos[self._vocab[pos] == wanted])
+
+    def category_mask(self, category: str) -> np.ndarray:
+        """Mentors whose search text contains the category, found with mmap.find."""
+        key = category.lower()
+        mask = self._category_masks.get(key)
+        if mask is None:
+            mask = np.zeros(len(self.mentors), dtype=bool)
+            needle = key.encode("utf-8")
+            mm, end = self.pack.mm, self._texts_start + int(self._text_offsets[-1])
+            pos = mm.find(needle, self._texts_start, end) if needle else -1
+            while pos != -1:
+                i = int(np.searchsorted(self._text_offsets, pos - self._texts_start, side="right")) - 1
+                mask[i] = True
+                pos = mm.find(needle, self._texts_start + int(self._text_offsets[i + 1]), end)
+            self._category_masks[key] = mask
+        return mask
+
+    def scores(self, query: str, category: str) -> np.ndarray:
+        scores = np.zeros(len(self.mentors), dtype=np.float32)
+        for t in self.term_ids(query):
+            start, end = self._indptr[t], self._indptr[t + 1]
+            # A term lists each mentor at most once, so fancy += is safe
+            scores[self._indices[start:end]] += self._weights[start:end]
+        if category:
+            scores += CATEGORY_BOOST * self.category_mask(category)
+        return scores
+
+
+# --- BUILD COORDINATION ---
+
+@contextmanager
+def _build_lock(pack_path: str):
+    """Cross-process lock so one worker builds while the others wait."""
+    try:
+        import fcntl
+    except ImportError:  # Windows: no coordination, each worker may build
+        yield
+        return
+    with open(pack_path + ".lock", "a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _open_if_fresh(pack_path: str, stat: os.stat_result):
+    try:
+        pack = CatalogPack(pack_path)
+    except (FileNotFoundError, ValueError):
+        return None
+    return pack if pack.is_fresh(stat) else None
+
+
+def ensure_pack(catalog_path: str) -> CatalogPack:
+    """Map the pack for the catalog's current contents, building it first if stale."""
+    pack_path = pack_path_for(catalog_path)
+    stat = os.stat(catalog_path)
+    pack = _open_if_fresh(pack_path, stat)
+    if pack is None:
+        with _build_lock(pack_path):
+            pack = _open_if_fresh(pack_path, stat)  # another worker may have just built it
+            if pack is None:
+                build_pack(catalog_path, pack_path)
+                pack = CatalogPack(pack_path)
+    return pack
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Build the memory-mapped mentor catalog pack")
+    parser.add_argument("catalog", nargs="?", default="mentor_knowledge_base.json", help="catalog JSON")
+    args = parser.parse_args()
+    path = build_pack(args.catalog)
+    print(f"✅ Wrote {path} ({os.path.getsize(path):,} bytes, {len(CatalogPack(path))} mentors)")
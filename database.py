@@ -1,103 +1,301 @@
 import os
-from neo4j import GraphDatabase
+import time
+import uuid
 from dotenv import load_dotenv
+import metrics
+from structured_logging import get_logger
 
 # Load environment variables from .env.local
 load_dotenv('.env.local')
 
+logger = get_logger("database")
+
 # Neo4j credentials from environment
 NEO4J_URI = os.getenv("NEO4J_URI", "bolt://localhost:7687")
 NEO4J_USER = os.getenv("NEO4J_USER", "neo4j")
 NEO4J_PASSWORD = os.getenv("NEO4J_PASSWORD", "")
 
+# Connection pool tuning
+NEO4J_MAX_POOL_SIZE = int(os.getenv("NEO4J_MAX_POOL_SIZE", "50"))
+NEO4J_ACQUIRE_TIMEOUT = float(os.getenv("NEO4J_ACQUIRE_TIMEOUT", "10"))
+NEO4J_CONNECTION_TIMEOUT = float(os.getenv("NEO4J_CONNECTION_TIMEOUT", "5"))
+NEO4J_MAX_CONNECTION_LIFETIME = float(os.getenv("NEO4J_MAX_CONNECTION_LIFETIME", "3600"))
+
+# Idempotent schema bootstrap: every MERGE key is backed by a uniqueness constraint
+SCHEMA_QUERIES = [
+    "CREATE CONSTRAINT mentor_id IF NOT EXISTS FOR (m:Mentor) REQUIRE m.id IS UNIQUE",
+    "CREATE CONSTRAINT expertise_name IF NOT EXISTS FOR (e:Expertise) REQUIRE e.name IS UNIQUE",
+    "CREATE CONSTRAINT outcome_description IF NOT EXISTS FOR (o:Outcome) REQUIRE o.description IS UNIQUE",
+    "CREATE CONSTRAINT document_id IF NOT EXISTS FOR (d:Document) REQUIRE d.id IS UNIQUE",
+    "CREATE CONSTRAINT document_content_hash IF NOT EXISTS FOR (d:Document) REQUIRE d.content_hash IS UNIQUE",
+    # Serves get_mentor_matches; search_text is precomputed at ingest
+    "CREATE FULLTEXT INDEX mentor_search IF NOT EXISTS FOR (m:Mentor) ON EACH [m.search_text]",
+]
+
+# Plan operators that mean the matching hot path is scanning instead of using an index
+SCAN_OPERATORS = ("AllNodesScan", "NodeByLabelScan")
+
+MENTOR_MATCHES_QUERY = """
+CALL db.index.fulltext.queryNodes('mentor_search', $search) YIELD node AS m, score
+WITH m, score
+ORDER BY score DESC
+LIMIT $k
+RETURN m.name as name, m.bio as bio, m.id as id, m.link as link,
+       [(m)-[:ACHIEVED]->(o:Outcome) | o.description] as outcomes,
+       [(m)-[:HAS_EXPERTISE]->(e:Expertise) | e.name] as expertise,
+       score
+ORDER BY score DESC
+"""
+
+_LUCENE_SPECIAL = set('+-&|!(){}[]^"~*?:\\/')
+
+
+def _lucene_escape(text: str) -> str:
+    return "".join("\\" + ch if ch in _LUCENE_SPECIAL else ch for ch in text)
+
+
+def mentor_search_text(mentor: dict) -> str:
+    """Lowercased bio + expertise + outcomes, stored on the Mentor node at ingest."""
+    parts = [mentor.get("bio", "")]
+    for key in ("expertise", "outcomes"):
+        value = mentor.get(key) or []
+        parts.extend([value] if isinstance(value, str) else value)  # raw catalog entries hold strings
+    return " ".join(p for p in parts if p).lower()
+
+
+def mentor_search_query(category: str, keywords: list) -> str:
+    """
+    Lucene query for the mentor_search index: the category is required
+    (as a phrase) unless it is "General"; keywords add to the score.
+    """
+    clauses = []
+    if category and category.lower() != "general":
+        clauses.append(f'+"{_lucene_escape(category.lower())}"^2')
+    terms = [_lucene_escape(k.lower()) for k in keywords if k and k.strip()]
+    if terms:
+        clauses.append("(" + " ".join(terms) + ")")
+    return " ".join(clauses)
+
+ADD_MENTORS_QUERY = """
+UNWIND $rows AS row
+MERGE (m:Mentor {id: row.id})
+SET m.name = row.name, m.bio = row.bio, m.link = row.link, m.search_text = row.search_text
+WITH m, row
+FOREACH (exp IN row.expertise |
+    MERGE (e:Expertise {name: exp})
+    MERGE (m)-[:HAS_EXPERTISE]->(e)
+)
+FOREACH (out IN row.outcomes |
+    MERGE (o:Outcome {description: out})
+    MERGE (m)-[:ACHIEVED]->(o)
+)
+"""
+
+# Documents with a content hash are merged on it, so identical uploads share one node
+SAVE_DOCUMENTS_QUERY = """
+UNWIND $rows AS row
+CALL {
+    WITH row
+    WITH row WHERE row.content_hash IS NOT NULL
+    MERGE (d:Document {content_hash: row.content_hash})
+    ON CREATE SET d.id = row.doc_id, d.filename = row.filename, d.content = row.content,
+                  d.file_type = row.file_type, d.created_at = datetime()
+    RETURN d
+    UNION
+    WITH row
+    WITH row WHERE row.content_hash IS NULL
+    CREATE (d:Document {
+        id: row.doc_id,
+        filename: row.filename,
+        content: row.content,
+        file_type: row.file_type,
+        created_at: datetime()
+    })
+    RETURN d
+}
+RETURN d.id as id
+"""
+
+
 class Database:
+    """
+    Async Neo4j access. The driver (and the neo4j package itself) is
+    loaded lazily by connect(), which the server's startup warm-up calls;
+    importing this module opens nothing.
+    """
+
     def __init__(self):
-        self.driver = GraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USER, NEO4J_PASSWORD))
+        self.driver = None
+
+    async def connect(self):
+        if self.driver is None:
+            from neo4j import AsyncGraphDatabase
+            self.driver = AsyncGraphDatabase.driver(
+                NEO4J_URI,
+                auth=(NEO4J_USER, NEO4J_PASSWORD),
+                max_connection_pool_size=NEO4J_MAX_POOL_SIZE,
+                connection_acquisition_timeout=NEO4J_ACQUIRE_TIMEOUT,
+                connection_timeout=NEO4J_CONNECTION_TIMEOUT,
+                max_connection_lifetime=NEO4J_MAX_CONNECTION_LIFETIME
+            )
+        return self.driver
+
+    async def close(self):
+        if self.driver is not None:
+            await self.driver.close()
+            self.driver = None
 
-    def close(self):
-        self.driver.close()
+    async def _run(self, query: str, **params) -> list:
+        driver = await self.connect()
+        async with driver.session() as session:
+            result = await session.run(query, **params)
+            return await result.data()
 
-    def get_mentor_matches(self, category: str, keywords: list):
+    async def _write(self, query: str, **params):
+        """Run a write in a managed transaction (retried on transient errors)."""
+        async def work(tx):
+            result = await tx.run(query, **params)
+            return await result.consume()
+
+        driver = await self.connect()
+        async with driver.session() as session:
+            return await session.execute_write(work)
+
+    async def ensure_schema(self):
         """
-        Finds mentors based on category (Vertical) and specific keywords in their outcomes/bio.
+        Create the constraints (and their backing indexes) that MERGE relies
+        on. Safe to call repeatedly.
         """
-        query = """
-        MATCH (m:Mentor)-[:HAS_EXPERTISE]->(e:Expertise)
-        WHERE toLower(e.name) CONTAINS toLower($category)
-        OR toLower(m.bio) CONTAINS toLower($category)
-        OPTIONAL MATCH (m)-[:ACHIEVED]->(o:Outcome)
-        WITH m, e, o,
-             reduce(score = 0, word IN $keywords | 
-                CASE WHEN toLower(m.bio) CONTAINS toLower(word) OR toLower(o.description) CONTAINS toLower(word) 
-                THEN score + 1 ELSE score END) AS keyword_score
-        WITH m, keyword_score, collect(DISTINCT o.description) as outcomes, collect(DISTINCT e.name) as expertise
-        RETURN m.name as name, m.bio as bio, m.id as id, m.link as link, outcomes, expertise, keyword_score
-        ORDER BY keyword_score DESC
-        LIMIT 3
-        """
-        
-        with self.driver.session() as session:
-            result = session.run(query, category=category, keywords=keywords)
-            return [record.data() for record in result]
-
-    def add_mentor(self, mentor_data):
+        for query in SCHEMA_QUERIES:
+            await self._write(query)
+
+    async def get_mentor_matches(self, category: str, keywords: list, k: int = 3):
+        """
+        Finds mentors based on category (Vertical) and specific keywords in their
+        bio/expertise/outcomes, via the mentor_search full-text index.
+        Returns the top-k by relevance score.
+        """
+        search = mentor_search_query(category, keywords)
+        if not search:
+            return []
+        return await self._run(MENTOR_MATCHES_QUERY, search=search, k=k)
+
+    async def hot_path_scans(self, category: str = "Growth", keywords: list = None) -> list:
+        """
+        EXPLAIN the mentor-matching query and return any full-scan operators
+        in its plan. An empty list means the hot path is index-backed.
+        """
+        driver = await self.connect()
+        async with driver.session() as session:
+            result = await session.run(
+                "EXPLAIN " + MENTOR_MATCHES_QUERY,
+                search=mentor_search_query(category, keywords or ["churn"]),
+                k=3
+            )
+            summary = await result.consume()
+
+        scans = []
+        stack = [summary.plan] if summary.plan else []
+        while stack:
+            node = stack.pop()
+            operator = node.get("operatorType", "")
+            if operator.split("@")[0] in SCAN_OPERATORS:
+                scans.append(operator)
+            stack.extend(node.get("children", []))
+        return scans
+
+    async def add_mentor(self, mentor_data):
         """
         Adds a mentor and their relationships to the graph.
         """
-        query = """
-        MERGE (m:Mentor {id: $id})
-        SET m.name = $name, m.bio = $bio, m.link = $link
-        WITH m
-        FOREACH (exp IN $expertise | 
-            MERGE (e:Expertise {name: exp})
-            MERGE (m)-[:HAS_EXPERTISE]->(e)
-        )
-        FOREACH (out IN $outcomes | 
-            MERGE (o:Outcome {description: out})
-            MERGE (m)-[:ACHIEVED]->(o)
-        )
-        """
-        with self.driver.session() as session:
-            session.run(query, **mentor_data)
-
-    def verify_connection(self):
+        await self.add_mentors([mentor_data])
+
+    async def add_mentors(self, mentors: list):
+        """
+        Batched add_mentor: one round-trip for the whole list via UNWIND.
+        """
+        if mentors:
+            rows = [dict(m, search_text=mentor_search_text(m)) for m in mentors]
+            await self._write(ADD_MENTORS_QUERY, rows=rows)
+
+    async def bulk_load_mentors(self, mentors, batch_size: int = 1000, progress=None):
+        """
+        Stream mentors into the graph in UNWIND batches of `batch_size`.
+        Bootstraps the schema first. `progress(loaded, rows_per_sec)` is
+        called after every batch.
+        Returns {"rows": int, "seconds": float, "rows_per_sec": float}.
+        """
+        await self.ensure_schema()
+
+        loaded = 0
+        started = time.perf_counter()
+        batch = []
+
+        async def flush():
+            nonlocal loaded, batch
+            await self.add_mentors(batch)
+            loaded += len(batch)
+            batch = []
+            if progress:
+                progress(loaded, loaded / max(time.perf_counter() - started, 1e-9))
+
+        for mentor in mentors:
+            batch.append(mentor)
+            if len(batch) >= batch_size:
+                await flush()
+        if batch:
+            await flush()
+
+        seconds = time.perf_counter() - started
+        return {"rows": loaded, "seconds": seconds, "rows_per_sec": loaded / max(seconds, 1e-9)}
+
+    async def verify_connection(self):
         try:
-            with self.driver.session() as session:
-                session.run("RETURN 1")
+            await self._run("RETURN 1")
             return True
         except Exception as e:
-            print(f"Database Connection Error: {e}")
+            logger.error("Database Connection Error", extra={"error": str(e)})
             return False
 
-    def save_file_content(self, filename: str, content: str, file_type: str):
+    async def save_file_content(self, filename: str, content: str, file_type: str, content_hash: str = None):
         """
         Saves uploaded file content to Neo4j as a Document node.
-        Returns the document ID.
+        With a content_hash, an existing Document for the same bytes is reused.
+        Returns the document ID, or None if the write failed.
         """
-        import uuid
-        doc_id = str(uuid.uuid4())[:8]
-        
-        query = """
-        CREATE (d:Document {
-            id: $doc_id,
-            filename: $filename,
-            content: $content,
-            file_type: $file_type,
-            created_at: datetime()
-        })
-        RETURN d.id as id
-        """
-        
+        ids = await self.save_file_contents([
+            {"filename": filename, "content": content, "file_type": file_type, "content_hash": content_hash}
+        ])
+        return ids[0]
+
+    async def save_file_contents(self, files: list):
+        """
+        Batched save_file_content. `files` is a list of
+        {"filename", "content", "file_type", "content_hash"?} dicts;
+        returns their IDs in order, all None if the write failed.
+        """
+        rows = [
+            {
+                "doc_id": str(uuid.uuid4())[:8],
+                "filename": f["filename"],
+                "content": f["content"][:50000],
+                "file_type": f["file_type"],
+                "content_hash": f.get("content_hash")
+            }
+            for f in files
+        ]
+
         try:
-            with self.driver.session() as session:
-                result = session.run(query, doc_id=doc_id, filename=filename, content=content[:50000], file_type=file_type)
-                record = result.single()
-                return record["id"] if record else doc_id
+            records = await self._run(SAVE_DOCUMENTS_QUERY, rows=rows)
+            if len(records) == len(rows):
+                return [r["id"] for r in records]
+            logger.error("Neo4j saved fewer documents than sent", extra={"documents": len(rows), "saved": len(records)})
         except Exception as e:
-            print(f"Error saving to Neo4j: {e}")
-            return doc_id
+            logger.error("Error saving to Neo4j", extra={"error": str(e), "documents": len(rows)})
+        metrics.fallbacks.inc(reason="neo4j_write_failed")
+        return [None] * len(rows)
 
-    def get_document(self, doc_id: str):
+    async def get_document(self, doc_id: str):
         """
         Retrieves a document by ID.
         """
@@ -105,11 +303,9 @@ class Database:
         MATCH (d:Document {id: $doc_id})
         RETURN d.filename as filename, d.content as content, d.file_type as file_type
         """
-        
-        with self.driver.session() as session:
-            result = session.run(query, doc_id=doc_id)
-            record = result.single()
-            return record.data() if record else None
 
-# Global instance
+        records = await self._run(query, doc_id=doc_id)
+        return records[0] if records else None
+
+# Global instance (connects on first use / at app startup)
 db = Database()
@@ -1,14 +1,208 @@
 """
 Document Generator for ClarityOS
 Creates addressible.docx files with mentor context information
+
+The Mentor Context Pack layout is defined once (PACK_SECTIONS) and drives
+all three outputs: the .docx (a pre-built template whose document.xml is
+compiled into literal chunks + slots on first use), the chat text preview
+and the /generate-pdf HTML.
 """
-from docx import Document
-from docx.shared import Inches, Pt
-from docx.enum.text import WD_ALIGN_PARAGRAPH
 from datetime import datetime
-import os
+from html import escape as html_escape
+import hashlib
 import json
+from xml.sax.saxutils import escape as xml_escape
+import io
+import os
+import re
+import zipfile
+
+TEMPLATE_PATH = os.path.join(os.path.dirname(__file__), "templates", "mentor_context_pack.docx")
+GENERATED_DOCUMENTS_DIR = os.path.join(os.path.dirname(__file__), "generated_documents")
+
+TITLE = "🎯 Mentor Context Pack"
+FOOTER = "Powered by ClarityOS | ExpertBells"
+RULE = "─" * 50
+
+# (field, heading, preview heading, item style, optional)
+# Item styles: "text" = single paragraph, "numbered" = "1. item", "bullets" = "• item",
+# "pairs" = "• key: value". Optional sections are left out of the .docx/HTML when empty.
+PACK_SECTIONS = [
+    ("user_summary", "Problem Summary", "📝 PROBLEM SUMMARY:", "text", False),
+    ("insights", "Key Insights", "💡 KEY INSIGHTS:", "numbered", False),
+    ("metrics", "Key Metrics", "📊 METRICS:", "pairs", True),
+    ("questions_for_mentor", "Questions for Mentor to Address", "❓ QUESTIONS FOR MENTOR:", "bullets", False),
+]
+
+LIST_FIELDS = {field for field, _, _, style, _ in PACK_SECTIONS if style != "text"}
+
+# Characters XML 1.0 cannot carry (python-docx would refuse them too)
+_INVALID_XML = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f]")
+_PARAGRAPH = re.compile(r"<w:p[ >].*?</w:p>", re.S)
+_RUN_TEXT = re.compile(r"<w:t(?: [^>]*)?>([^<]*)</w:t>")
+_PLACEHOLDER = re.compile(r"\{\{(\w+)\}\}")
+_BLOCK_MARKER = re.compile(r"^\{\{([#/])(\w+)\}\}$")
+
+
+def format_items(style: str, value) -> list:
+    """Format a section's value into display lines (shared by every output)."""
+    if style == "numbered":
+        return [f"{i}. {item}" for i, item in enumerate(value or [], 1)]
+    if style == "bullets":
+        return [f"• {item}" for item in value or []]
+    if style == "pairs":
+        return [f"• {k}: {v}" for k, v in (value or {}).items()]
+    return [str(value or "")]
+
+
+# --- DOCX TEMPLATE ---
+
+def build_template(path: str = TEMPLATE_PATH) -> str:
+    """
+    Write the pre-built .docx layout with {{placeholders}}.
+    Only needed when the template is missing or PACK_SECTIONS changes.
+    """
+    from docx import Document
+    from docx.shared import Pt
+    from docx.enum.text import WD_ALIGN_PARAGRAPH
+
+    doc = Document()
+    title = doc.add_heading(TITLE, 0)
+    title.alignment = WD_ALIGN_PARAGRAPH.CENTER
+
+    doc.add_paragraph("Generated: {{generated}}")
+    doc.add_paragraph("Category: {{category}}")
+    doc.add_paragraph(RULE)
+
+    for field, heading, _, style, optional in PACK_SECTIONS:
+        if optional:
+            doc.add_paragraph("{{#" + field + "}}")
+        doc.add_heading(heading, level=1)
+        doc.add_paragraph("{{" + field + "}}", style="List Number" if style == "numbered" else None)
+        if optional:
+            doc.add_paragraph("{{/" + field + "}}")
+
+    doc.add_paragraph(RULE)
+    footer = doc.add_paragraph(FOOTER)
+    footer.runs[0].font.size = Pt(10)
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    doc.save(path)
+    return path
+
+
+def _docx_text(value: str) -> str:
+    """Escape a value for a <w:t> run; newlines become line breaks."""
+    value = xml_escape(_INVALID_XML.sub("", str(value)))
+    return value.replace("\n", '</w:t><w:br/><w:t xml:space="preserve">')
+
+
+class CompiledTemplate:
+    """
+    A .docx template loaded once. document.xml is split into a flat list of
+    nodes so rendering is a single join:
+        str                         literal XML
+        ("field", name)             scalar substitution
+        ("list", name, before, after)  paragraph repeated per item
+        ("if", name) / ("end",)     optional block, dropped when empty
+    """
+
+    def __init__(self, path: str = TEMPLATE_PATH):
+        if not os.path.exists(path):
+            build_template(path)
+        # Static parts (styles.xml alone is ~350 KB) are deflated once into an
+        # in-memory archive; each render only appends the small document.xml.
+        static = io.BytesIO()
+        with zipfile.ZipFile(path) as src, zipfile.ZipFile(static, "w", zipfile.ZIP_DEFLATED) as out:
+            for info in src.infolist():
+                if info.filename == "word/document.xml":
+                    self.document_info = info
+                    document_xml = src.read(info)
+                else:
+                    out.writestr(info, src.read(info))
+        self.static_zip = static.getvalue()
+        self.nodes = self._compile(document_xml.decode("utf-8"))
+
+    @staticmethod
+    def _compile(xml: str) -> list:
+        nodes = []
+        pos = 0
+        for match in _PARAGRAPH.finditer(xml):
+            nodes.append(xml[pos:match.start()])
+            pos = match.end()
+            paragraph = match.group()
+            text = "".join(_RUN_TEXT.findall(paragraph))
+
+            marker = _BLOCK_MARKER.match(text)
+            if marker:
+                nodes.append(("if", marker.group(2)) if marker.group(1) == "#" else ("end",))
+                continue
 
+            placeholder = _PLACEHOLDER.fullmatch(text)
+            if placeholder and placeholder.group(1) in LIST_FIELDS:
+                before, after = paragraph.split(placeholder.group(0), 1)
+                nodes.append(("list", placeholder.group(1), before, after))
+                continue
+
+            last = 0
+            for ph in _PLACEHOLDER.finditer(paragraph):
+                nodes.append(paragraph[last:ph.start()])
+                nodes.append(("field", ph.group(1)))
+                last = ph.end()
+            nodes.append(paragraph[last:])
+        nodes.append(xml[pos:])
+        return [n for n in nodes if n != ""]
+
+    def render_document_xml(self, fields: dict) -> str:
+        styles = {field: style for field, _, _, style, _ in PACK_SECTIONS}
+        out = []
+        skipping = 0
+        for node in self.nodes:
+            if isinstance(node, str):
+                if not skipping:
+                    out.append(node)
+            elif node[0] == "if":
+                if skipping or not fields.get(node[1]):
+                    skipping += 1
+            elif node[0] == "end":
+                if skipping:
+                    skipping -= 1
+            elif skipping:
+                continue
+            elif node[0] == "field":
+                out.append(_docx_text(fields.get(node[1], "")))
+            else:
+                _, name, before, after = node
+                if styles[name] == "numbered":
+                    # "List Number" paragraphs are numbered by Word itself
+                    lines = [str(item) for item in fields.get(name) or []]
+                else:
+                    lines = format_items(styles[name], fields.get(name))
+                for line in lines:
+                    out.append(before)
+                    out.append(_docx_text(line))
+                    out.append(after)
+        return "".join(out)
+
+    def render_docx(self, fields: dict, stream):
+        """Write the filled-in .docx zip straight to a binary stream."""
+        buffer = io.BytesIO(self.static_zip)
+        with zipfile.ZipFile(buffer, "a", zipfile.ZIP_DEFLATED) as zf:
+            zf.writestr(self.document_info, self.render_document_xml(fields).encode("utf-8"))
+        stream.write(buffer.getvalue())
+
+
+_template = None
+
+
+def get_template() -> CompiledTemplate:
+    global _template
+    if _template is None:
+        _template = CompiledTemplate()
+    return _template
+
+
+# --- RENDERERS ---
 
 def create_addressible_docx(
     user_summary: str,
@@ -20,81 +214,116 @@ def create_addressible_docx(
 ) -> tuple[str, str]:
     """
     Generate an addressible.docx file with all context for the mentor.
-    
+
     Returns:
         tuple: (file_path, document_content_as_text)
     """
-    doc = Document()
-    
-    # Title
-    title = doc.add_heading('🎯 Mentor Context Pack', 0)
-    title.alignment = WD_ALIGN_PARAGRAPH.CENTER
-    
-    # Metadata
-    doc.add_paragraph(f"Generated: {datetime.now().strftime('%B %d, %Y at %I:%M %p')}")
-    doc.add_paragraph(f"Category: {category}")
-    doc.add_paragraph("─" * 50)
-    
-    # Problem Summary
-    doc.add_heading('Problem Summary', level=1)
-    doc.add_paragraph(user_summary)
-    
-    # Key Insights
-    doc.add_heading('Key Insights', level=1)
-    for i, insight in enumerate(insights, 1):
-        doc.add_paragraph(f"{i}. {insight}", style='List Number')
-    
-    # Metrics (if provided)
-    if metrics:
-        doc.add_heading('Key Metrics', level=1)
-        for key, value in metrics.items():
-            doc.add_paragraph(f"• {key}: {value}")
-    
-    # Questions for Mentor
-    doc.add_heading('Questions for Mentor to Address', level=1)
-    for q in questions_for_mentor:
-        doc.add_paragraph(f"• {q}")
-    
-    # Footer
-    doc.add_paragraph("─" * 50)
-    footer = doc.add_paragraph("Powered by ClarityOS | ExpertBells")
-    footer.runs[0].font.size = Pt(10)
-    
+    fields = {
+        "generated": datetime.now().strftime('%B %d, %Y at %I:%M %p'),
+        "category": category,
+        "user_summary": user_summary,
+        "insights": insights,
+        "metrics": metrics,
+        "questions_for_mentor": questions_for_mentor
+    }
+
     # Create output directory
-    output_dir = os.path.join(os.path.dirname(__file__), "generated_documents")
+    output_dir = GENERATED_DOCUMENTS_DIR
     os.makedirs(output_dir, exist_ok=True)
-    
+
     # Generate filename
     if not filename:
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         filename = f"addressible_{timestamp}.docx"
-    
+
     file_path = os.path.join(output_dir, filename)
-    doc.save(file_path)
-    
-    # Create text version for preview
-    text_content = f"""
-📋 MENTOR CONTEXT PACK
-━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-Category: {category}
-Generated: {datetime.now().strftime('%B %d, %Y')}
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    tmp_path = f"{file_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        get_template().render_docx(fields, f)
+    os.replace(tmp_path, file_path)
 
-📝 PROBLEM SUMMARY:
-{user_summary}
+    return file_path, render_preview_text(user_summary, category, insights, metrics, questions_for_mentor)
 
-💡 KEY INSIGHTS:
-{chr(10).join([f'  {i+1}. {ins}' for i, ins in enumerate(insights)])}
 
-📊 METRICS:
-{chr(10).join([f'  • {k}: {v}' for k, v in metrics.items()]) if metrics else '  (No metrics provided)'}
+def render_preview_text(
+    user_summary: str,
+    category: str,
+    insights: list,
+    metrics: dict,
+    questions_for_mentor: list
+) -> str:
+    """
+    Text version of the Mentor Context Pack for the chat preview.
+    Pure string work; never touches python-docx or the disk.
+    """
+    fields = {
+        "user_summary": user_summary,
+        "insights": insights,
+        "metrics": metrics,
+        "questions_for_mentor": questions_for_mentor
+    }
+    lines = [
+        "",
+        "📋 MENTOR CONTEXT PACK",
+        "━" * 28,
+        f"Category: {category}",
+        f"Generated: {datetime.now().strftime('%B %d, %Y')}",
+    ]
+    for field, _, preview_heading, style, _ in PACK_SECTIONS:
+        lines.append("")
+        lines.append(preview_heading)
+        if style == "text":
+            lines.append(str(fields[field]))
+        elif fields[field]:
+            lines.extend("  " + line for line in format_items(style, fields[field]))
+        else:
+            lines.append("  (No metrics provided)" if field == "metrics" else "")
+    lines.extend(["", "━" * 28, ""])
+    return "\n".join(lines)
 
-❓ QUESTIONS FOR MENTOR:
-{chr(10).join([f'  • {q}' for q in questions_for_mentor])}
 
-━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-"""
-    
-    return file_path, text_content
+def render_pack_html(fields: dict, mentors: list = None) -> str:
+    """HTML version of the Mentor Context Pack (for /generate-pdf)."""
+    body = [
+        f'<h1 style="color: #2563EB;">{html_escape(TITLE)}</h1>',
+        f'<p style="color: #6B7280;">Generated on {datetime.now().strftime("%B %d, %Y")}</p>',
+        "<hr>",
+    ]
+    for field, heading, _, style, optional in PACK_SECTIONS:
+        value = fields.get(field)
+        if not value and (optional or style != "text"):
+            continue
+        body.append(f"<h2>{html_escape(heading)}</h2>")
+        if style == "text":
+            body.append(f'<p style="background: #F3F4F6; padding: 16px; border-radius: 8px;">{html_escape(str(value))}</p>')
+            if field == "user_summary":
+                body.append(f"<h2>Category: {html_escape(fields.get('category', 'General'))}</h2>")
+        else:
+            items = "".join(f"<li>{html_escape(line.lstrip('• '))}</li>" for line in format_items(style, value))
+            body.append(f"<ol>{items}</ol>" if style == "numbered" else f"<ul>{items}</ul>")
+        if field == "user_summary" and mentors:
+            body.append("<h2>Recommended Mentors</h2>")
+            body.append("<ul>" + "".join(f"<li><b>{html_escape(m)}</b></li>" for m in mentors) + "</ul>")
+    body.append("<hr>")
+    body.append(f'<p style="color: #9CA3AF; font-size: 12px;">{html_escape(FOOTER)}</p>')
+
+    return (
+        "<!DOCTYPE html>\n<html>\n<head><title>Mentor Context Pack</title></head>\n"
+        '<body style="font-family: Arial, sans-serif; padding: 40px; max-width: 800px; margin: auto;">\n'
+        + "\n".join(body)
+        + "\n</body>\n</html>\n"
+    )
+
+
+def pack_revision(doc_data: dict) -> str:
+    """Content hash of a pack's fields; identical content => identical revision."""
+    canonical = json.dumps(doc_data, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.blake2b(canonical.encode("utf-8"), digest_size=10).hexdigest()
+
+
+# LLM output keys that carry pack content (extract_document_data fills in defaults for the rest)
+PACK_FIELDS = ("problem_summary", "insights", "metrics", "questions_for_mentor")
 
 
 def extract_document_data(conversation_history: list, ai_summary: dict) -> dict:
@@ -103,7 +332,7 @@ def extract_document_data(conversation_history: list, ai_summary: dict) -> dict:
     """
     # Combine all user messages
     user_messages = [m["content"] for m in conversation_history if m.get("role") == "user"]
-    
+
     return {
         "user_summary": ai_summary.get("problem_summary", " ".join(user_messages)),
         "category": ai_summary.get("category", "General"),
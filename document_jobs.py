@@ -0,0 +1,114 @@
+"""
+Document Jobs for ClarityOS
+Renders Mentor Context Pack .docx files in a background process pool,
+so python-docx never runs on the chat request path.
+
+Job lifecycle: queued -> running -> done | failed
+
+Jobs are keyed by output filename: enqueueing a file that already has a
+queued, running or finished job returns that job instead of rendering
+again (filenames carry the pack's content revision).
+"""
+import os
+import time
+import uuid
+import threading
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from dotenv import load_dotenv
+import metrics
+from structured_logging import get_logger
+
+# Load environment variables from .env.local
+load_dotenv('.env.local')
+
+logger = get_logger("document_jobs")
+
+DOC_RENDER_WORKERS = int(os.getenv("DOC_RENDER_WORKERS", "2"))
+DOC_JOBS_MAX_TRACKED = int(os.getenv("DOC_JOBS_MAX_TRACKED", "10000"))
+
+
+def _render(doc_data: dict, filename: str) -> tuple:
+    """Worker-process entry point. Returns (file_path, render_seconds)."""
+    from document_generator import create_addressible_docx
+    started = time.perf_counter()
+    file_path, _ = create_addressible_docx(**doc_data, filename=filename)
+    return file_path, time.perf_counter() - started
+
+
+class DocumentJobQueue:
+    def __init__(self, workers: int = DOC_RENDER_WORKERS, max_tracked: int = DOC_JOBS_MAX_TRACKED):
+        self.workers = workers
+        self.max_tracked = max_tracked
+        self._pool = None
+        self._jobs = OrderedDict()
+        self._by_filename = {}
+        self._lock = threading.Lock()
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._pool
+
+    def enqueue(self, doc_data: dict, filename: str = None) -> str:
+        """Queue a render and return its job id (or the existing job for `filename`)."""
+        job_id = uuid.uuid4().hex[:12]
+        filename = filename or f"addressible_{job_id}.docx"
+        job = {
+            "job_id": job_id,
+            "status": "queued",
+            "file_path": None,
+            "error": None,
+            "created_at": time.time(),
+            "finished_at": None,
+            "_filename": filename
+        }
+        with self._lock:
+            existing = self._jobs.get(self._by_filename.get(filename))
+            if existing is not None and existing["status"] != "failed":
+                return existing["job_id"]
+            self._jobs[job_id] = job
+            self._by_filename[filename] = job_id
+            while len(self._jobs) > self.max_tracked:
+                _, evicted = self._jobs.popitem(last=False)
+                if self._by_filename.get(evicted["_filename"]) == evicted["job_id"]:
+                    del self._by_filename[evicted["_filename"]]
+            job["_future"] = future = self._get_pool().submit(_render, doc_data, filename)
+        future.add_done_callback(lambda f: self._finish(job, f))
+        return job_id
+
+    def _finish(self, job: dict, future):
+        error = future.exception()
+        if error is None:
+            job["file_path"], seconds = future.result()
+            job["status"] = "done"
+            metrics.observe_stage("docx_render", seconds)
+        else:
+            logger.error("Document render failed", extra={"job_id": job["job_id"], "error": str(error)})
+            job["error"] = str(error)
+            job["status"] = "failed"
+        job["finished_at"] = time.time()
+
+    def status(self, job_id: str):
+        """Public view of a job, or None if unknown."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            view = {k: v for k, v in job.items() if not k.startswith("_")}
+        if view["status"] == "queued" and job["_future"].running():
+            view["status"] = "running"
+        return view
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+# Global instance
+document_jobs = DocumentJobQueue()
@@ -0,0 +1,131 @@
+"""
+Extraction Cache for ClarityOS
+On-disk, content-addressed store of upload extraction results.
+
+Entries are keyed by file_processor.extraction_key(): the BLAKE2b hash of
+the uploaded bytes, the file extension and the extractor version, so
+re-uploading the same deck skips parsing entirely but a parser change
+never serves stale output. Entries expire EXTRACTION_CACHE_TTL_SECONDS
+after they were written, and the directory is kept under
+EXTRACTION_CACHE_MAX_BYTES by evicting least-recently-used entries
+(a hit refreshes the entry's mtime).
+"""
+import os
+import json
+import time
+import threading
+from dotenv import load_dotenv
+import metrics
+
+# Load environment variables from .env.local
+load_dotenv('.env.local')
+
+EXTRACTION_CACHE_DIR = os.getenv(
+    "EXTRACTION_CACHE_DIR", os.path.join(os.path.dirname(__file__), "extraction_cache")
+)
+EXTRACTION_CACHE_MAX_BYTES = int(os.getenv("EXTRACTION_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+EXTRACTION_CACHE_TTL_SECONDS = int(os.getenv("EXTRACTION_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))  # 0 = never expire
+
+
+class ExtractionCache:
+    def __init__(self, directory: str = EXTRACTION_CACHE_DIR, max_bytes: int = EXTRACTION_CACHE_MAX_BYTES,
+                 ttl: int = EXTRACTION_CACHE_TTL_SECONDS):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._total_bytes = sum(size for _, _, size in self._entries())
+
+    def path_for(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key: str):
+        """Return the cached record for this key, or None if missing or expired."""
+        path = self.path_for(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                record = json.load(f)
+            cached_at = record.pop("_cached_at", 0)
+            if self.ttl and cached_at + self.ttl < time.time():
+                raise FileNotFoundError(path)  # expired: parse again and overwrite
+            os.utime(path)  # mark as recently used
+        except (FileNotFoundError, json.JSONDecodeError):
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return record
+
+    def put(self, key: str, record: dict) -> str:
+        """Store a record atomically and evict LRU entries if over budget."""
+        path = self.path_for(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(dict(record, _cached_at=time.time()), f, ensure_ascii=False)
+        size = os.path.getsize(tmp_path)
+        old_size = os.path.getsize(path) if os.path.exists(path) else 0
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            self._total_bytes += size - old_size
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+        return path
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "bytes": self._total_bytes,
+                "max_bytes": self.max_bytes
+            }
+
+    def _entries(self) -> list:
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(".json"):
+                continue
+            try:
+                st = os.stat(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime, name, st.st_size))
+        return entries
+
+    def _evict(self):
+        # Evict down to 90% of the budget so we don't rescan on every put
+        target = int(self.max_bytes * 0.9)
+        entries = sorted(self._entries())
+        total = sum(size for _, _, size in entries)
+        for _, name, size in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(os.path.join(self.directory, name))
+                total -= size
+            except FileNotFoundError:
+                pass
+        self._total_bytes = total
+
+
+# Global instance
+extraction_cache = ExtractionCache()
+
+
+def _collect_metrics() -> list:
+    stats = extraction_cache.stats()
+    return [
+        ("clarity_extraction_cache_hits_total", "counter", "Uploads served from the extraction cache", stats["hits"]),
+        ("clarity_extraction_cache_misses_total", "counter", "Uploads that were parsed", stats["misses"]),
+        ("clarity_extraction_cache_bytes", "gauge", "Size of the extraction cache on disk", stats["bytes"]),
+    ]
+
+
+metrics.register_collector(_collect_metrics)
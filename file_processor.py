@@ -1,64 +1,278 @@
 """
 File Processor for ClarityOS
 Extracts text from uploaded files: PDF, DOCX, CSV, XLSX, PPTX, TXT, MD
+
+Uploads are read straight off the request stream into a temp file
+(enforcing MAX_UPLOAD_BYTES as they arrive) and parsed in a process pool,
+so large documents never block the event loop.
 """
-import io
-from fastapi import UploadFile
+import os
+import re
+import asyncio
+import hashlib
+import tempfile
+import multiprocessing
+from typing import Optional
+from concurrent.futures import ProcessPoolExecutor
+from starlette.requests import Request
+from dotenv import load_dotenv
+from structured_logging import get_logger
+
+# Load environment variables from .env.local
+load_dotenv('.env.local')
+
+logger = get_logger("file_processor")
+
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(25 * 1024 * 1024)))
+MAX_PDF_PAGES = int(os.getenv("MAX_PDF_PAGES", "100"))
+MAX_SLIDES = int(os.getenv("MAX_SLIDES", "100"))
+MAX_DOCX_PARAGRAPHS = int(os.getenv("MAX_DOCX_PARAGRAPHS", "5000"))
+EXTRACTION_WORKERS = int(os.getenv("EXTRACTION_WORKERS", "2"))
+# Spawn the extraction workers at startup; with many uvicorn workers, turn
+# off to keep idle parser processes (~100 MB each) from being multiplied
+EXTRACTION_PREWARM = os.getenv("EXTRACTION_PREWARM", "true").lower() in ("1", "true", "yes")
+# Room for the multipart framing and form fields around the file itself
+FORM_OVERHEAD_BYTES = 64 * 1024
+
+# Imported inside the workers only when needed (or by prewarm())
+PARSER_MODULES = ("pypdf", "docx", "pandas", "openpyxl", "pptx", "table_profile")
+
+# Part of every extraction cache key: bump it whenever an extractor's output
+# changes, so results cached by older code are not served
+# (2: CSV/XLSX column profiles instead of df.to_string())
+EXTRACTOR_VERSION = 2
+
+# Messages returned in place of content when extraction fails (never cached)
+ERROR_PREFIXES = ("Error reading file:", "Unsupported file format:")
+
+_pool = None
+
+
+class FileTooLargeError(ValueError):
+    """Upload exceeded MAX_UPLOAD_BYTES."""
+
+
+def get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(
+            max_workers=EXTRACTION_WORKERS,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+    return _pool
+
+
+def _import_parsers() -> list:
+    """Worker-process entry point: import the parser libraries up front."""
+    loaded = []
+    for module in PARSER_MODULES:
+        try:
+            __import__(module)
+            loaded.append(module)
+        except ImportError:
+            pass
+    return loaded
+
+
+def prewarm() -> list:
+    """
+    Start the extraction workers and have each import the parsers, so the
+    first upload doesn't pay for process spawn + pandas/pypdf/pptx imports.
+    Blocking; returns the modules loaded. Run it off the event loop.
+    """
+    pool = get_pool()
+    futures = [pool.submit(_import_parsers) for _ in range(EXTRACTION_WORKERS)]
+    return sorted(set().union(*(f.result() for f in futures)))
+
+
+def shutdown_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def is_extraction_error(text: str) -> bool:
+    return text.startswith(ERROR_PREFIXES)
+
+
+def _too_large(max_bytes: int) -> FileTooLargeError:
+    return FileTooLargeError(f"File exceeds the {round(max_bytes / (1024 * 1024), 1):g} MB upload limit")
+
+
+async def receive_upload(request: Request, max_bytes: Optional[int] = None) -> tuple:
+    """
+    Read a multipart/form-data upload straight off the ASGI request
+    stream. The "file" part is hashed (BLAKE2b) and written to a named
+    temp file in the same pass, so it is never buffered or copied
+    elsewhere first. Uploads over max_bytes are refused up front when
+    Content-Length says so, and otherwise as soon as the count passes it.
+    Returns (temp_path, content_hash, filename, fields); the caller
+    removes the file.
+    """
+    try:
+        import python_multipart as multipart
+        from python_multipart.multipart import parse_options_header
+    except ImportError:  # python-multipart < 0.0.13
+        import multipart
+        from multipart.multipart import parse_options_header
+
+    if max_bytes is None:
+        max_bytes = MAX_UPLOAD_BYTES
+    body_limit = max_bytes + FORM_OVERHEAD_BYTES
+    content_length = request.headers.get("content-length", "")
+    if content_length.isdigit() and int(content_length) > body_limit:
+        raise _too_large(max_bytes)
+    content_type, params = parse_options_header(request.headers.get("content-type", ""))
+    if content_type != b"multipart/form-data" or b"boundary" not in params:
+        raise ValueError("Expected a multipart/form-data upload with a file field")
+
+    hasher = hashlib.blake2b(digest_size=20)
+    upload = {"path": None, "out": None, "filename": None, "size": 0}
+    fields = {}
+    part = {"headers": {}, "field": b"", "value": b"", "name": None}
+
+    def on_part_begin():
+        part.update(headers={}, field=b"", value=b"", name=None)
+
+    def on_header_field(data, start, end):
+        part["field"] += data[start:end]
+
+    def on_header_value(data, start, end):
+        part["value"] += data[start:end]
+
+    def on_header_end():
+        part["headers"][part["field"].lower()] = part["value"]
+        part["field"], part["value"] = b"", b""
 
-async def extract_text_from_file(file: UploadFile) -> str:
+    def on_headers_finished():
+        _, options = parse_options_header(part["headers"].get(b"content-disposition", b""))
+        name = options.get(b"name", b"").decode("utf-8", "replace")
+        if name == "file" and b"filename" in options and upload["out"] is None:
+            upload["filename"] = options[b"filename"].decode("utf-8", "replace")
+            suffix = os.path.splitext(upload["filename"])[1].lower()
+            fd, upload["path"] = tempfile.mkstemp(prefix="clarity_upload_", suffix=suffix)
+            upload["out"] = os.fdopen(fd, "wb")
+            part["name"] = None
+        else:
+            part["name"] = name
+            fields[name] = b""
+
+    def on_part_data(data, start, end):
+        chunk = data[start:end]
+        if part["name"] is not None:
+            fields[part["name"]] += chunk
+            return
+        upload["size"] += len(chunk)
+        if upload["size"] > max_bytes:
+            raise _too_large(max_bytes)
+        hasher.update(chunk)
+        upload["out"].write(chunk)
+
+    parser = multipart.MultipartParser(params[b"boundary"], {
+        "on_part_begin": on_part_begin,
+        "on_header_field": on_header_field,
+        "on_header_value": on_header_value,
+        "on_header_end": on_header_end,
+        "on_headers_finished": on_headers_finished,
+        "on_part_data": on_part_data,
+    })
+    received = 0
+    try:
+        async for chunk in request.stream():
+            received += len(chunk)
+            if received > body_limit:
+                raise _too_large(max_bytes)
+            parser.write(chunk)
+        parser.finalize()
+        if upload["out"] is None:
+            raise ValueError("Expected a multipart/form-data upload with a file field")
+        upload["out"].close()
+    except BaseException:
+        if upload["out"] is not None:
+            upload["out"].close()
+            os.unlink(upload["path"])
+        raise
+    return upload["path"], hasher.hexdigest(), upload["filename"], \
+        {k: v.decode("utf-8", "replace") for k, v in fields.items()}
+
+
+def extract_text_from_path(path: str, filename: str) -> str:
     """
-    Extract text content from various file types.
+    Extract text content from a file on disk. Runs in a worker process.
     Returns the text as a string.
     """
-    filename = file.filename.lower()
-    content = await file.read()
-    
+    filename = filename.lower()
+
     try:
         # PDF files
         if filename.endswith(".pdf"):
             import pypdf
-            pdf = pypdf.PdfReader(io.BytesIO(content))
-            text = ""
-            for page in pdf.pages:
-                text += page.extract_text() + "\n"
-            return text
-        
-        # Word documents    
+            pdf = pypdf.PdfReader(path)
+            pages = []
+            for page in pdf.pages[:MAX_PDF_PAGES]:
+                pages.append(page.extract_text() or "")
+            if len(pdf.pages) > MAX_PDF_PAGES:
+                pages.append(f"[Truncated: first {MAX_PDF_PAGES} of {len(pdf.pages)} pages]")
+            return "\n".join(pages) + "\n"
+
+        # Word documents
         elif filename.endswith(".docx") or filename.endswith(".doc"):
             import docx
-            doc = docx.Document(io.BytesIO(content))
-            return "\n".join([para.text for para in doc.paragraphs])
-        
+            doc = docx.Document(path)
+            paragraphs = doc.paragraphs
+            text = [para.text for para in paragraphs[:MAX_DOCX_PARAGRAPHS]]
+            if len(paragraphs) > MAX_DOCX_PARAGRAPHS:
+                text.append(f"[Truncated: first {MAX_DOCX_PARAGRAPHS} of {len(paragraphs)} paragraphs]")
+            return "\n".join(text)
+
         # Plain text and Markdown
         elif filename.endswith(".txt") or filename.endswith(".md"):
-            return content.decode("utf-8")
-        
-        # CSV files
+            with open(path, "r", encoding="utf-8") as f:
+                return f.read()
+
+        # CSV files: streamed column profile + row sample (see table_profile.py)
         elif filename.endswith(".csv"):
-            import pandas as pd
-            df = pd.read_csv(io.BytesIO(content))
-            return df.to_string()
-        
-        # Excel files
+            from table_profile import profile_csv
+            return profile_csv(path)
+
+        # Excel files: every sheet, profiled the same way
         elif filename.endswith(".xlsx") or filename.endswith(".xls"):
-            import pandas as pd
-            df = pd.read_excel(io.BytesIO(content))
-            return df.to_string()
-        
+            from table_profile import profile_excel
+            return profile_excel(path)
+
         # PowerPoint files
         elif filename.endswith(".ppt") or filename.endswith(".pptx"):
             from pptx import Presentation
-            prs = Presentation(io.BytesIO(content))
+            prs = Presentation(path)
             text = []
-            for slide in prs.slides:
+            for i, slide in enumerate(prs.slides):
+                if i >= MAX_SLIDES:
+                    text.append(f"[Truncated: first {MAX_SLIDES} slides]")
+                    break
                 for shape in slide.shapes:
                     if hasattr(shape, "text"):
                         text.append(shape.text)
             return "\n".join(text)
-        
+
         else:
             return f"Unsupported file format: {filename}. Supported: PDF, DOCX, TXT, MD, CSV, XLSX, PPTX"
-            
+
     except Exception as e:
-        print(f"Error extracting text from {filename}: {e}")
+        logger.warning("Text extraction failed", extra={"upload_filename": filename, "error": str(e)})
         return f"Error reading file: {str(e)}"
+
+
+def extraction_key(content_hash: str, filename: str) -> str:
+    """
+    Extraction cache key. The same bytes are parsed differently per
+    extension (.csv vs .txt) and per EXTRACTOR_VERSION.
+    """
+    extension = re.sub(r"[^a-z0-9]", "_", os.path.splitext(filename)[1].lower().lstrip("."))[:16] or "none"
+    return f"{content_hash}.{extension}.v{EXTRACTOR_VERSION}"
+
+
+async def extract_text_from_spooled(path: str, filename: str) -> str:
+    """Run extract_text_from_path in the process pool."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_pool(), extract_text_from_path, path, filename)
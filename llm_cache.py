@@ -0,0 +1,222 @@
+"""
+LLM Cache for ClarityOS
+Response cache and request coalescing for identical LLM calls.
+
+Calls are keyed by a hash of (model, messages, temperature, max_tokens).
+Completed responses live in an in-memory LRU with TTL, optionally backed
+by a SQLite file (LLM_CACHE_DB_PATH) so they survive restarts and are
+shared between workers. Identical calls that arrive while one is already
+in flight wait for it instead of going upstream (single-flight).
+
+Only completions the model finished (finish_reason "stop") are stored; a
+reply cut off by max_tokens or a content filter is handed to the callers
+waiting on it but not replayed to later ones.
+"""
+import os
+import json
+import time
+import asyncio
+import hashlib
+import sqlite3
+import threading
+from collections import OrderedDict
+from dotenv import load_dotenv
+import metrics
+
+# Load environment variables from .env.local
+load_dotenv('.env.local')
+
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+LLM_CACHE_TTL_SECONDS = int(os.getenv("LLM_CACHE_TTL_SECONDS", "600"))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "1000"))
+LLM_CACHE_DB_PATH = os.getenv("LLM_CACHE_DB_PATH", "")  # empty = memory only
+
+
+def cache_key(params: dict) -> str:
+    """Stable hash of the request parameters that determine the completion."""
+    canonical = json.dumps(params, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.blake2b(canonical.encode("utf-8"), digest_size=20).hexdigest()
+
+
+class LLMCache:
+    def __init__(self, ttl: int = LLM_CACHE_TTL_SECONDS, max_entries: int = LLM_CACHE_MAX_ENTRIES,
+                 db_path: str = LLM_CACHE_DB_PATH):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.db_path = db_path
+        self._data = OrderedDict()
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.counters = {"memory_hits": 0, "disk_hits": 0, "coalesced": 0, "misses": 0, "upstream_calls": 0}
+        if db_path:
+            with self._conn() as conn:
+                conn.execute("""
+                    CREATE TABLE IF NOT EXISTS llm_cache (
+                        key TEXT PRIMARY KEY,
+                        value TEXT NOT NULL,
+                        expires_at REAL NOT NULL
+                    )
+                """)
+                conn.execute("CREATE INDEX IF NOT EXISTS llm_cache_expires ON llm_cache(expires_at)")
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _count(self, name: str):
+        with self._lock:
+            self.counters[name] += 1
+
+    # --- STORAGE ---
+
+    def get(self, key: str):
+        """Cached completion text, or None (memory first, then disk)."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at >= time.monotonic():
+                    self._data.move_to_end(key)
+                    self.counters["memory_hits"] += 1
+                    return value
+                del self._data[key]
+
+        if self.db_path:
+            row = self._conn().execute(
+                "SELECT value, expires_at FROM llm_cache WHERE key = ? AND expires_at >= ?",
+                (key, time.time())
+            ).fetchone()
+            if row:
+                self._put_memory(key, row[0], row[1] - time.time())
+                self._count("disk_hits")
+                return row[0]
+        return None
+
+    def put(self, key: str, value: str):
+        self._put_memory(key, value, self.ttl)
+        if self.db_path:
+            with self._conn() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO llm_cache (key, value, expires_at) VALUES (?, ?, ?)",
+                    (key, value, time.time() + self.ttl)
+                )
+                conn.execute("DELETE FROM llm_cache WHERE expires_at < ?", (time.time(),))
+
+    def _put_memory(self, key: str, value: str, ttl: float):
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            now = time.monotonic()
+            while self._data:
+                oldest_key, (expires_at, _) = next(iter(self._data.items()))
+                if expires_at >= now and len(self._data) <= self.max_entries:
+                    break
+                del self._data[oldest_key]
+
+    # --- SINGLE-FLIGHT ---
+
+    async def get_or_call(self, key: str, call):
+        """
+        Return the cached completion for `key`, join an identical in-flight
+        call, or run `call()` (a coroutine function returning
+        (completion, cacheable)) and cache the completion if cacheable.
+        The upstream call runs as its own task, so a caller that goes away
+        does not cancel it for the others.
+        """
+        value = self.get(key)
+        if value is not None:
+            return value
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self._count("coalesced")
+            return await asyncio.shield(task)
+
+        self._count("misses")
+        self._count("upstream_calls")
+        task = asyncio.ensure_future(self._call_and_store(key, call))
+        self._inflight[key] = task
+        return await asyncio.shield(task)
+
+    async def _call_and_store(self, key: str, call) -> str:
+        try:
+            value, cacheable = await call()
+            if value and cacheable:
+                self.put(key, value)
+            return value
+        finally:
+            self._inflight.pop(key, None)
+
+    async def join(self, key: str):
+        """
+        Wait for an identical in-flight call, if there is one.
+        Returns its completion, or None when nothing is in flight or it failed.
+        """
+        pending = self._inflight.get(key)
+        if pending is None:
+            return None
+        try:
+            value = await asyncio.shield(pending)
+        except Exception:
+            return None
+        if value is not None:
+            self._count("coalesced")
+        return value
+
+    def begin(self, key: str) -> asyncio.Future:
+        """Register a call this caller runs itself (e.g. a stream); settle with finish()."""
+        self._count("misses")
+        self._count("upstream_calls")
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        return future
+
+    def finish(self, key: str, future: asyncio.Future, value: str = None, cacheable: bool = True):
+        """Complete a begin(): cache `value` if given and cacheable, and wake any joiners."""
+        if value and cacheable:
+            self.put(key, value)
+        if not future.done():
+            future.set_result(value)
+        if self._inflight.get(key) is future:
+            del self._inflight[key]
+
+    def stats(self) -> dict:
+        with self._lock:
+            c = dict(self.counters)
+            entries = len(self._data)
+        hits = c["memory_hits"] + c["disk_hits"]
+        requests = hits + c["coalesced"] + c["misses"]
+        return {
+            **c,
+            "hits": hits,
+            "requests": requests,
+            "hit_rate": round(hits / requests, 4) if requests else 0.0,
+            "upstream_calls_saved": hits + c["coalesced"],
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl,
+            "disk": bool(self.db_path)
+        }
+
+
+# Global instance
+llm_cache = LLMCache()
+
+
+def _collect_metrics() -> list:
+    stats = llm_cache.stats()
+    return [
+        ("clarity_llm_cache_hits_total", "counter", "LLM calls answered from the response cache", stats["hits"]),
+        ("clarity_llm_cache_coalesced_total", "counter", "LLM calls that joined an identical in-flight call", stats["coalesced"]),
+        ("clarity_llm_cache_misses_total", "counter", "LLM calls that went upstream", stats["misses"]),
+        ("clarity_llm_cache_entries", "gauge", "Completions held in the in-memory cache", stats["entries"]),
+    ]
+
+
+metrics.register_collector(_collect_metrics)
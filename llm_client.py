@@ -0,0 +1,233 @@
+"""
+LLM Client for ClarityOS
+Shared async NVIDIA NIM client with a pooled HTTP connection and admission control
+
+Upstream calls go through an AdmissionController (admission.py): an
+adaptive concurrency limit, a priority queue and per-call deadlines that
+turn a saturated upstream into fast Overloaded errors instead of a pile
+of waiting requests.
+
+Completions go through llm_cache: identical calls are served from the
+response cache or coalesced onto the call already in flight. Only
+completions that end with finish_reason "stop" are cached.
+
+The openai SDK is imported and the client built on first use (or by the
+server's startup warm-up), so importing this module stays cheap.
+"""
+import os
+import time
+from dotenv import load_dotenv
+from admission import AdmissionController, GATHER
+from llm_cache import llm_cache, cache_key, LLM_CACHE_ENABLED
+from prompt_builder import count_tokens, count_message_tokens
+import metrics
+from structured_logging import get_logger
+
+# Load environment variables from .env.local
+load_dotenv('.env.local')
+
+logger = get_logger("llm_client")
+
+# --- NVIDIA NIM CONFIGURATION ---
+NVIDIA_API_KEY = os.getenv("NVIDIA_API_KEY", "")
+NVIDIA_BASE_URL = os.getenv("NVIDIA_BASE_URL", "https://integrate.api.nvidia.com/v1")
+MODEL_ID = os.getenv("NVIDIA_MODEL_ID", "openai/gpt-oss-20b")
+
+# --- CONNECTION POOL & LIMITS ---
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "60"))
+LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", "5"))
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "64"))
+LLM_MAX_KEEPALIVE = int(os.getenv("LLM_MAX_KEEPALIVE", "32"))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "32"))
+LLM_MIN_CONCURRENCY = int(os.getenv("LLM_MIN_CONCURRENCY", "2"))
+LLM_MAX_QUEUE = int(os.getenv("LLM_MAX_QUEUE", "256"))
+# Latency above this multiple of the recent best counts as congestion
+LLM_LATENCY_TOLERANCE = float(os.getenv("LLM_LATENCY_TOLERANCE", "2.0"))
+
+# Ask for response_format=json_object on calls that expect JSON. Switched
+# off for the rest of the process if the server rejects the parameter.
+LLM_JSON_MODE = os.getenv("LLM_JSON_MODE", "true").lower() in ("1", "true", "yes")
+_json_mode_supported = LLM_JSON_MODE
+
+_client = None
+
+
+def get_client():
+    """The shared AsyncOpenAI client, built on first call."""
+    global _client
+    if _client is None:
+        import httpx
+        from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+        _client = AsyncOpenAI(
+            base_url=NVIDIA_BASE_URL,
+            api_key=NVIDIA_API_KEY,
+            timeout=LLM_TIMEOUT,
+            http_client=DefaultAsyncHttpxClient(
+                limits=httpx.Limits(
+                    max_connections=LLM_MAX_CONNECTIONS,
+                    max_keepalive_connections=LLM_MAX_KEEPALIVE
+                ),
+                timeout=httpx.Timeout(LLM_TIMEOUT, connect=LLM_CONNECT_TIMEOUT)
+            )
+        )
+    return _client
+
+
+def is_ready() -> bool:
+    return _client is not None
+
+admission = AdmissionController(
+    "nim",
+    max_limit=LLM_MAX_CONCURRENCY,
+    min_limit=LLM_MIN_CONCURRENCY,
+    max_queue=LLM_MAX_QUEUE,
+    latency_tolerance=LLM_LATENCY_TOLERANCE
+)
+
+
+def _timeout(timeout: float, deadline: float) -> float:
+    """Per-call timeout, capped by what is left of the deadline."""
+    timeout = timeout or LLM_TIMEOUT
+    if deadline is not None:
+        timeout = min(timeout, max(deadline - time.monotonic(), 0.1))
+    return timeout
+
+
+def _params(messages: list, temperature: float, max_tokens: int = None, json_mode: bool = False) -> dict:
+    params = {"model": MODEL_ID, "messages": messages, "temperature": temperature}
+    if max_tokens:
+        params["max_tokens"] = max_tokens
+    if json_mode and _json_mode_supported:
+        params["response_format"] = {"type": "json_object"}
+    return params
+
+
+async def _create(params: dict, **kwargs):
+    """
+    chat.completions.create, retried once without response_format if the
+    server refuses JSON mode.
+    """
+    global _json_mode_supported
+    client = get_client()
+    from openai import BadRequestError, UnprocessableEntityError
+    try:
+        return await client.chat.completions.create(**params, **kwargs)
+    except (BadRequestError, UnprocessableEntityError) as e:
+        if "response_format" not in params:
+            raise
+        logger.warning("JSON mode not supported, disabling", extra={"base_url": NVIDIA_BASE_URL, "error": str(e)})
+        _json_mode_supported = False
+        params = {k: v for k, v in params.items() if k != "response_format"}
+        return await client.chat.completions.create(**params, **kwargs)
+
+
+async def chat_completion(
+    messages: list,
+    temperature: float,
+    max_tokens: int = None,
+    timeout: float = None,
+    cache: bool = True,
+    json_mode: bool = False,
+    priority: int = GATHER,
+    deadline: float = None
+) -> str:
+    """
+    Run a chat completion against NIM without blocking the event loop.
+    The call waits for an admission slot by `priority`; with a `deadline`
+    (time.monotonic()) it raises Overloaded when it can't finish in time.
+    With `cache`, identical calls are answered from llm_cache; with
+    `json_mode`, the server is asked for a JSON object when it supports it.
+    Returns the raw message content.
+    """
+    params = _params(messages, temperature, max_tokens, json_mode)
+
+    async def call():
+        async with admission.slot(priority, deadline) as upstream:
+            try:
+                completion = await _create(params, timeout=_timeout(timeout, deadline))
+            except Exception:
+                metrics.llm_calls.inc(kind="chat", outcome="error")
+                raise
+            content = completion.choices[0].message.content
+            finish_reason = completion.choices[0].finish_reason
+            usage = completion.usage
+            upstream.output_tokens = usage.completion_tokens if usage else count_tokens(content or "")
+        metrics.llm_calls.inc(kind="chat", outcome="ok")
+        record_tokens(usage.prompt_tokens if usage else count_message_tokens(messages), upstream.output_tokens)
+        if finish_reason != "stop":
+            logger.info("Completion not cached", extra={"finish_reason": finish_reason})
+        return content, finish_reason == "stop"
+
+    if not (cache and LLM_CACHE_ENABLED):
+        return (await call())[0]
+    return await llm_cache.get_or_call(cache_key(params), call)
+
+
+async def stream_chat_completion(
+    messages: list,
+    temperature: float,
+    max_tokens: int = None,
+    timeout: float = None,
+    cache: bool = True,
+    json_mode: bool = False,
+    priority: int = GATHER,
+    deadline: float = None
+):
+    """
+    Streaming variant of chat_completion.
+    Yields content deltas as NIM produces them; the admission slot is
+    held until the stream is exhausted or closed. Overloaded is raised
+    before the first delta.
+    A cached (or coalesced) completion is yielded as a single delta; a
+    stream that runs to the end with finish_reason "stop" is cached for
+    later identical calls.
+    """
+    params = _params(messages, temperature, max_tokens, json_mode)
+    key = cache_key(params) if cache and LLM_CACHE_ENABLED else None
+    if key:
+        cached = llm_cache.get(key) or await llm_cache.join(key)
+        if cached is not None:
+            yield cached
+            return
+        pending = llm_cache.begin(key)
+
+    parts = []
+    finish_reason = None
+    admitted = complete = False
+    try:
+        async with admission.slot(priority, deadline) as upstream:
+            admitted = True
+            stream = await _create(params, stream=True, timeout=_timeout(timeout, deadline))
+            try:
+                async for chunk in stream:
+                    if chunk.choices and chunk.choices[0].finish_reason:
+                        finish_reason = chunk.choices[0].finish_reason
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        parts.append(chunk.choices[0].delta.content)
+                        yield chunk.choices[0].delta.content
+            finally:
+                await stream.close()
+            upstream.output_tokens = count_tokens("".join(parts))
+        complete = True
+    finally:
+        # "aborted": the consumer stopped reading (e.g. client disconnected);
+        # calls refused by admission control are counted there
+        if admitted:
+            metrics.llm_calls.inc(kind="stream", outcome="ok" if complete else "aborted" if parts else "error")
+        if parts:
+            record_tokens(count_message_tokens(messages), count_tokens("".join(parts)))
+        if key:
+            llm_cache.finish(key, pending, "".join(parts) if complete else None, cacheable=finish_reason == "stop")
+
+
+def record_tokens(prompt_tokens: int, completion_tokens: int):
+    metrics.llm_tokens.inc(prompt_tokens, direction="prompt")
+    metrics.llm_tokens.inc(completion_tokens, direction="completion")
+
+
+async def close():
+    """Release pooled connections."""
+    global _client
+    if _client is not None:
+        await _client.close()
+        _client = None
@@ -0,0 +1,383 @@
+"""
+LLM Output Parser for ClarityOS
+Extraction and validation of the structured JSON our prompts ask for
+
+ReplyStreamExtractor decodes the "reply" field while a completion streams;
+parse_llm_json pulls the first usable object out of a full completion
+(code fences, surrounding prose, trailing commas, truncated output) and
+validates it against the documented diagnosis / scribe formats.
+"""
+import re
+import json
+import math
+
+# JSON escape sequences that map to a single character
+_SIMPLE_ESCAPES = {
+    '"': '"', '\\': '\\', '/': '/',
+    'b': '\b', 'f': '\f', 'n': '\n', 'r': '\r', 't': '\t'
+}
+
+
+class ReplyStreamExtractor:
+    """
+    Single-pass scanner over a streamed LLM completion.
+
+    Each chunk is scanned once: the decoded characters of the top-level
+    "reply" string are returned as they arrive, and the span of the first
+    balanced top-level object is tracked so the full JSON can be parsed
+    once at the end without re-scanning the buffer.
+    """
+
+    def __init__(self, field: str = "reply"):
+        self.field = field
+        self._chunks = []
+        self._pos = 0
+        self._depth = 0
+        self._start = None
+        self._end = None
+        self._in_string = False
+        self._escape = False
+        self._unicode = None
+        self._high_surrogate = None
+        self._expect_value = False
+        self._key = None
+        self._key_chars = None
+        self._in_field = False
+
+    def feed(self, chunk: str) -> str:
+        """Consume a chunk and return any newly decoded reply text."""
+        self._chunks.append(chunk)
+        out = []
+        for ch in chunk:
+            self._step(ch, out)
+            self._pos += 1
+        return "".join(out)
+
+    def text(self) -> str:
+        """Full raw completion received so far."""
+        return "".join(self._chunks)
+
+    def json_text(self):
+        """The first complete top-level JSON object, or None."""
+        if self._start is None or self._end is None:
+            return None
+        return self.text()[self._start:self._end]
+
+    def _step(self, ch: str, out: list):
+        if self._end is not None:
+            return
+
+        if self._in_string:
+            if self._unicode is not None:
+                self._unicode.append(ch)
+                if len(self._unicode) == 4:
+                    self._emit_codepoint(int("".join(self._unicode), 16), out)
+                    self._unicode = None
+            elif self._escape:
+                self._escape = False
+                if ch == 'u':
+                    self._unicode = []
+                elif self._in_field:
+                    out.append(_SIMPLE_ESCAPES.get(ch, ch))
+                elif self._key_chars is not None:
+                    self._key_chars.append(_SIMPLE_ESCAPES.get(ch, ch))
+            elif ch == '\\':
+                self._escape = True
+            elif ch == '"':
+                self._in_string = False
+                if self._key_chars is not None:
+                    self._key = "".join(self._key_chars)
+                    self._key_chars = None
+                self._in_field = False
+            elif self._in_field:
+                out.append(ch)
+            elif self._key_chars is not None:
+                self._key_chars.append(ch)
+            return
+
+        if ch == '{' or ch == '[':
+            if self._depth == 0:
+                if ch == '[':
+                    return
+                self._start = self._pos
+            self._depth += 1
+        elif ch == '}' or ch == ']':
+            if self._depth == 0:
+                return
+            self._depth -= 1
+            if self._depth == 0:
+                self._end = self._pos + 1
+        elif self._depth == 0:
+            return
+        elif ch == '"':
+            self._in_string = True
+            if self._depth == 1:
+                if self._expect_value:
+                    self._in_field = self._key == self.field
+                else:
+                    self._key_chars = []
+                self._expect_value = False
+        elif self._depth == 1:
+            if ch == ':':
+                self._expect_value = True
+            elif ch == ',':
+                self._expect_value = False
+                self._key = None
+
+    def _emit_codepoint(self, code: int, out: list):
+        if not self._in_field:
+            return
+        if 0xD800 <= code <= 0xDBFF:
+            self._high_surrogate = code
+            return
+        if 0xDC00 <= code <= 0xDFFF and self._high_surrogate is not None:
+            code = 0x10000 + ((self._high_surrogate - 0xD800) << 10) + (code - 0xDC00)
+        self._high_surrogate = None
+        out.append(chr(code))
+
+
+# --- BATCH EXTRACTION ---
+
+FENCE_PATTERN = re.compile(r"```(?:json|JSON)?[ \t]*\n?(.*?)```", re.S)
+_TRAILING_COMMA = re.compile(r",(\s*[}\]])")
+_CLOSERS = {"{": "}", "[": "]"}
+
+
+def scan_objects(text: str, start: int = 0):
+    """
+    Single pass over `text` yielding (start, end, complete) for each
+    top-level JSON object, skipping braces inside strings. A final object
+    cut off by the end of the text is yielded with complete=False.
+    """
+    depth = 0
+    obj_start = None
+    in_string = escape = False
+    for i in range(start, len(text)):
+        ch = text[i]
+        if in_string:
+            if escape:
+                escape = False
+            elif ch == "\\":
+                escape = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            if depth:
+                in_string = True
+        elif ch == "{" or ch == "[":
+            if depth == 0:
+                if ch == "[":
+                    continue
+                obj_start = i
+            depth += 1
+        elif (ch == "}" or ch == "]") and depth:
+            depth -= 1
+            if depth == 0:
+                yield obj_start, i + 1, True
+                obj_start = None
+    if obj_start is not None:
+        yield obj_start, len(text), False
+
+
+def repair_json(candidate: str) -> str:
+    """
+    Best-effort fixes for common model mistakes: trailing commas, and an
+    object cut off mid-way (closes the open string and brackets).
+    """
+    stack = []
+    in_string = escape = False
+    for ch in candidate:
+        if in_string:
+            if escape:
+                escape = False
+            elif ch == "\\":
+                escape = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch in _CLOSERS:
+            stack.append(_CLOSERS[ch])
+        elif ch in "}]" and stack:
+            stack.pop()
+
+    repaired = candidate
+    if in_string:
+        repaired = (repaired[:-1] if escape else repaired) + '"'
+    repaired = repaired.rstrip().rstrip(",")
+    if repaired.endswith(":"):
+        repaired += " null"
+    repaired += "".join(reversed(stack))
+    return _TRAILING_COMMA.sub(r"\1", repaired)
+
+
+def _loads_object(candidate: str, complete: bool = True):
+    attempts = [candidate, repair_json(candidate)] if complete else [repair_json(candidate)]
+    if not complete:
+        # Output cut off mid-field: also retry from the last few commas back
+        cut = len(candidate)
+        for _ in range(3):
+            cut = candidate.rfind(",", 0, cut)
+            if cut <= 0:
+                break
+            attempts.append(repair_json(candidate[:cut]))
+    for attempt in attempts:
+        try:
+            data = json.loads(attempt)
+        except ValueError:
+            continue
+        if isinstance(data, dict):
+            return data
+    return None
+
+
+def extract_json(text: str, json_text: str = None):
+    """
+    The first JSON object in an LLM completion that parses (after repair).
+    Fenced ```json blocks are tried first, then every top-level object in
+    the raw text; `json_text` (e.g. from ReplyStreamExtractor) is tried
+    before either. Returns a dict or None.
+    """
+    if json_text:
+        data = _loads_object(json_text)
+        if data is not None:
+            return data
+
+    regions = [m.group(1) for m in FENCE_PATTERN.finditer(text)] + [text]
+    for region in regions:
+        for start, end, complete in scan_objects(region):
+            data = _loads_object(region[start:end], complete)
+            if data is not None:
+                return data
+    return None
+
+
+# --- SCHEMAS ---
+# field -> (type, default or MISSING, allowed values / (min, max) or None)
+# Types: str, int, bool, dict (string map), [type] (list), {schema} (object)
+
+MISSING = object()
+
+DIAGNOSIS_SCHEMA = {
+    "reply": (str, MISSING, None),
+    "category": (str, "General", ("Fundraising", "Growth", "Product-Market Fit", "General")),
+    "conversation_state": (str, "gathering_info", ("gathering_info", "reviewing_doc", "finalized")),
+    "question_count": (int, MISSING, None),
+    "ready_for_document": (bool, False, None),
+    "document_finalized": (bool, False, None),
+    "problem_summary": (str, MISSING, None),
+    "insights": ([str], MISSING, None),
+    "metrics": (dict, MISSING, None),
+    "questions_for_mentor": ([str], MISSING, None),
+    "keywords": ([str], MISSING, None),
+}
+
+ACTION_ITEM_SCHEMA = {
+    "task": (str, MISSING, None),
+    "why": (str, MISSING, None),
+    "due": (str, MISSING, None),
+    "metric": (str, MISSING, None),
+}
+
+SCRIBE_SCHEMA = {
+    "action_plan": ([ACTION_ITEM_SCHEMA], MISSING, None),
+    "clarity_score": (int, MISSING, (0, 100)),
+    "reason": (str, MISSING, None),
+}
+
+
+def _coerce(value, kind, allowed, path: str, errors: list):
+    """Coerce value to `kind`; returns MISSING (and records why) when it can't."""
+    if isinstance(kind, list):
+        if not isinstance(value, list):
+            value = [value] if isinstance(value, (str, dict)) else None
+        if value is None:
+            errors.append(f"{path}: expected a list")
+            return MISSING
+        items = [_coerce(v, kind[0], None, f"{path}[{i}]", errors) for i, v in enumerate(value)]
+        return [v for v in items if v is not MISSING]
+
+    if kind is dict:
+        if not isinstance(value, dict):
+            errors.append(f"{path}: expected an object")
+            return MISSING
+        return {str(k): v if isinstance(v, str) else json.dumps(v, ensure_ascii=False) for k, v in value.items()}
+
+    if isinstance(kind, dict):
+        if not isinstance(value, dict):
+            errors.append(f"{path}: expected an object")
+            return MISSING
+        item = validate(value, kind, errors, path)
+        return item if item.get("task") else MISSING
+
+    if kind is bool:
+        if isinstance(value, str) and value.strip().lower() in ("true", "false"):
+            return value.strip().lower() == "true"
+        if isinstance(value, bool):
+            return value
+        errors.append(f"{path}: expected a boolean")
+        return MISSING
+
+    if kind is int:
+        number = None
+        if isinstance(value, int) and not isinstance(value, bool):
+            number = value
+        elif not isinstance(value, bool):
+            try:
+                parsed = float(value)
+            except (TypeError, ValueError, OverflowError):
+                parsed = None
+            # NaN / Infinity / 1e999 are valid JSON to Python but not integers
+            if parsed is not None and math.isfinite(parsed):
+                number = int(parsed)
+        if number is None:
+            errors.append(f"{path}: expected an integer")
+            return MISSING
+        if allowed:
+            number = min(max(number, allowed[0]), allowed[1])
+        return number
+
+    # str
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        value = str(value)
+    if not isinstance(value, str):
+        errors.append(f"{path}: expected a string")
+        return MISSING
+    if allowed:
+        match = next((a for a in allowed if a.lower() == value.strip().lower()), None)
+        if match is None:
+            errors.append(f"{path}: {value!r} not in {allowed}")
+            return MISSING
+        return match
+    return value
+
+
+def validate(data: dict, schema: dict, errors: list = None, path: str = "") -> dict:
+    """
+    Keep the fields of `data` that match `schema`, coercing near-misses
+    (e.g. "true" -> True, "growth" -> "Growth", a bare string -> [string]).
+    Invalid or missing fields fall back to their default, or are left out
+    when they have none. Problems are appended to `errors`.
+    """
+    errors = [] if errors is None else errors
+    clean = {}
+    for field, (kind, default, allowed) in schema.items():
+        name = f"{path}.{field}" if path else field
+        value = _coerce(data[field], kind, allowed, name, errors) if data.get(field) is not None else MISSING
+        if value is MISSING:
+            value = default
+        if value is not MISSING:
+            clean[field] = value
+    return clean
+
+
+def parse_llm_json(text: str, schema: dict, json_text: str = None) -> tuple:
+    """
+    Extract and validate the structured output of a completion.
+    Returns (data or None, errors).
+    """
+    data = extract_json(text, json_text)
+    if data is None:
+        return None, ["no JSON object found"]
+    errors = []
+    return validate(data, schema, errors), errors
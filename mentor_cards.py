@@ -0,0 +1,98 @@
+"""
+Mentor Cards for ClarityOS
+"Why this mentor" reasons and the JSON mentor cards shown on finalization,
+computed at ingest instead of per request.
+
+A mentor has one reason per reason kind (fundraising, growth, general).
+The scraper stores them in mentor_knowledge_base.json under "reasons";
+a catalog built from an older file computes them when it loads. Each
+(mentor, kind) card is encoded to JSON bytes once per catalog version, and
+responses splice those bytes in as they are.
+"""
+import json
+import numpy as np
+
+REASON_KINDS = ("fundraising", "growth", "general")
+KIND_INDEX = {kind: i for i, kind in enumerate(REASON_KINDS)}
+
+CARD_FIELDS = ("id", "name", "bio", "outcomes", "link")
+
+
+def reason_kind(category: str) -> str:
+    category = (category or "").lower()
+    if "fundraising" in category:
+        return "fundraising"
+    if "growth" in category:
+        return "growth"
+    return "general"
+
+
+def mentor_reason(mentor: dict, kind: str) -> str:
+    """Reason text for recommending `mentor` for a `kind` problem."""
+    name = mentor.get("name") or "This mentor"
+    bio = mentor.get("bio", "")
+    outcomes = mentor.get("outcomes", "")
+    if kind == "fundraising":
+        return f"{name} has deep experience in fundraising. {outcomes} Their background in {bio[:50]}... makes them ideal for your funding needs."
+    if kind == "growth":
+        return f"{name} specializes in scaling businesses. {outcomes} Perfect for tackling your growth challenges."
+    return f"{name} is a proven expert. {outcomes} Their experience aligns well with your situation."
+
+
+def mentor_reasons(mentor: dict) -> dict:
+    """{kind: reason} for every reason kind; precomputed ones in the entry win."""
+    stored = mentor.get("reasons") or {}
+    return {kind: stored.get(kind) or mentor_reason(mentor, kind) for kind in REASON_KINDS}
+
+
+def encode_json(value) -> bytes:
+    """Compact UTF-8 JSON, as FastAPI's JSONResponse would encode it."""
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def encode_cards(raw: list) -> list:
+    """
+    Card bytes for every (mentor, kind), mentor-major:
+    entry i * len(REASON_KINDS) + KIND_INDEX[kind].
+    """
+    cards = []
+    for mentor in raw:
+        fields = {name: str(mentor.get(name, "")) for name in CARD_FIELDS}
+        for kind, reason in mentor_reasons(mentor).items():
+            cards.append(encode_json({**fields, "why_this_mentor": reason}))
+    return cards
+
+
+class CardTable:
+    """
+    Encoded cards of one catalog version (immutable): one buffer plus
+    offsets, so a card costs its bytes and no per-object overhead. Cards
+    are returned as zero-copy memoryview slices.
+    """
+
+    def __init__(self, data, offsets: np.ndarray):
+        self._data = memoryview(data)
+        self._offsets = offsets
+
+    @classmethod
+    def from_cards(cls, cards: list) -> "CardTable":
+        offsets = np.zeros(len(cards) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(c) for c in cards])
+        return cls(b"".join(cards), offsets)
+
+    def __len__(self):
+        return (len(self._offsets) - 1) // len(REASON_KINDS)
+
+    def card(self, mentor_id: int, category: str) -> memoryview:
+        i = mentor_id * len(REASON_KINDS) + KIND_INDEX[reason_kind(category)]
+        return self._data[self._offsets[i]:self._offsets[i + 1]]
+
+
+def encode_payload(payload: dict) -> bytes:
+    """
+    JSON body of a chat response. payload["cards"] holds pre-encoded card
+    bytes, which are joined in without decoding or copying the records.
+    """
+    rest = encode_json({k: v for k, v in payload.items() if k != "cards"})
+    cards = b",".join(payload.get("cards") or ())
+    return b'{"cards":[' + cards + (b"]," + rest[1:] if len(rest) > 2 else b"]}")
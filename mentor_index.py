@@ -0,0 +1,107 @@
+"""
+Mentor Index for ClarityOS
+BM25 inverted index over the mentor catalog (name + bio + outcomes).
+Built once per catalog version; queries touch only the postings of their terms.
+"""
+import re
+import numpy as np
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+# Score added when the category name appears in a mentor's profile
+CATEGORY_BOOST = 5.0
+
+
+def tokenize(text: str) -> list:
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def mentor_text(mentor: dict) -> str:
+    return (mentor['name'] + " " + mentor['bio'] + " " + mentor['outcomes']).lower()
+
+
+class MentorIndex:
+    """
+    Term-major CSR matrix of BM25 weights: row t holds the postings of
+    term t (mentor column, weight). A query sums the rows of its terms.
+    With a `semantic` scorer (see semantic_search.py), ANN similarity is
+    blended into the keyword score.
+    """
+
+    def __init__(self, mentors, k1: float = 1.5, b: float = 0.75, semantic=None, texts: list = None):
+        self.mentors = mentors
+        self.semantic = semantic
+        # Lowercased search text per mentor; catalog.Mentor records carry it precomputed
+        self._texts = texts if texts is not None else [mentor_text(m) for m in mentors]
+        self._category_masks = {}
+
+        self.vocab = {}
+        rows, cols, tfs = [], [], []
+        doc_lengths = np.zeros(len(mentors), dtype=np.float32)
+        for doc_id, text in enumerate(self._texts):
+            tokens = tokenize(text)
+            doc_lengths[doc_id] = len(tokens)
+            counts = {}
+            for tok in tokens:
+                counts[tok] = counts.get(tok, 0) + 1
+            for tok, tf in counts.items():
+                rows.append(self.vocab.setdefault(tok, len(self.vocab)))
+                cols.append(doc_id)
+                tfs.append(tf)
+
+        n_docs, n_terms = len(mentors), len(self.vocab)
+        rows = np.asarray(rows, dtype=np.int32)
+        cols = np.asarray(cols, dtype=np.int32)
+        tfs = np.asarray(tfs, dtype=np.float32)
+
+        # BM25: idf(t) * tf * (k1 + 1) / (tf + k1 * (1 - b + b * dl / avgdl))
+        df = np.bincount(rows, minlength=n_terms).astype(np.float32)
+        idf = np.log1p((n_docs - df + 0.5) / (df + 0.5))
+        avgdl = doc_lengths.mean() if n_docs else 1.0
+        norm = k1 * (1 - b + b * doc_lengths[cols] / max(avgdl, 1e-9))
+        weights = idf[rows] * tfs * (k1 + 1) / (tfs + norm)
+
+        from scipy import sparse  # deferred: only needed to build an index
+        self.postings = sparse.csr_matrix(
+            (weights, (rows, cols)), shape=(n_terms, n_docs), dtype=np.float32
+        )
+
+    def __len__(self):
+        return len(self.mentors)
+
+    def category_mask(self, category: str) -> np.ndarray:
+        """Mentors whose profile mentions the category (cached per category)."""
+        key = category.lower()
+        mask = self._category_masks.get(key)
+        if mask is None:
+            mask = np.fromiter((key in text for text in self._texts), dtype=bool, count=len(self._texts))
+            self._category_masks[key] = mask
+        return mask
+
+    def scores(self, query: str, category: str) -> np.ndarray:
+        scores = np.zeros(len(self.mentors), dtype=np.float32)
+        term_ids = sorted({self.vocab[t] for t in tokenize(query) if t in self.vocab})
+        if term_ids:
+            scores += np.asarray(self.postings[term_ids].sum(axis=0)).ravel()
+        if category:
+            scores += CATEGORY_BOOST * self.category_mask(category)
+        return scores
+
+    def search_ids(self, query: str, category: str, k: int = 3) -> np.ndarray:
+        """Positions of the top-k mentors with a positive score, best first."""
+        if not len(self.mentors):
+            return np.zeros(0, dtype=np.int64)
+        scores = self.scores(query, category)
+        if self.semantic is not None:
+            scores = self.semantic.blend(query, scores)
+        candidates = np.flatnonzero(scores > 0)
+        if len(candidates) > k:
+            top = np.argpartition(-scores[candidates], k - 1)[:k]
+            candidates = candidates[top]
+        # Highest score first; ties keep catalog order
+        order = np.lexsort((candidates, -scores[candidates]))
+        return candidates[order]
+
+    def search(self, query: str, category: str, k: int = 3) -> list:
+        """Top-k mentors with a positive score, best first."""
+        return [self.mentors[i] for i in self.search_ids(query, category, k)]
@@ -0,0 +1,206 @@
+"""
+Metrics for ClarityOS
+In-process counters and histograms, exported at /metrics in the
+Prometheus text format.
+
+MetricsMiddleware times every HTTP request. Inside a request,
+`with stage("llm_call"):` records how long that stage took, labelled with
+the request's route, so each /chat/message or /upload breaks down into
+prompt build, LLM call, JSON parse, RAG search, Neo4j write, file
+extraction, ... Work done outside a request is labelled route="background".
+"""
+import time
+import uuid
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# Latency buckets (seconds): sub-millisecond parsing up to slow LLM calls
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Per-request state set by MetricsMiddleware: {"scope", "request_id", "stages"}
+current_request = ContextVar("current_request", default=None)
+
+_registry = []
+_collectors = []
+
+
+def _label_key(labelnames: tuple, labels: dict) -> tuple:
+    return tuple(str(labels.get(name, "")) for name in labelnames)
+
+
+def _format_labels(labelnames: tuple, values: tuple, extra: str = "") -> str:
+    parts = ['%s="%s"' % (n, v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+             for n, v in zip(labelnames, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str, labelnames: tuple = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = labelnames
+        self._values = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def inc(self, amount: float = 1, **labels):
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(_label_key(self.labelnames, labels), 0)
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {value:g}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, labelnames: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labelnames = labelnames
+        self.buckets = tuple(buckets)
+        self._series = {}  # label values -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def observe(self, value: float, **labels):
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+                    break
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, series in sorted(self._series.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets, series):
+                    cumulative += count
+                    le = 'le="%g"' % bound
+                    lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+                le = 'le="+Inf"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {series[-1]}")
+                lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {series[-2]:g}")
+                lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {series[-1]}")
+        return lines
+
+
+# --- METRICS ---
+
+http_request_seconds = Histogram(
+    "clarity_http_request_seconds", "HTTP request latency", ("method", "route", "status")
+)
+stage_seconds = Histogram(
+    "clarity_stage_seconds", "Time spent in each request stage", ("route", "stage")
+)
+llm_calls = Counter("clarity_llm_calls_total", "Upstream LLM calls", ("kind", "outcome"))
+llm_tokens = Counter("clarity_llm_tokens_total", "LLM tokens sent and received", ("direction",))
+fallbacks = Counter("clarity_fallbacks_total", "Degraded responses served", ("reason",))
+
+
+def register_collector(collect):
+    """
+    Add a callback run at scrape time that returns a list of
+    (name, type, help, value) samples, e.g. from a cache's stats().
+    """
+    _collectors.append(collect)
+
+
+def render() -> str:
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    for collect in _collectors:
+        try:
+            samples = collect()
+        except Exception:
+            continue
+        for name, kind, help_text, value in samples:
+            lines.extend([f"# HELP {name} {help_text}", f"# TYPE {name} {kind}", f"{name} {value:g}"])
+    return "\n".join(lines) + "\n"
+
+
+# --- STAGES ---
+
+def current_route() -> str:
+    request = current_request.get()
+    if request is None:
+        return "background"
+    route = request["scope"].get("route")
+    # Route templates only (never raw paths) to keep label cardinality bounded
+    return getattr(route, "path", None) or "unmatched"
+
+
+def observe_stage(name: str, seconds: float):
+    stage_seconds.observe(seconds, route=current_route(), stage=name)
+    request = current_request.get()
+    if request is not None:
+        request["stages"][name] = request["stages"].get(name, 0.0) + seconds
+
+
+@contextmanager
+def stage(name: str):
+    """Time a block as one stage of the current request."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(name, time.perf_counter() - started)
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware: request latency histogram, a request id for logs,
+    and a Server-Timing header with the stages that finished before the
+    response started (so not the body of a streamed response).
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request = {"scope": scope, "request_id": uuid.uuid4().hex[:16], "stages": {}}
+        token = current_request.set(request)
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                timing = ", ".join(f"{name};dur={seconds * 1000:.1f}" for name, seconds in request["stages"].items())
+                headers = list(message.get("headers", []))
+                headers.append((b"x-request-id", request["request_id"].encode()))
+                if timing:
+                    headers.append((b"server-timing", timing.encode()))
+                message = dict(message, headers=headers)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            http_request_seconds.observe(
+                time.perf_counter() - started,
+                method=scope["method"], route=current_route(), status=status
+            )
+            current_request.reset(token)
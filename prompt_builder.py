@@ -0,0 +1,253 @@
+"""
+Prompt Builder for ClarityOS
+Assembles chat prompts under a token budget.
+
+The system prompt and the latest user message are always kept. The file
+context is cut into chunks and only the ones most relevant to the latest
+message are included (up to PROMPT_FILE_CONTEXT_TOKENS). Older turns are
+compacted into a short note, then dropped oldest-first, until the prompt
+fits PROMPT_TOKEN_BUDGET.
+
+Tokens are counted with the tiktoken encoding PROMPT_TOKENIZER (o200k_base
+by default). If tiktoken or the encoding can't be loaded, or the setting
+is empty, a local ~4 characters/token estimate is used instead.
+"""
+import os
+import re
+import math
+from functools import lru_cache
+from dotenv import load_dotenv
+from structured_logging import get_logger
+
+# Load environment variables from .env.local
+load_dotenv('.env.local')
+
+logger = get_logger("prompt_builder")
+
+PROMPT_TOKENIZER = os.getenv("PROMPT_TOKENIZER", "o200k_base")  # tiktoken encoding; empty = estimate
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "6000"))
+PROMPT_FILE_CONTEXT_TOKENS = int(os.getenv("PROMPT_FILE_CONTEXT_TOKENS", "1500"))
+PROMPT_KEEP_RECENT_MESSAGES = int(os.getenv("PROMPT_KEEP_RECENT_MESSAGES", "6"))
+PROMPT_CHUNK_TOKENS = int(os.getenv("PROMPT_CHUNK_TOKENS", "200"))
+
+# Per-message framing overhead (role + separators) in chat formats
+MESSAGE_OVERHEAD_TOKENS = 4
+# How much of each older user turn survives compaction
+COMPACT_TURN_TOKENS = 60
+
+FILE_CONTEXT_HEADER = "\n\nUSER FILE CONTEXT (analyze and mention insights):\n"
+HISTORY_NOTE_HEADER = "Earlier in this conversation the user said:\n"
+
+PIECE_PATTERN = re.compile(r"\w+|[^\w\s]")
+WORD_PATTERN = re.compile(r"\w+")
+
+_encoding = None
+
+
+def _get_encoding():
+    """tiktoken encoding, or False when unavailable (checked once)."""
+    global _encoding
+    if _encoding is None:
+        _encoding = False
+        if PROMPT_TOKENIZER:
+            try:
+                import tiktoken
+                _encoding = tiktoken.get_encoding(PROMPT_TOKENIZER)
+            except Exception as e:
+                logger.warning("Tokenizer unavailable, estimating tokens", extra={"tokenizer": PROMPT_TOKENIZER, "error": str(e)})
+    return _encoding
+
+
+def tokenizer_name() -> str:
+    return PROMPT_TOKENIZER if _get_encoding() else "estimate"
+
+
+def count_tokens(text: str) -> int:
+    if not text:
+        return 0
+    encoding = _get_encoding()
+    if encoding:
+        return len(encoding.encode(text, disallowed_special=()))
+    # ~4 characters per token for words, one token per punctuation mark
+    return sum(math.ceil(len(p) / 4) for p in PIECE_PATTERN.findall(text))
+
+
+def count_message_tokens(messages: list) -> int:
+    return sum(count_tokens(m["content"]) + MESSAGE_OVERHEAD_TOKENS for m in messages)
+
+
+def truncate_tokens(text: str, max_tokens: int) -> str:
+    """Cut text to at most max_tokens (including the trailing ellipsis)."""
+    if count_tokens(text) <= max_tokens:
+        return text
+    encoding = _get_encoding()
+    if encoding:
+        return encoding.decode(encoding.encode(text, disallowed_special=())[:max_tokens - 1]) + "…"
+    used = 0
+    for piece in PIECE_PATTERN.finditer(text):
+        used += math.ceil(len(piece.group()) / 4)
+        if used > max_tokens - 1:
+            return text[:piece.start()].rstrip() + "…"
+    return text
+
+
+# --- FILE CONTEXT ---
+
+@lru_cache(maxsize=32)
+def chunk_text(text: str, chunk_tokens: int = PROMPT_CHUNK_TOKENS) -> tuple:
+    """
+    Split text into ~chunk_tokens pieces on paragraph/line boundaries.
+    Returns a tuple of (chunk, token_count, word_set); cached because the
+    same file context is re-sent every turn.
+    """
+    chunks = []
+    current, current_tokens = [], 0
+
+    def flush():
+        nonlocal current, current_tokens
+        if current:
+            chunk = "\n".join(current)
+            chunks.append((chunk, current_tokens, frozenset(WORD_PATTERN.findall(chunk.lower()))))
+        current, current_tokens = [], 0
+
+    for line in text.splitlines():
+        if not line.strip():
+            continue
+        for piece in _split_line(line, chunk_tokens):
+            tokens = count_tokens(piece)
+            if current_tokens + tokens > chunk_tokens:
+                flush()
+            current.append(piece)
+            current_tokens += tokens
+    flush()
+    return tuple(chunks)
+
+
+def _split_line(line: str, max_tokens: int) -> list:
+    """A line longer than max_tokens, cut into word-boundary pieces that fit."""
+    if count_tokens(line) <= max_tokens:
+        return [line]
+    pieces, current, used = [], [], 0
+    for word in line.split():
+        cost = count_tokens(word) + 1
+        if current and used + cost > max_tokens:
+            pieces.append(" ".join(current))
+            current, used = [], 0
+        current.append(word)
+        used += cost
+    if current:
+        pieces.append(" ".join(current))
+    return pieces
+
+
+def select_file_context(file_context: str, query: str, max_tokens: int = PROMPT_FILE_CONTEXT_TOKENS) -> tuple:
+    """
+    Pick the file chunks that share the most words with the query, within
+    max_tokens, and return them in document order.
+    The first chunk (usually a title / header row) is always preferred.
+    Returns (text, chunks_used, chunks_total).
+    """
+    chunks = chunk_text(file_context)
+    if not chunks or max_tokens <= 0:
+        return "", 0, len(chunks)
+
+    query_words = set(WORD_PATTERN.findall(query.lower()))
+    ranked = sorted(
+        range(len(chunks)),
+        key=lambda i: (i != 0, -len(query_words & chunks[i][2]), i)
+    )
+    chosen, used = [], 0
+    for i in ranked:
+        if used + chunks[i][1] <= max_tokens:
+            chosen.append(i)
+            used += chunks[i][1]
+    chosen.sort()
+
+    parts = []
+    for prev, i in zip([-1] + chosen, chosen):
+        if i != prev + 1:
+            parts.append("[…]")
+        parts.append(chunks[i][0])
+    return "\n".join(parts), len(chosen), len(chunks)
+
+
+# --- HISTORY ---
+
+def compact_history(history: list, max_tokens: int) -> tuple:
+    """
+    Condense older turns to a note holding the start of each user message,
+    keeping the most recent lines that fit in max_tokens.
+    Returns (note, user_turns_included).
+    """
+    lines = [
+        "- " + truncate_tokens(" ".join(m["content"][:COMPACT_TURN_TOKENS * 8].split()), COMPACT_TURN_TOKENS)
+        for m in history if m["role"] == "user"
+    ]
+    remaining = max_tokens - count_tokens(HISTORY_NOTE_HEADER)
+    kept = 0
+    for line in reversed(lines):
+        cost = count_tokens(line) + 1
+        if cost > remaining:
+            break
+        remaining -= cost
+        kept += 1
+    if not kept:
+        return "", 0
+    return HISTORY_NOTE_HEADER + "\n".join(lines[len(lines) - kept:]), kept
+
+
+def build_prompt(system_content: str, history: list, file_context: str = None,
+                 budget: int = PROMPT_TOKEN_BUDGET) -> tuple:
+    """
+    Build the messages list for a chat turn within `budget` prompt tokens.
+    Returns (messages, stats).
+    """
+    latest = history[-1] if history else None
+    file_text, file_chunks, file_chunks_total = "", 0, 0
+    if file_context:
+        file_text, file_chunks, file_chunks_total = select_file_context(
+            file_context, latest["content"] if latest else ""
+        )
+    system = system_content + (FILE_CONTEXT_HEADER + file_text if file_text else "")
+
+    # The latest message is never dropped; an oversized one is truncated
+    fixed = count_tokens(system) + MESSAGE_OVERHEAD_TOKENS
+    tail = []
+    if latest:
+        latest = dict(latest, content=truncate_tokens(latest["content"], max(budget - fixed - MESSAGE_OVERHEAD_TOKENS, 1)))
+        tail = [latest]
+    remaining = budget - fixed - count_message_tokens(tail)
+
+    # Recent turns verbatim, newest first, while they fit
+    earlier = history[:-1]
+    keep_from = len(earlier)
+    for i in range(len(earlier) - 1, max(len(earlier) - PROMPT_KEEP_RECENT_MESSAGES, 0) - 1, -1):
+        cost = count_tokens(earlier[i]["content"]) + MESSAGE_OVERHEAD_TOKENS
+        if cost > remaining:
+            break
+        remaining -= cost
+        keep_from = i
+    recent = earlier[keep_from:]
+
+    # Everything older becomes a compact note, oldest lines dropped first
+    note, compacted = compact_history(earlier[:keep_from], remaining - 2)
+
+    if note:
+        system += "\n\n" + note
+    messages = [{"role": "system", "content": system}] + recent + tail
+
+    stats = {
+        "prompt_tokens": count_message_tokens(messages),
+        "budget": budget,
+        "tokenizer": tokenizer_name(),
+        "history_messages": len(history),
+        "history_verbatim": len(recent) + len(tail),
+        "history_compacted": compacted,
+        "file_chunks": file_chunks,
+        "file_chunks_total": file_chunks_total
+    }
+    return messages, stats
+
+
+def log_prompt_stats(stats: dict):
+    logger.info("Prompt built", extra=stats)
@@ -1,6 +1,8 @@
+import os
 import json
 import time
 import random
+from mentor_cards import mentor_reasons
 
 # NOTE: In a real environment, use requests + BeautifulSoup.
 # Since we are in a testing/hackathon mode with limited connectivity,
@@ -47,9 +49,58 @@ RAW_DATA = [
     }
 ]
 
-def process_data():
+# Keyword -> Expertise node name, used when a profile has no explicit expertise list
+EXPERTISE_KEYWORDS = {
+    "Fundraising": ["fundrais", "investor", "raised", "vc", "series"],
+    "Growth": ["growth", "scal", "consumer", "brand", "d2c", "content"],
+    "Product-Market Fit": ["product-market fit", "pmf", "validation", "bootstrap"],
+    "Hiring": ["hiring", "talent"],
+}
+
+
+def to_graph_row(mentor: dict) -> dict:
+    """
+    Shape a catalog entry for Database.add_mentors:
+    expertise and outcomes become lists of node keys.
+    """
+    text = (mentor.get("bio", "") + " " + mentor.get("outcomes", "")).lower()
+    expertise = mentor.get("expertise") or [
+        name for name, words in EXPERTISE_KEYWORDS.items() if any(w in text for w in words)
+    ]
+    outcomes = mentor.get("outcomes", "")
+    return {
+        "id": mentor["id"],
+        "name": mentor["name"],
+        "bio": mentor.get("bio", ""),
+        "link": mentor.get("link", ""),
+        "expertise": expertise,
+        "outcomes": outcomes if isinstance(outcomes, list) else [outcomes] if outcomes else []
+    }
+
+
+async def load_graph(mentors: list, batch_size: int = 1000):
+    """
+    Bulk-load mentors into Neo4j: bootstrap constraints/indexes, then
+    stream UNWIND batches with progress and rows/sec reporting.
     """
-    Simulates cleaning and vectorizing data.
+    from database import db
+
+    def progress(loaded, rows_per_sec):
+        print(f"Graph: {loaded}/{len(mentors)} mentors ({rows_per_sec:,.0f} rows/sec)")
+
+    try:
+        stats = await db.bulk_load_mentors((to_graph_row(m) for m in mentors), batch_size, progress)
+    finally:
+        await db.close()
+    print(f"✅ Loaded {stats['rows']} mentors into Neo4j in {stats['seconds']:.1f}s "
+          f"({stats['rows_per_sec']:,.0f} rows/sec).")
+    return stats
+
+
+def process_data(quantize: bool = False):
+    """
+    Simulates cleaning, precomputes each mentor's recommendation reasons,
+    then embeds the profiles and builds the ANN index.
     """
     processed_db = []
     print(f"Scraping {len(RAW_DATA)} profiles...")
@@ -61,18 +112,44 @@ def process_data():
         # In a real app, here we would:
         # 1. Fetch URL
         # 2. Extract text with BS4
-        # 3. Create Embedding with OpenAI
+        # Embeddings are computed in one batch below
         
         print(f"Indexing: {mentor['name']}...")
-        processed_db.append(mentor)
+        # "Why this mentor" text per problem kind, so the backend never builds it per request
+        processed_db.append(dict(mentor, reasons=mentor_reasons(mentor)))
 
-    # Save to JSON for the Backend to consume
-    with open("mentor_knowledge_base.json", "w") as f:
+    # Save to JSON for the Backend to consume; written to a temp name and
+    # swapped in, so a running backend's catalog watcher never reads half a file
+    with open("mentor_knowledge_base.json.tmp", "w") as f:
         json.dump(processed_db, f, indent=2)
+    os.replace("mentor_knowledge_base.json.tmp", "mentor_knowledge_base.json")
     
+    # Embed all profiles and write the memory-mappable matrix + ANN index
+    from semantic_search import build_embedding_index
+    emb_path, ann_path = build_embedding_index(processed_db, "mentor_knowledge_base.json", quantize=quantize)
+
     print("\n✅ Data Ingestion Complete.")
-    print("✅ 'mentor_knowledge_base.json' created with 5 profiles.")
+    print(f"✅ 'mentor_knowledge_base.json' created with {len(processed_db)} profiles.")
+    print(f"✅ Embeddings written to '{os.path.basename(emb_path)}' and '{os.path.basename(ann_path)}'.")
     print("✅ Ready for RAG Engine.")
+    return processed_db
 
 if __name__ == "__main__":
-    process_data()
+    import argparse
+    import asyncio
+    parser = argparse.ArgumentParser(description="Seed the ClarityOS mentor knowledge base")
+    parser.add_argument("--quantize", action="store_true", help="store embeddings as int8 instead of float32")
+    parser.add_argument("--from-json", action="store_true",
+                        help="skip scraping and load the existing mentor_knowledge_base.json into the graph")
+    parser.add_argument("--skip-graph", action="store_true", help="don't load mentors into Neo4j")
+    parser.add_argument("--batch-size", type=int, default=1000, help="mentors per UNWIND batch")
+    args = parser.parse_args()
+
+    if args.from_json:
+        with open("mentor_knowledge_base.json", "r") as f:
+            mentors = json.load(f)
+    else:
+        mentors = process_data(quantize=args.quantize)
+
+    if not args.skip_graph:
+        asyncio.run(load_graph(mentors, args.batch_size))
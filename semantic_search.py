@@ -0,0 +1,239 @@
+"""
+Semantic Search for ClarityOS
+Offline mentor embeddings + a CPU inverted-file (IVF) ANN index.
+
+The scraper writes, next to mentor_knowledge_base.json:
+    mentor_embeddings.npy   L2-normalised float32 (or int8-quantised) matrix
+    mentor_ann.npz          IVF centroids, inverted lists, a catalog checksum and
+                            the embedding model + dimension they were built with
+The backend memory-maps the matrix and blends ANN similarity into the
+keyword/category score. Files built from other catalog text or another
+embedder are ignored until the scraper rebuilds them.
+"""
+import os
+import re
+import zlib
+import hashlib
+import numpy as np
+from dotenv import load_dotenv
+from structured_logging import get_logger
+from mentor_index import mentor_text
+
+# Load environment variables from .env.local
+load_dotenv('.env.local')
+
+logger = get_logger("semantic_search")
+
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "")  # sentence-transformers model; empty = hashed n-grams
+EMBEDDING_DIM = int(os.getenv("EMBEDDING_DIM", "256"))
+ANN_NPROBE = int(os.getenv("ANN_NPROBE", "8"))
+HYBRID_ALPHA = float(os.getenv("HYBRID_ALPHA", "0.5"))
+HYBRID_CANDIDATES = int(os.getenv("HYBRID_CANDIDATES", "50"))
+
+HASHED_EMBEDDER = "hashed-ngrams"  # recorded as the model when EMBEDDING_MODEL is empty
+INT8_SCALE = 127.0
+WORD_PATTERN = re.compile(r"\w+")
+
+_model = None
+
+
+def embedding_paths(catalog_path: str) -> tuple:
+    folder = os.path.dirname(os.path.abspath(catalog_path))
+    return os.path.join(folder, "mentor_embeddings.npy"), os.path.join(folder, "mentor_ann.npz")
+
+
+def catalog_checksum(mentors: list) -> str:
+    """Identifies the catalog version the embeddings were built from: ids and the embedded text."""
+    h = hashlib.blake2b(digest_size=16)
+    for m in mentors:
+        h.update(str(m.get("id", "")).encode("utf-8"))
+        h.update(b"\0")
+        h.update(mentor_text(m).encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+def embedder_name() -> str:
+    """The embedder embed_texts uses right now."""
+    return EMBEDDING_MODEL or HASHED_EMBEDDER
+
+
+# --- EMBEDDING ---
+
+def _hashed_embedding(text: str, dim: int) -> np.ndarray:
+    """
+    Signed feature hashing of words, word bigrams and character trigrams.
+    Deterministic across processes (crc32, not hash()).
+    """
+    vec = np.zeros(dim, dtype=np.float32)
+    words = WORD_PATTERN.findall(text.lower())
+    features = words + [a + " " + b for a, b in zip(words, words[1:])]
+    for w in words:
+        padded = f"#{w}#"
+        features.extend(padded[i:i + 3] for i in range(len(padded) - 2))
+    for feat in features:
+        h = zlib.crc32(feat.encode("utf-8"))
+        vec[h % dim] += 1.0 if (h >> 31) & 1 else -1.0
+    return vec
+
+
+def embed_texts(texts: list) -> np.ndarray:
+    """Embed texts into L2-normalised float32 rows."""
+    global _model
+    if EMBEDDING_MODEL:
+        if _model is None:
+            from sentence_transformers import SentenceTransformer
+            _model = SentenceTransformer(EMBEDDING_MODEL, device="cpu")
+        vectors = _model.encode(texts, batch_size=64, convert_to_numpy=True).astype(np.float32)
+    else:
+        vectors = np.stack([_hashed_embedding(t, EMBEDDING_DIM) for t in texts]) if texts \
+            else np.zeros((0, EMBEDDING_DIM), dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def quantize_int8(vectors: np.ndarray) -> np.ndarray:
+    return np.clip(np.rint(vectors * INT8_SCALE), -127, 127).astype(np.int8)
+
+
+# --- IVF INDEX ---
+
+class IVFIndex:
+    """
+    Inverted-file index with a spherical k-means coarse quantizer.
+    A query scans only the `nprobe` lists whose centroids are closest.
+    """
+
+    def __init__(self, vectors: np.ndarray, centroids: np.ndarray, offsets: np.ndarray, members: np.ndarray):
+        self.vectors = vectors
+        self.scale = 1.0 / INT8_SCALE if vectors.dtype == np.int8 else 1.0
+        self.centroids = centroids
+        self.offsets = offsets
+        self.members = members
+
+    @classmethod
+    def build(cls, vectors: np.ndarray, nlist: int = None, iterations: int = 10,
+              sample_size: int = 50000, seed: int = 0):
+        n = len(vectors)
+        nlist = nlist or max(1, int(np.sqrt(n)))
+        rng = np.random.default_rng(seed)
+        data = np.asarray(vectors, dtype=np.float32)
+        if vectors.dtype == np.int8:
+            data = data / np.maximum(np.linalg.norm(data, axis=1, keepdims=True), 1e-12)
+
+        # Train centroids on a sample, then assign everything
+        sample = data[rng.choice(n, size=min(n, sample_size), replace=False)] if n else data
+        centroids = sample[rng.choice(len(sample), size=min(nlist, len(sample)), replace=False)].copy()
+        for _ in range(iterations):
+            assign = np.argmax(sample @ centroids.T, axis=1)
+            for c in range(len(centroids)):
+                members = sample[assign == c]
+                if len(members):
+                    centroid = members.sum(axis=0)
+                    centroids[c] = centroid / max(np.linalg.norm(centroid), 1e-12)
+
+        assign = np.concatenate([
+            np.argmax(data[i:i + 65536] @ centroids.T, axis=1) for i in range(0, n, 65536)
+        ]) if n else np.zeros(0, dtype=np.int64)
+        members = np.argsort(assign, kind="stable").astype(np.int32)
+        offsets = np.zeros(len(centroids) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum(np.bincount(assign, minlength=len(centroids)))
+        return cls(vectors, centroids.astype(np.float32), offsets, members)
+
+    def search(self, query: np.ndarray, k: int, nprobe: int = ANN_NPROBE) -> tuple:
+        """Return (ids, cosine similarities) of the approximate top-k."""
+        if not len(self.members):
+            return np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.float32)
+        nprobe = min(nprobe, len(self.centroids))
+        probe = np.argpartition(-(self.centroids @ query), nprobe - 1)[:nprobe]
+        ids = np.concatenate([self.members[self.offsets[c]:self.offsets[c + 1]] for c in probe])
+        if not len(ids):
+            return ids, np.zeros(0, dtype=np.float32)
+        ids.sort()  # sequential reads from the memory-mapped matrix
+        sims = (self.vectors[ids] @ query) * self.scale
+        if len(ids) > k:
+            top = np.argpartition(-sims, k - 1)[:k]
+            ids, sims = ids[top], sims[top]
+        order = np.argsort(-sims, kind="stable")
+        return ids[order], sims[order].astype(np.float32)
+
+    def save(self, path: str, checksum: str, model: str):
+        np.savez(path, centroids=self.centroids, offsets=self.offsets, members=self.members,
+                 checksum=np.array(checksum), model=np.array(model), dim=np.array(self.vectors.shape[1]))
+
+    @classmethod
+    def load(cls, path: str, vectors: np.ndarray):
+        with np.load(path) as data:
+            index = cls(vectors, data["centroids"], data["offsets"], data["members"])
+            index.checksum = str(data["checksum"])
+            # Files written before the model was recorded match no embedder
+            index.model = str(data["model"]) if "model" in data.files else ""
+            index.dim = int(data["dim"]) if "dim" in data.files else 0
+        return index
+
+
+# --- PIPELINE ---
+
+def build_embedding_index(mentors: list, catalog_path: str, quantize: bool = False) -> tuple:
+    """
+    Offline step run by the scraper: embed every mentor and write the
+    matrix + IVF index next to the catalog. Returns the written paths.
+    """
+    vectors = embed_texts([mentor_text(m) for m in mentors])
+    stored = quantize_int8(vectors) if quantize else vectors
+    emb_path, ann_path = embedding_paths(catalog_path)
+
+    # Write to temp names and swap in, so a running backend never sees half a file
+    np.save(emb_path + ".tmp.npy", stored)
+    IVFIndex.build(stored).save(ann_path + ".tmp.npz", catalog_checksum(mentors), embedder_name())
+    os.replace(emb_path + ".tmp.npy", emb_path)
+    os.replace(ann_path + ".tmp.npz", ann_path)
+    return emb_path, ann_path
+
+
+class SemanticScorer:
+    """Blends ANN similarity into keyword scores for one catalog version."""
+
+    def __init__(self, ann: IVFIndex, alpha: float = HYBRID_ALPHA, candidates: int = HYBRID_CANDIDATES):
+        self.ann = ann
+        self.alpha = alpha
+        self.candidates = candidates
+
+    @classmethod
+    def load(cls, mentors: list, catalog_path: str):
+        """Memory-map the prebuilt index, or None if missing, stale or built by another embedder."""
+        return cls.load_for(len(mentors), catalog_checksum(mentors), catalog_path)
+
+    @classmethod
+    def load_for(cls, count: int, checksum: str, catalog_path: str):
+        """load() for a catalog known only by its size and catalog_checksum()."""
+        emb_path, ann_path = embedding_paths(catalog_path)
+        if not (os.path.exists(emb_path) and os.path.exists(ann_path)):
+            return None
+        vectors = np.load(emb_path, mmap_mode="r")
+        ann = IVFIndex.load(ann_path, vectors)
+        if len(vectors) != count or ann.checksum != checksum:
+            logger.warning("Mentor embeddings are out of date; re-run scraper.py. Using keyword search only.")
+            return None
+        # Queries are embedded with the current settings, so the matrix must come from the same embedder
+        expected_dim = EMBEDDING_DIM if not EMBEDDING_MODEL else ann.dim
+        if ann.model != embedder_name() or ann.dim != vectors.shape[1] or ann.dim != expected_dim:
+            logger.warning(
+                "Mentor embeddings were built with another embedding model; re-run scraper.py. "
+                "Using keyword search only.",
+                extra={"built_with": ann.model, "built_dim": ann.dim,
+                       "embedding_model": embedder_name(), "embedding_dim": expected_dim}
+            )
+            return None
+        return cls(ann)
+
+    def blend(self, query: str, keyword_scores: np.ndarray) -> np.ndarray:
+        """
+        hybrid = alpha * cosine + (1 - alpha) * keyword / max(keyword)
+        Cosine is only computed for the ANN candidates.
+        """
+        top = keyword_scores.max() if len(keyword_scores) else 0.0
+        hybrid = (1 - self.alpha) * (keyword_scores / top if top > 0 else keyword_scores)
+        ids, sims = self.ann.search(embed_texts([query])[0], self.candidates)
+        hybrid[ids] += self.alpha * np.maximum(sims, 0.0)
+        return hybrid
@@ -0,0 +1,215 @@
+"""
+Session Scribe for ClarityOS
+Turns mentoring-session transcripts into action plans.
+
+Long transcripts are split into chunks that fit the context window; each
+chunk is analysed and the partial plans are merged. The batch runner
+processes a backlog with bounded concurrency and appends one JSON line
+per transcript to the output file, which doubles as the checkpoint: a
+re-run skips every transcript already written successfully.
+
+Usage:
+    python session_scribe.py transcripts.jsonl results.jsonl --concurrency 8
+    python session_scribe.py transcripts_dir/ results.jsonl
+Input is a JSONL file of {"id": ..., "transcript": ...} or a directory of
+.txt files (the filename is the id).
+"""
+import os
+import json
+import time
+import asyncio
+from dotenv import load_dotenv
+import llm_client
+from admission import GATHER, BATCH
+from llm_parser import parse_llm_json, SCRIBE_SCHEMA
+from prompt_builder import chunk_text
+from structured_logging import get_logger
+
+# Load environment variables from .env.local
+load_dotenv('.env.local')
+
+logger = get_logger("session_scribe")
+
+SCRIBE_CHUNK_TOKENS = int(os.getenv("SCRIBE_CHUNK_TOKENS", "6000"))
+SCRIBE_CONCURRENCY = int(os.getenv("SCRIBE_CONCURRENCY", "8"))
+ACTION_ITEMS = 3
+
+SYSTEM_PROMPT_SCRIBE = """
+You are the Session Scribe.
+Extract 3 distinct Action Items from the transcript.
+Return JSON: {"action_plan": [{"task": "...", "why": "...", "due": "...", "metric": "..."}], "clarity_score": 0-100, "reason": "..."}
+"""
+
+CHUNK_NOTE = "\n\nThis is part {part} of {parts} of a longer transcript; extract the action items found in this part."
+
+
+async def analyze_chunk(text: str, part: int = 1, parts: int = 1,
+                        priority: int = GATHER, deadline: float = None) -> dict:
+    """One scribe call. Raises ValueError if the output has no action plan."""
+    system = SYSTEM_PROMPT_SCRIBE + (CHUNK_NOTE.format(part=part, parts=parts) if parts > 1 else "")
+    content = await llm_client.chat_completion(
+        [
+            {"role": "system", "content": system},
+            {"role": "user", "content": text}
+        ],
+        temperature=0.1,
+        json_mode=True,
+        priority=priority,
+        deadline=deadline
+    )
+    plan, errors = parse_llm_json(content, SCRIBE_SCHEMA)
+    if errors:
+        logger.warning("Scribe output issues", extra={"issues": errors})
+    if not plan or not plan.get("action_plan"):
+        raise ValueError("No action plan in scribe output")
+    return plan
+
+
+def merge_plans(plans: list) -> dict:
+    """Combine per-chunk plans: first distinct tasks, mean clarity score."""
+    seen, items = set(), []
+    for plan in plans:
+        for item in plan["action_plan"]:
+            key = " ".join(item["task"].lower().split())
+            if key not in seen:
+                seen.add(key)
+                items.append(item)
+    scores = [p["clarity_score"] for p in plans if "clarity_score" in p]
+    merged = {"action_plan": items[:ACTION_ITEMS]}
+    if scores:
+        merged["clarity_score"] = round(sum(scores) / len(scores))
+    reasons = [p["reason"] for p in plans if p.get("reason")]
+    if reasons:
+        merged["reason"] = reasons[0]
+    return merged
+
+
+async def analyze_transcript(transcript: str, chunk_tokens: int = SCRIBE_CHUNK_TOKENS,
+                             priority: int = GATHER, deadline: float = None) -> dict:
+    """
+    Action plan for a transcript of any length.
+    Chunks are analysed concurrently; chunks that fail are skipped as long
+    as at least one succeeds. `priority` and `deadline` go to admission
+    control (see llm_client.chat_completion).
+    """
+    chunks = [chunk for chunk, _, _ in chunk_text(transcript, chunk_tokens)] or [transcript]
+    if len(chunks) == 1:
+        return await analyze_chunk(chunks[0], priority=priority, deadline=deadline)
+
+    results = await asyncio.gather(
+        *[analyze_chunk(chunk, i + 1, len(chunks), priority, deadline) for i, chunk in enumerate(chunks)],
+        return_exceptions=True
+    )
+    plans = [r for r in results if isinstance(r, dict)]
+    if not plans:
+        raise results[0]
+    merged = merge_plans(plans)
+    merged["chunks"] = len(chunks)
+    return merged
+
+
+# --- BATCH ---
+
+def read_transcripts(source: str):
+    """Yield (id, transcript) from a JSONL file or a directory of .txt files."""
+    if os.path.isdir(source):
+        for name in sorted(os.listdir(source)):
+            if name.endswith(".txt"):
+                with open(os.path.join(source, name), "r", encoding="utf-8") as f:
+                    yield os.path.splitext(name)[0], f.read()
+        return
+    with open(source, "r", encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            if line.strip():
+                record = json.loads(line)
+                yield str(record.get("id", line_no)), record["transcript"]
+
+
+def load_checkpoint(output_path: str) -> set:
+    """
+    IDs already analysed successfully. A partial last line (from a crash
+    mid-write) is cut off so appends start on a clean line.
+    """
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+    with open(output_path, "rb+") as f:
+        data = f.read()
+        if data and not data.endswith(b"\n"):
+            f.truncate(data.rfind(b"\n") + 1)
+            data = data[:data.rfind(b"\n") + 1]
+    for line in data.decode("utf-8").splitlines():
+        try:
+            record = json.loads(line)
+        except ValueError:
+            continue
+        if record.get("status") == "ok":
+            done.add(record["id"])
+    return done
+
+
+async def run_batch(source: str, output_path: str, concurrency: int = SCRIBE_CONCURRENCY) -> dict:
+    """
+    Analyse every transcript in `source` not yet in `output_path`, with at
+    most `concurrency` transcripts in flight.
+    Returns {"processed", "failed", "skipped", "seconds", "per_minute"}.
+    """
+    done = load_checkpoint(output_path)
+    queue = asyncio.Queue(maxsize=concurrency * 2)
+    stats = {"processed": 0, "failed": 0, "skipped": 0}
+    started = time.perf_counter()
+
+    with open(output_path, "a", encoding="utf-8") as out:
+
+        async def worker():
+            while True:
+                item = await queue.get()
+                if item is None:
+                    return
+                transcript_id, transcript = item
+                try:
+                    record = {"id": transcript_id, "status": "ok", **await analyze_transcript(transcript, priority=BATCH)}
+                    stats["processed"] += 1
+                except Exception as e:
+                    record = {"id": transcript_id, "status": "failed", "error": str(e)}
+                    stats["failed"] += 1
+                out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                out.flush()
+                finished = stats["processed"] + stats["failed"]
+                if finished % 50 == 0:
+                    logger.info("Scribe batch progress", extra={
+                        "finished": finished,
+                        "per_minute": round(finished / (time.perf_counter() - started) * 60, 1)
+                    })
+
+        workers = [asyncio.create_task(worker()) for _ in range(concurrency)]
+        for transcript_id, transcript in read_transcripts(source):
+            if transcript_id in done:
+                stats["skipped"] += 1
+                continue
+            await queue.put((transcript_id, transcript))
+        for _ in workers:
+            await queue.put(None)
+        await asyncio.gather(*workers)
+
+    seconds = time.perf_counter() - started
+    stats["seconds"] = round(seconds, 2)
+    stats["per_minute"] = round((stats["processed"] + stats["failed"]) / max(seconds, 1e-9) * 60, 1)
+    return stats
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Batch-analyse session transcripts into action plans")
+    parser.add_argument("source", help="JSONL of {id, transcript} or a directory of .txt transcripts")
+    parser.add_argument("output", help="JSONL results file (also the resume checkpoint)")
+    parser.add_argument("--concurrency", type=int, default=SCRIBE_CONCURRENCY, help="transcripts in flight")
+    args = parser.parse_args()
+
+    async def main():
+        try:
+            return await run_batch(args.source, args.output, args.concurrency)
+        finally:
+            await llm_client.close()
+
+    print(f"Scribe batch done: {asyncio.run(main())}")
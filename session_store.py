@@ -0,0 +1,198 @@
+"""
+Session Store for ClarityOS
+Keeps conversation history and file context server-side so the widget
+only sends the new message each turn.
+
+A session is a plain dict:
+    {"history": [{"role": ..., "content": ...}], "file_context": str | None,
+     "user_message_count": int, "document": dict | None}
+
+"document" is the session's current Mentor Context Pack artifact (see
+backend.ensure_document_artifact).
+
+get() hands out a private copy and save() replaces the stored session, so
+changes to a session only take effect when it is saved. A chat turn that
+fails half-way is never visible to other requests.
+
+Requests that touch part of a session (a chat turn, an upload) store it
+with update(), which merges only the fields they changed into the current
+stored session. An upload that lands while a turn is waiting on the LLM
+keeps its file context, and the turn keeps its history.
+"""
+import os
+import copy
+import json
+import time
+import uuid
+import sqlite3
+import threading
+from collections import OrderedDict
+from dotenv import load_dotenv
+
+# Load environment variables from .env.local
+load_dotenv('.env.local')
+
+SESSION_STORE = os.getenv("SESSION_STORE", "memory")
+SESSION_TTL_SECONDS = int(os.getenv("SESSION_TTL_SECONDS", "3600"))
+SESSION_MAX_ENTRIES = int(os.getenv("SESSION_MAX_ENTRIES", "10000"))
+SESSION_DB_PATH = os.getenv("SESSION_DB_PATH", os.path.join(os.path.dirname(__file__), "sessions.db"))
+
+
+def new_session_id() -> str:
+    return uuid.uuid4().hex
+
+
+def new_session() -> dict:
+    return {"history": [], "file_context": None, "user_message_count": 0, "document": None}
+
+
+class SessionStore:
+    """Interface for session backends."""
+
+    def get(self, session_id: str):
+        """Return a copy of the session dict, or None if missing or expired."""
+        raise NotImplementedError
+
+    def save(self, session_id: str, session: dict):
+        raise NotImplementedError
+
+    def update(self, session_id: str, changes: dict) -> dict:
+        """
+        Merge `changes` into the stored session (a new one if missing or
+        expired) atomically, leaving its other fields as they are.
+        Returns a copy of the merged session.
+        """
+        raise NotImplementedError
+
+    def delete(self, session_id: str):
+        raise NotImplementedError
+
+
+class MemorySessionStore(SessionStore):
+    """
+    In-process LRU with TTL eviction.
+    Sessions idle for longer than `ttl` seconds are dropped, and the least
+    recently used session is evicted once `max_entries` is reached.
+    """
+
+    def __init__(self, ttl: int = SESSION_TTL_SECONDS, max_entries: int = SESSION_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, session_id: str):
+        with self._lock:
+            entry = self._data.get(session_id)
+            if entry is None:
+                return None
+            expires_at, session = entry
+            if expires_at < time.monotonic():
+                del self._data[session_id]
+                return None
+            self._data.move_to_end(session_id)
+        return copy.deepcopy(session)
+
+    def save(self, session_id: str, session: dict):
+        session = copy.deepcopy(session)
+        with self._lock:
+            self._data[session_id] = (time.monotonic() + self.ttl, session)
+            self._data.move_to_end(session_id)
+            self._evict()
+
+    def update(self, session_id: str, changes: dict) -> dict:
+        changes = copy.deepcopy(changes)
+        with self._lock:
+            entry = self._data.get(session_id)
+            session = entry[1] if entry is not None and entry[0] >= time.monotonic() else new_session()
+            session.update(changes)
+            self._data[session_id] = (time.monotonic() + self.ttl, session)
+            self._data.move_to_end(session_id)
+            self._evict()
+            return copy.deepcopy(session)
+
+    def delete(self, session_id: str):
+        with self._lock:
+            self._data.pop(session_id, None)
+
+    def _evict(self):
+        now = time.monotonic()
+        # Oldest entries sit at the front; expired ones go first
+        while self._data:
+            oldest_id, (expires_at, _) = next(iter(self._data.items()))
+            if expires_at >= now and len(self._data) <= self.max_entries:
+                break
+            del self._data[oldest_id]
+
+
+class SQLiteSessionStore(SessionStore):
+    """
+    SQLite-backed store so sessions survive restarts and are shared
+    between workers on the same host.
+    """
+
+    def __init__(self, path: str = SESSION_DB_PATH, ttl: int = SESSION_TTL_SECONDS):
+        self.path = path
+        self.ttl = ttl
+        self._local = threading.local()
+        with self._conn() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS sessions (
+                    id TEXT PRIMARY KEY,
+                    data TEXT NOT NULL,
+                    expires_at REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS sessions_expires ON sessions(expires_at)")
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, session_id: str):
+        row = self._conn().execute(
+            "SELECT data FROM sessions WHERE id = ? AND expires_at >= ?",
+            (session_id, time.time())
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def save(self, session_id: str, session: dict):
+        with self._conn() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO sessions (id, data, expires_at) VALUES (?, ?, ?)",
+                (session_id, json.dumps(session, ensure_ascii=False), time.time() + self.ttl)
+            )
+            conn.execute("DELETE FROM sessions WHERE expires_at < ?", (time.time(),))
+
+    def update(self, session_id: str, changes: dict) -> dict:
+        conn = self._conn()
+        with conn:
+            # Take the write lock before reading, so concurrent updates from other workers serialize
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT data FROM sessions WHERE id = ? AND expires_at >= ?",
+                (session_id, time.time())
+            ).fetchone()
+            session = json.loads(row[0]) if row else new_session()
+            session.update(changes)
+            conn.execute(
+                "INSERT OR REPLACE INTO sessions (id, data, expires_at) VALUES (?, ?, ?)",
+                (session_id, json.dumps(session, ensure_ascii=False), time.time() + self.ttl)
+            )
+        return session
+
+    def delete(self, session_id: str):
+        with self._conn() as conn:
+            conn.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+
+
+def create_store() -> SessionStore:
+    """Build the backend selected by SESSION_STORE (memory | sqlite)."""
+    if SESSION_STORE == "sqlite":
+        return SQLiteSessionStore()
+    return MemorySessionStore()
@@ -0,0 +1,83 @@
+"""
+Structured Logging for ClarityOS
+One JSON object per log line, tagged with the request id set by
+metrics.MetricsMiddleware.
+
+    logger = get_logger(__name__)
+    logger.warning("LLM call failed", extra={"error": str(e), "route": "/chat/message"})
+
+Fields passed via `extra` become top-level keys. Keys that clash with a
+LogRecord attribute ("filename", "name", "args", ...) would make logging
+raise, so they are logged as "extra_<key>" instead. LOG_FORMAT=text
+switches to plain lines for local development.
+"""
+import os
+import sys
+import json
+import time
+import logging
+from dotenv import load_dotenv
+from metrics import current_request
+
+# Load environment variables from .env.local
+load_dotenv('.env.local')
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")
+
+# Attributes every LogRecord has; anything else came from `extra`
+_RECORD_FIELDS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+_configured = False
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created)) + f".{int(record.msecs):03d}Z",
+            "level": record.levelname.lower(),
+            "logger": record.name,
+            "message": record.getMessage()
+        }
+        request = current_request.get()
+        if request is not None:
+            entry["request_id"] = request["request_id"]
+        for key, value in vars(record).items():
+            if key not in _RECORD_FIELDS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class SafeExtraAdapter(logging.LoggerAdapter):
+    """Renames `extra` keys that would overwrite LogRecord attributes."""
+
+    def process(self, msg, kwargs):
+        extra = kwargs.get("extra")
+        if extra and not _RECORD_FIELDS.isdisjoint(extra):
+            kwargs["extra"] = {(f"extra_{k}" if k in _RECORD_FIELDS else k): v for k, v in extra.items()}
+        return msg, kwargs
+
+
+def configure():
+    """Install the handler on the "clarity" logger tree (idempotent)."""
+    global _configured
+    if _configured:
+        return
+    handler = logging.StreamHandler(sys.stdout)
+    if LOG_FORMAT == "json":
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    root = logging.getLogger("clarity")
+    root.addHandler(handler)
+    root.setLevel(LOG_LEVEL)
+    root.propagate = False
+    _configured = True
+
+
+def get_logger(name: str) -> SafeExtraAdapter:
+    """Logger under the "clarity" tree, e.g. get_logger("backend") -> clarity.backend."""
+    configure()
+    return SafeExtraAdapter(logging.getLogger(f"clarity.{name}"), None)
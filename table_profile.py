@@ -0,0 +1,350 @@
+"""
+Table Profile for ClarityOS
+Compact statistical summary of CSV / Excel uploads, in place of dumping
+the whole table as text.
+
+The file is read in chunks of TABLE_CHUNK_ROWS rows (CSV via pandas,
+XLSX via openpyxl's streaming reader, every sheet), and each column's
+summary is updated with vectorised operations per chunk, so memory stays
+bounded by the chunk size whatever the file size. The result is a short
+per-column profile (type, missing values, range, mean, first -> last
+change, trend and growth per row for numbers; distinct and top values for
+text; span for dates) plus the first and last few rows.
+
+Runs inside the extraction worker processes (see file_processor.py).
+"""
+import os
+import numpy as np
+import pandas as pd
+from dotenv import load_dotenv
+
+# Load environment variables from .env.local
+load_dotenv('.env.local')
+
+TABLE_CHUNK_ROWS = int(os.getenv("TABLE_CHUNK_ROWS", "50000"))
+TABLE_SAMPLE_ROWS = int(os.getenv("TABLE_SAMPLE_ROWS", "5"))
+MAX_TABLE_ROWS = int(os.getenv("MAX_TABLE_ROWS", "1000000"))  # per sheet
+
+# Wide tables: only the first columns are profiled
+MAX_PROFILED_COLUMNS = 60
+# Top values reported for text columns, and candidates kept per column
+TOP_VALUES = 5
+TRACKED_VALUES = 200
+# Distinct values counted exactly up to this many per column
+MAX_DISTINCT = 100000
+# Share of non-empty values that must parse for a text column to count as numbers / dates
+PARSE_THRESHOLD = 0.9
+# Relative change across the table (from the fitted line) below which a trend is "flat"
+FLAT_TREND = 0.05
+# Characters stripped before reading "$1,200" or "12%" as numbers
+NUMBER_NOISE = r"[,$€£₹%\s]"
+# A text value only reads as a date if it has a four-digit year or a month
+# name, so "1-2", "3/4" or "10 am" stay text
+DATE_PATTERN = r"(?i)(?<!\d)\d{4}(?!\d)|\b(?:jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)[a-z]*\.?(?![a-z])"
+# Parsed dates outside these years are treated as misreads
+DATE_YEARS = (1900, 2100)
+
+
+def _parse_dates(values: pd.Series) -> pd.Series:
+    """Text values as datetimes; NaT where a value isn't date-like or its year is implausible."""
+    values = values.astype(str)
+    dates = pd.to_datetime(values.where(values.str.contains(DATE_PATTERN)), errors="coerce", format="mixed")
+    years = dates.dt.year
+    return dates.where((years >= DATE_YEARS[0]) & (years <= DATE_YEARS[1]))
+
+
+def _format_number(value: float) -> str:
+    if value is None or not np.isfinite(value):
+        return "n/a"
+    if float(value).is_integer() and abs(value) < 1e15:
+        return f"{int(value):,}"
+    if abs(value) >= 1000:
+        return f"{value:,.1f}"
+    return f"{value:.4g}"
+
+
+def _format_percent(value: float) -> str:
+    if value and abs(value) < 0.001:
+        return f"{value * 100:+.2g}%"  # small per-row rates keep their digits
+    return f"{value * 100:+.1f}%"
+
+
+def _format_share(part: int, whole: int) -> str:
+    """part / whole as a whole percentage that never rounds to 0% or 100% when it isn't."""
+    if part and part < whole * 0.01:
+        return "<1%"
+    if part < whole and part > whole * 0.99:
+        return ">99%"
+    return f"{part / whole:.0%}"
+
+
+class ColumnProfile:
+    """Running summary of one column, updated a chunk at a time."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.kind = None  # "number" | "date" | "text", fixed by the first chunk with values
+        self.rows = 0
+        self.missing = 0
+        self.invalid = 0  # values that didn't parse as the column's kind
+        # number
+        self.count = 0
+        self.total = 0.0
+        self.minimum = None
+        self.maximum = None
+        self.first = self.last = None
+        self.first_x = self.last_x = 0.0
+        self.sum_x = self.sum_xx = self.sum_xy = 0.0  # least-squares trend over row position
+        # date
+        self.earliest = None
+        self.latest = None
+        # text
+        self.counts = {}
+        self.hashes = np.zeros(0, dtype=np.uint64)
+        self.distinct_capped = False
+
+    # --- UPDATE ---
+
+    def update(self, values: pd.Series, start_row: int):
+        self.rows += len(values)
+        present = values.notna()
+        if not (pd.api.types.is_numeric_dtype(values) or pd.api.types.is_datetime64_any_dtype(values)):
+            present &= values.astype(str).str.strip().ne("")
+        self.missing += int((~present).sum())
+        values = values[present]
+        if values.empty:
+            return
+        if self.kind is None:
+            self.kind = self._detect_kind(values)
+        if self.kind == "number":
+            self._update_numbers(values, start_row)
+        elif self.kind == "date":
+            self._update_dates(values)
+        else:
+            self._update_text(values)
+
+    @staticmethod
+    def _detect_kind(values: pd.Series) -> str:
+        if pd.api.types.is_bool_dtype(values):
+            return "text"
+        if pd.api.types.is_numeric_dtype(values):
+            return "number"
+        if pd.api.types.is_datetime64_any_dtype(values):
+            return "date"
+        sample = values.head(200).astype(str)
+        numbers = pd.to_numeric(sample.str.replace(NUMBER_NOISE, "", regex=True), errors="coerce")
+        if numbers.notna().mean() >= PARSE_THRESHOLD:
+            return "number"
+        if _parse_dates(sample).notna().mean() >= PARSE_THRESHOLD:
+            return "date"
+        return "text"
+
+    def _update_numbers(self, values: pd.Series, start_row: int):
+        if not pd.api.types.is_numeric_dtype(values) or pd.api.types.is_bool_dtype(values):
+            values = pd.to_numeric(values.astype(str).str.replace(NUMBER_NOISE, "", regex=True), errors="coerce")
+        parsed = values.notna()
+        self.invalid += int((~parsed).sum())
+        y = values[parsed].to_numpy(dtype=np.float64)
+        if not len(y):
+            return
+        x = start_row + values.index.to_numpy()[parsed.to_numpy()].astype(np.float64)  # row positions
+        self.count += len(y)
+        self.total += float(y.sum())
+        low, high = float(y.min()), float(y.max())
+        self.minimum = low if self.minimum is None else min(self.minimum, low)
+        self.maximum = high if self.maximum is None else max(self.maximum, high)
+        if self.first is None:
+            self.first, self.first_x = float(y[0]), float(x[0])
+        self.last, self.last_x = float(y[-1]), float(x[-1])
+        self.sum_x += float(x.sum())
+        self.sum_xx += float((x * x).sum())
+        self.sum_xy += float((x * y).sum())
+
+    def _update_dates(self, values: pd.Series):
+        if not pd.api.types.is_datetime64_any_dtype(values):
+            values = _parse_dates(values)
+        parsed = values.dropna()
+        self.invalid += len(values) - len(parsed)
+        if parsed.empty:
+            return
+        low, high = parsed.min(), parsed.max()
+        self.earliest = low if self.earliest is None else min(self.earliest, low)
+        self.latest = high if self.latest is None else max(self.latest, high)
+
+    def _update_text(self, values: pd.Series):
+        values = values.astype(str).str.strip()
+        for value, count in values.value_counts().head(TRACKED_VALUES).items():
+            self.counts[value] = self.counts.get(value, 0) + int(count)
+        if len(self.counts) > TRACKED_VALUES * 2:
+            # Keep the heaviest candidates; top values of huge columns are approximate
+            kept = sorted(self.counts.items(), key=lambda kv: -kv[1])[:TRACKED_VALUES]
+            self.counts = dict(kept)
+        if not self.distinct_capped:
+            hashes = pd.util.hash_pandas_object(values, index=False).to_numpy()
+            self.hashes = np.union1d(self.hashes, hashes)
+            if len(self.hashes) > MAX_DISTINCT:
+                self.distinct_capped = True
+                self.hashes = np.zeros(0, dtype=np.uint64)
+
+    # --- SUMMARY ---
+
+    def describe(self) -> str:
+        filled = self.rows - self.missing
+        missing = f"{_format_share(self.missing, self.rows)} missing" if self.rows and self.missing else "no missing"
+        if self.kind is None:
+            return f"- {self.name}: empty"
+        if self.kind == "number":
+            return f"- {self.name} (number, {missing}): " + self._describe_numbers()
+        if self.kind == "date":
+            if self.earliest is None:
+                return f"- {self.name} (date, {missing}): unparseable"
+            days = (self.latest - self.earliest).days
+            return f"- {self.name} (date, {missing}): {self.earliest.date()} to {self.latest.date()} ({days:,} days)"
+        distinct = f"{MAX_DISTINCT:,}+" if self.distinct_capped else f"{len(self.hashes):,}"
+        top = sorted(self.counts.items(), key=lambda kv: (-kv[1], kv[0]))[:TOP_VALUES]
+        if top and top[0][1] == 1:
+            # Nothing repeats (an id / free-text column): examples instead of shares
+            return f"- {self.name} (text, {missing}): {distinct} distinct; e.g. " + ", ".join(v[:40] for v, _ in top[:3])
+        shown = ", ".join(f"{value[:40]} ({_format_share(count, filled)})" for value, count in top)
+        return f"- {self.name} (text, {missing}): {distinct} distinct; top: {shown}"
+
+    def _describe_numbers(self) -> str:
+        if not self.count:
+            return "no parseable values"
+        parts = [
+            f"min {_format_number(self.minimum)}",
+            f"max {_format_number(self.maximum)}",
+            f"mean {_format_number(self.total / self.count)}",
+        ]
+        if self.count > 1:
+            change = f"first {_format_number(self.first)} -> last {_format_number(self.last)}"
+            if self.first:
+                change += f" ({_format_percent((self.last - self.first) / abs(self.first))})"
+            parts.append(change)
+            parts.append(f"trend {self.trend()}")
+            if self.first > 0 and self.last > 0:
+                per_row = (self.last / self.first) ** (1 / (self.count - 1)) - 1
+                parts.append(f"growth {_format_percent(per_row)} per row")
+        if self.invalid:
+            parts.append(f"{self.invalid:,} non-numeric")
+        return ", ".join(parts)
+
+    def trend(self) -> str:
+        """Direction of the least-squares line over row position, relative to the mean."""
+        n = self.count
+        denominator = n * self.sum_xx - self.sum_x ** 2
+        mean = self.total / n
+        if denominator <= 0 or not mean:
+            return "flat"
+        slope = (n * self.sum_xy - self.sum_x * self.total) / denominator
+        relative = slope * (self.last_x - self.first_x) / abs(mean)
+        if relative > FLAT_TREND:
+            return "rising"
+        if relative < -FLAT_TREND:
+            return "falling"
+        return "flat"
+
+
+class SheetProfile:
+    """Profile of one sheet (or CSV file): column summaries plus first/last rows."""
+
+    def __init__(self, name: str = None):
+        self.name = name
+        self.columns = None
+        self.total_columns = 0
+        self.rows = 0
+        self.head = None
+        self.tail = None
+        self.truncated = False
+
+    def add_chunk(self, chunk: pd.DataFrame):
+        if self.columns is None:
+            self.total_columns = chunk.shape[1]
+            self.columns = [ColumnProfile(str(c)) for c in chunk.columns[:MAX_PROFILED_COLUMNS]]
+        chunk = chunk.reset_index(drop=True)
+        for i, column in enumerate(self.columns):
+            column.update(chunk.iloc[:, i], self.rows)
+        if self.head is None:
+            self.head = chunk.head(TABLE_SAMPLE_ROWS)
+            self.tail = chunk.tail(TABLE_SAMPLE_ROWS)
+        else:
+            self.tail = pd.concat([self.tail, chunk.tail(TABLE_SAMPLE_ROWS)]).tail(TABLE_SAMPLE_ROWS)
+        self.rows += len(chunk)
+
+    def render(self) -> str:
+        title = f'Sheet "{self.name}"' if self.name is not None else "Table"
+        if self.columns is None:
+            return f"{title}: empty"
+        lines = [f"{title}: {self.rows:,} rows x {self.total_columns} columns"
+                 + (f" (stopped at {MAX_TABLE_ROWS:,} rows)" if self.truncated else "")]
+        lines.append("Columns:")
+        lines.extend(column.describe() for column in self.columns)
+        if self.total_columns > len(self.columns):
+            lines.append(f"- ... {self.total_columns - len(self.columns)} more columns not profiled")
+        lines.append(self._render_sample())
+        return "\n".join(lines)
+
+    def _render_sample(self) -> str:
+        if not self.rows:
+            return "No rows (header only)"
+        if self.rows <= TABLE_SAMPLE_ROWS:
+            label, sample = f"All {self.rows} rows", self.head
+        elif self.rows <= 2 * TABLE_SAMPLE_ROWS:
+            label, sample = f"All {self.rows} rows", pd.concat([self.head, self.tail.tail(self.rows - TABLE_SAMPLE_ROWS)])
+        else:
+            label, sample = f"First and last {TABLE_SAMPLE_ROWS} rows", pd.concat([self.head, self.tail])
+        sample = sample.iloc[:, :MAX_PROFILED_COLUMNS]
+        return f"{label}:\n" + sample.to_string(index=False, max_colwidth=40)
+
+
+def _profile_frames(frames, name: str = None) -> SheetProfile:
+    profile = SheetProfile(name)
+    for chunk in frames:
+        remaining = MAX_TABLE_ROWS - profile.rows
+        if len(chunk) > remaining:
+            chunk = chunk.iloc[:remaining]
+            profile.truncated = True
+        profile.add_chunk(chunk)
+        if profile.truncated:
+            break
+    return profile
+
+
+def profile_csv(path: str) -> str:
+    frames = pd.read_csv(path, chunksize=TABLE_CHUNK_ROWS, low_memory=False)
+    return _profile_frames(frames).render()
+
+
+def _sheet_frames(sheet):
+    """DataFrames of TABLE_CHUNK_ROWS rows from an openpyxl read-only sheet (first row = header)."""
+    rows = sheet.iter_rows(values_only=True)
+    header = next(rows, None)
+    if header is None:
+        return
+    columns = [str(c) if c is not None else f"column_{i + 1}" for i, c in enumerate(header)]
+    batch = []
+    for row in rows:
+        batch.append(row[:len(columns)])
+        if len(batch) == TABLE_CHUNK_ROWS:
+            yield pd.DataFrame.from_records(batch, columns=columns)
+            batch = []
+    if batch:
+        yield pd.DataFrame.from_records(batch, columns=columns)
+
+
+def profile_excel(path: str) -> str:
+    """Every sheet of an .xlsx (streamed) or .xls (read whole; the format has no streaming reader)."""
+    if path.lower().endswith(".xls"):
+        sheets = pd.read_excel(path, sheet_name=None)
+        profiles = [
+            _profile_frames((df.iloc[i:i + TABLE_CHUNK_ROWS] for i in range(0, max(len(df), 1), TABLE_CHUNK_ROWS)), name)
+            for name, df in sheets.items()
+        ]
+    else:
+        import openpyxl
+        workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+        try:
+            profiles = [_profile_frames(_sheet_frames(sheet), sheet.title) for sheet in workbook.worksheets]
+        finally:
+            workbook.close()
+    return "\n\n".join(p.render() for p in profiles)
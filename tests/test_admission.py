@@ -0,0 +1,118 @@
+"""
+Admission control: the adaptive limit, priorities and deadline shedding,
+driven by an in-process fake upstream.
+"""
+import time
+import random
+import asyncio
+import pytest
+from admission import AdmissionController, Overloaded, FINALIZE, GATHER
+
+
+async def _fake_call(controller, upstream, latency, tokens, priority=GATHER, deadline=None):
+    async with controller.slot(priority, deadline) as call:
+        async with upstream:
+            await asyncio.sleep(latency)
+        call.output_tokens = tokens
+
+
+def test_healthy_upstream_keeps_the_limit():
+    """Latency that varies with answer length is not congestion."""
+    controller = AdmissionController("test_healthy", max_limit=32)
+    rng = random.Random(7)
+
+    async def client(upstream, end):
+        while time.monotonic() < end:
+            tokens = rng.randint(20, 400)
+            await _fake_call(controller, upstream, 0.005 + tokens * 0.0001, tokens)
+
+    async def main():
+        upstream = asyncio.Semaphore(64)
+        end = time.monotonic() + 1.5
+        await asyncio.gather(*[client(upstream, end) for _ in range(8)])
+
+    asyncio.run(main())
+    assert controller.limit == 32
+
+
+def test_saturated_upstream_lowers_the_limit():
+    controller = AdmissionController("test_saturated", max_limit=32)
+
+    async def client(upstream, end):
+        while time.monotonic() < end:
+            await _fake_call(controller, upstream, 0.02, 100)
+
+    async def main():
+        upstream = asyncio.Semaphore(4)  # queues inside the upstream beyond 4 calls
+        await asyncio.gather(*[client(upstream, time.monotonic() + 0.5) for _ in range(4)])
+        # Load surge
+        end = time.monotonic() + 2.0
+        await asyncio.gather(*[client(upstream, end) for _ in range(40)])
+
+    asyncio.run(main())
+    assert controller.limit < 16
+
+
+def test_client_errors_are_not_sampled():
+    controller = AdmissionController("test_errors", max_limit=8)
+
+    class BadRequest(Exception):
+        status_code = 400
+
+    async def main():
+        for _ in range(50):
+            with pytest.raises(BadRequest):
+                async with controller.slot():
+                    raise BadRequest()
+
+    asyncio.run(main())
+    assert controller.baseline() is None
+    assert controller.limit == 8 and controller.in_flight == 0
+
+
+def test_upstream_failures_lower_the_limit():
+    controller = AdmissionController("test_failures", max_limit=8)
+
+    class ServerError(Exception):
+        status_code = 503
+
+    async def main():
+        with pytest.raises(ServerError):
+            async with controller.slot():
+                raise ServerError()
+
+    asyncio.run(main())
+    assert controller.limit < 8
+
+
+def test_finalize_served_before_gather_and_late_calls_shed_fast():
+    controller = AdmissionController("test_priority", max_limit=1, min_limit=1)
+    order = []
+
+    async def call(name, priority, deadline=None):
+        async with controller.slot(priority, deadline):
+            order.append(name)
+            await asyncio.sleep(0.05)
+
+    async def main():
+        first = asyncio.create_task(call("first", GATHER))
+        await asyncio.sleep(0)
+        gather = asyncio.create_task(call("gather", GATHER))
+        finalize = asyncio.create_task(call("finalize", FINALIZE))
+        await asyncio.gather(first, gather, finalize)
+
+        # A call that can't start before its deadline is refused without waiting
+        busy = asyncio.create_task(call("busy", GATHER))
+        await asyncio.sleep(0)
+        for _ in range(5):
+            asyncio.create_task(call("queued", GATHER))
+        await asyncio.sleep(0)
+        started = time.monotonic()
+        with pytest.raises(Overloaded) as refused:
+            await call("late", GATHER, deadline=time.monotonic() + 0.06)
+        assert time.monotonic() - started < 0.02
+        assert refused.value.retry_after >= 1
+        await busy
+
+    asyncio.run(main())
+    assert order[:3] == ["first", "finalize", "gather"]
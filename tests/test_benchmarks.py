@@ -0,0 +1,74 @@
+"""
+Benchmark fixtures: the sample uploads extract, the fake graph behaves
+like the Neo4j queries it stands in for, the recorded data matches what
+the replay and parser checks assume, and the python-docx baseline renders
+the same pack as the compiled template.
+"""
+import json
+import asyncio
+import pytest
+from benchmarks import micro
+from benchmarks.fake_graph import FakeGraph
+from benchmarks.replay import CONVERSATIONS_PATH
+from benchmarks.samples import WRITERS, SAMPLE_MARKER
+from file_processor import extract_text_from_path, is_extraction_error
+
+
+@pytest.mark.parametrize("kind", sorted(WRITERS))
+def test_sample_upload_extracts(tmp_path, kind):
+    filename, write = WRITERS[kind]
+    path = tmp_path / filename
+    write(str(path))
+    text = extract_text_from_path(str(path), filename)
+    assert not is_extraction_error(text)
+    assert SAMPLE_MARKER in text
+
+
+def test_fake_graph_merges_documents_on_content_hash():
+    graph = FakeGraph(latency=0)
+    upload = {"filename": "memo.pdf", "content": "text", "file_type": "pdf", "content_hash": "abc"}
+    first = asyncio.run(graph.save_file_contents([upload]))
+    again = asyncio.run(graph.save_file_contents([dict(upload, filename="copy.pdf")]))
+    assert first == again
+    assert len(graph.documents) == 1
+
+
+def test_fake_graph_requires_the_category():
+    graph = FakeGraph(latency=0)
+    asyncio.run(graph.add_mentors(micro.synthetic_mentors(50)))
+    matches = asyncio.run(graph.get_mentor_matches("fundraising", ["seed", "investors"]))
+    assert matches
+    assert all("fundraising" in m["bio"].lower() for m in matches)
+
+
+def test_recorded_conversations_finish_on_the_last_turn():
+    with open(CONVERSATIONS_PATH, "r", encoding="utf-8") as f:
+        conversations = json.load(f)
+    assert conversations
+    assert all(len(c["turns"]) == 7 for c in conversations)
+
+
+
+def test_docx_baseline_renders_the_same_text():
+    import io
+    import re
+    import docx
+    from document_generator import get_template
+    fields = {
+        "generated": "January 01, 2026 at 09:00 AM", "category": "Growth", "user_summary": "Churn is 40%",
+        "insights": ["Early churn"], "metrics": {"MRR": "$30k"}, "questions_for_mentor": ["Where to start?"],
+    }
+    compiled, baseline = io.BytesIO(), io.BytesIO()
+    get_template().render_docx(fields, compiled)
+    micro.render_docx_baseline(fields, baseline)
+    # The baseline also typed "1. " into its List Number paragraphs; the template leaves numbering to Word
+    texts = [[re.sub(r"^\d+\. ", "", p.text) for p in docx.Document(stream).paragraphs if p.text]
+             for stream in (compiled, baseline)]
+    assert texts[0] == texts[1]
+
+
+def test_synthetic_vectors_match_unbatched_embedding():
+    from mentor_index import mentor_text
+    from semantic_search import embed_texts
+    expected = embed_texts([mentor_text(m) for m in micro.synthetic_mentors(250)])
+    assert (micro.synthetic_vectors(250, batch=100) == expected).all()
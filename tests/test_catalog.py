@@ -0,0 +1,95 @@
+"""
+Mentor catalog: hot reload (a changed file is picked up, a broken one keeps
+the live version), and the memory-mapped pack (same results as the
+in-memory index, little heap per worker, one build across processes).
+"""
+import os
+import json
+import time
+import multiprocessing
+import pytest
+import catalog_pack
+from catalog import MentorCatalog, load_version, map_version
+from benchmarks.micro import synthetic_mentors, synthetic_queries, bench_catalog
+
+
+def write_catalog(path: str, mentors: list):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(mentors, f)
+    # Distinct mtimes even on coarse filesystem clocks
+    stamp = time.time_ns() + 10 ** 9 * (len(mentors) % 1000)
+    os.utime(path, ns=(stamp, stamp))
+
+
+def wait_for(condition, timeout: float = 10.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.02)
+    return condition()
+
+
+@pytest.fixture
+def catalog_path(tmp_path):
+    path = str(tmp_path / "mentor_knowledge_base.json")
+    write_catalog(path, synthetic_mentors(50))
+    return path
+
+
+def test_changed_catalog_is_picked_up(catalog_path):
+    live = MentorCatalog(catalog_path, watch_interval=0.01, mmap=False)
+    assert len(live.current()) == 50
+    write_catalog(catalog_path, synthetic_mentors(60))
+    assert wait_for(lambda: len(live.current()) == 60)
+
+
+def test_broken_catalog_keeps_the_live_version(catalog_path):
+    live = MentorCatalog(catalog_path, watch_interval=0.01, mmap=False)
+    version = live.current()
+    with open(catalog_path, "w") as f:
+        f.write("[{not json")
+    os.utime(catalog_path, ns=(time.time_ns() + 5 * 10 ** 9,) * 2)
+    assert wait_for(lambda: live.current() is version and live._failed_mtime is not None)
+    assert live.current() is version
+
+
+def test_mapped_pack_matches_the_in_memory_index(tmp_path):
+    path = str(tmp_path / "mentor_knowledge_base.json")
+    write_catalog(path, synthetic_mentors(2000))
+    loaded, mapped = load_version(path), map_version(path)
+    for query, category in synthetic_queries(300):
+        assert list(mapped.index.search_ids(query, category)) == list(loaded.index.search_ids(query, category))
+
+
+def test_mapped_version_holds_little_heap():
+    result = bench_catalog(2000)
+    per_mentor = result["heap_bytes_per_mentor"]
+    assert per_mentor["mapped_version"] * 10 < per_mentor["version"], per_mentor
+
+
+def _ensure_pack_counting_builds(path: str, log_path: str, barrier):
+    build = catalog_pack.build_pack
+
+    def counting_build(*args, **kwargs):
+        with open(log_path, "a") as f:
+            f.write(f"{os.getpid()}\n")
+        return build(*args, **kwargs)
+
+    catalog_pack.build_pack = counting_build
+    barrier.wait()
+    catalog_pack.ensure_pack(path)
+
+
+def test_pack_is_built_once_across_processes(tmp_path):
+    path = str(tmp_path / "mentor_knowledge_base.json")
+    log_path = str(tmp_path / "builds.log")
+    write_catalog(path, synthetic_mentors(5000))
+    context = multiprocessing.get_context("fork")
+    barrier = context.Barrier(6)
+    workers = [context.Process(target=_ensure_pack_counting_builds, args=(path, log_path, barrier)) for _ in range(6)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(60)
+    assert [w.exitcode for w in workers] == [0] * 6
+    with open(log_path) as f:
+        assert len(f.read().split()) == 1
@@ -0,0 +1,33 @@
+"""
+Mentor matching stays index-backed: EXPLAIN the hot-path query against a
+live Neo4j (NEO4J_URI) and fail on any AllNodesScan / NodeByLabelScan.
+Skipped when no server is reachable.
+"""
+import asyncio
+import pytest
+from database import Database
+
+CASES = [
+    ("Growth", ["churn", "retention"]),
+    ("Fundraising", ["seed", "investors"]),
+    ("General", ["pricing"]),
+]
+
+
+async def _scans(category: str, keywords: list):
+    db = Database()
+    try:
+        if not await db.verify_connection():
+            return None
+        await db.ensure_schema()
+        return await db.hot_path_scans(category, keywords)
+    finally:
+        await db.close()
+
+
+@pytest.mark.parametrize("category,keywords", CASES)
+def test_mentor_matching_plan_has_no_full_scans(category, keywords):
+    scans = asyncio.run(_scans(category, keywords))
+    if scans is None:
+        pytest.skip("Neo4j is not reachable")
+    assert scans == []
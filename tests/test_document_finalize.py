@@ -0,0 +1,86 @@
+"""
+Mentor Context Pack finalization: confirming a preview renders exactly
+the previewed revision, once, to a per-session path, with 100 sessions
+finalizing at the same time.
+"""
+import json
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import httpx
+import pytest
+import backend
+import document_jobs
+import document_generator
+import llm_client
+from document_jobs import DocumentJobQueue
+from session_store import MemorySessionStore
+
+SESSIONS = 100
+
+
+async def fake_llm(messages, *args, **kwargs):
+    """A preview with pack fields for the first message, a bare reply for the confirmation."""
+    message = messages[-1]["content"]
+    if "looks good" in message.lower():
+        return json.dumps({"reply": "Great, finalizing.", "category": "Growth", "conversation_state": "reviewing_doc"})
+    return json.dumps({
+        "reply": "Here is your pack.", "category": "Growth", "conversation_state": "reviewing_doc",
+        "ready_for_document": True, "problem_summary": message,
+        "insights": ["Churn is concentrated in month one"], "metrics": {"Churn": "40%"},
+        "questions_for_mentor": ["Which retention levers come first?"]
+    })
+
+
+@pytest.fixture
+def renders(tmp_path, monkeypatch):
+    """Render in threads into tmp_path, counting renders per output file."""
+    counts, lock = {}, threading.Lock()
+    render = document_jobs._render
+
+    def counting_render(doc_data, filename):
+        with lock:
+            counts[filename] = counts.get(filename, 0) + 1
+        return render(doc_data, filename)
+
+    queue = DocumentJobQueue()
+    queue._pool = ThreadPoolExecutor(max_workers=4)
+    monkeypatch.setattr(document_jobs, "_render", counting_render)
+    monkeypatch.setattr(document_generator, "GENERATED_DOCUMENTS_DIR", str(tmp_path))
+    monkeypatch.setattr(backend, "document_jobs", queue)
+    monkeypatch.setattr(backend, "SESSIONS", MemorySessionStore())
+    monkeypatch.setattr(llm_client, "chat_completion", fake_llm)
+    yield counts
+    queue._pool.shutdown(wait=True)
+
+
+async def finalize(client, number: int) -> dict:
+    first = (await client.post("/chat/message", json={
+        "message": f"Founder {number}: our skincare brand loses 40% of customers in month one"
+    })).json()
+    session_id = first["session_id"]
+    previewed = (await client.get(f"/chat/session/{session_id}/document")).json()["revision"]
+    done = (await client.post("/chat/message", json={"session_id": session_id, "message": "Looks good"})).json()
+    again = (await client.post("/chat/message", json={"session_id": session_id, "message": "Looks good"})).json()
+    finalized = (await client.get(f"/chat/session/{session_id}/document")).json()
+    return {"previewed": previewed, "finalized": finalized["revision"],
+            "jobs": {done["document_job_id"], again["document_job_id"]}}
+
+
+async def finalize_all() -> list:
+    transport = httpx.ASGITransport(app=backend.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test", timeout=60) as client:
+        return await asyncio.gather(*(finalize(client, i) for i in range(SESSIONS)))
+
+
+def test_parallel_finalizations_render_each_previewed_revision_once(renders):
+    results = asyncio.run(finalize_all())
+    backend.document_jobs._pool.shutdown(wait=True)
+
+    assert all(r["finalized"] == r["previewed"] for r in results)
+    assert all(len(r["jobs"]) == 1 for r in results)
+    assert len(renders) == SESSIONS
+    assert set(renders.values()) == {1}
+    paths = [backend.document_jobs.status(next(iter(r["jobs"])))["file_path"] for r in results]
+    assert len(set(paths)) == SESSIONS
+    assert all(path for path in paths)
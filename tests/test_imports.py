@@ -0,0 +1,19 @@
+"""
+Cold `import backend` stays fast: measured with `python -X importtime` in
+a fresh interpreter against IMPORT_BUDGET_MS, and the LLM, Neo4j and
+parser SDKs are left to the startup warm-up.
+"""
+import os
+from benchmarks.micro import bench_imports
+
+IMPORT_BUDGET_MS = float(os.getenv("IMPORT_BUDGET_MS", "1500"))
+
+
+def test_backend_import_within_budget():
+    result = bench_imports(IMPORT_BUDGET_MS, runs=2)
+    assert result["backend_import_ms"] <= IMPORT_BUDGET_MS, result["slowest_top_level_ms"]
+
+
+def test_heavy_modules_are_deferred():
+    result = bench_imports(IMPORT_BUDGET_MS, runs=1)
+    assert result["deferred_modules_imported"] == []
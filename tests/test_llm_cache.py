@@ -0,0 +1,85 @@
+"""
+LLM cache: only completions the model finished (finish_reason "stop") are
+stored, on both the plain and the streaming path; cut-off replies go back
+to their callers but are not replayed.
+"""
+import asyncio
+from types import SimpleNamespace
+import pytest
+import llm_client
+from llm_cache import LLMCache
+
+MESSAGES = [{"role": "user", "content": "Summarise the pitch."}]
+
+
+def completion(content: str, finish_reason: str):
+    choice = SimpleNamespace(message=SimpleNamespace(content=content), finish_reason=finish_reason)
+    return SimpleNamespace(choices=[choice], usage=None)
+
+
+class FakeStream:
+    def __init__(self, parts: list, finish_reason: str):
+        chunks = [SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=p), finish_reason=None)])
+                  for p in parts]
+        chunks.append(SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=None),
+                                                               finish_reason=finish_reason)]))
+        self.chunks = iter(chunks)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self.chunks)
+        except StopIteration:
+            raise StopAsyncIteration
+
+    async def close(self):
+        pass
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    """Replies served by the fake NIM, and how many calls reached it."""
+    state = {"calls": 0, "finish_reason": "stop"}
+
+    async def create(params, stream=False, **kwargs):
+        state["calls"] += 1
+        if stream:
+            return FakeStream(["{\"reply\": ", "\"ok\"}"], state["finish_reason"])
+        return completion("{\"reply\": \"ok\"}", state["finish_reason"])
+
+    monkeypatch.setattr(llm_client, "_create", create)
+    monkeypatch.setattr(llm_client, "llm_cache", LLMCache(db_path=""))
+    return state
+
+
+async def stream_text() -> str:
+    return "".join([delta async for delta in llm_client.stream_chat_completion(MESSAGES, 0.2)])
+
+
+@pytest.mark.parametrize("finish_reason, upstream_calls", [("stop", 1), ("length", 2), ("content_filter", 2)])
+def test_only_finished_completions_are_cached(upstream, finish_reason, upstream_calls):
+    upstream["finish_reason"] = finish_reason
+    for _ in range(2):
+        assert asyncio.run(llm_client.chat_completion(MESSAGES, 0.2)) == "{\"reply\": \"ok\"}"
+    assert upstream["calls"] == upstream_calls
+
+
+@pytest.mark.parametrize("finish_reason, upstream_calls", [("stop", 1), ("length", 2)])
+def test_only_finished_streams_are_cached(upstream, finish_reason, upstream_calls):
+    upstream["finish_reason"] = finish_reason
+    for _ in range(2):
+        assert asyncio.run(stream_text()) == "{\"reply\": \"ok\"}"
+    assert upstream["calls"] == upstream_calls
+
+
+def test_cut_off_completion_still_reaches_joined_callers(upstream):
+    upstream["finish_reason"] = "length"
+
+    async def concurrent():
+        return await asyncio.gather(*(llm_client.chat_completion(MESSAGES, 0.2) for _ in range(5)))
+
+    assert asyncio.run(concurrent()) == ["{\"reply\": \"ok\"}"] * 5
+    assert upstream["calls"] == 1
+    assert llm_client.llm_cache.stats()["entries"] == 0
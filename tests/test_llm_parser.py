@@ -0,0 +1,31 @@
+"""
+LLM output parsing: every recorded model output parses, random
+truncations and corruptions never raise, and integer fields reject values
+Python's json accepts but int() can't hold (Infinity, NaN, 1e999).
+"""
+import pytest
+from benchmarks.micro import bench_parser
+from llm_parser import parse_llm_json, DIAGNOSIS_SCHEMA, SCRIBE_SCHEMA
+
+
+def test_recorded_outputs_parse_and_fuzz_never_raises():
+    result = bench_parser(fuzz=3000)
+    assert result["failed"] == []
+    assert result["fuzz_exceptions"] == 0, result["fuzz_examples"]
+
+
+@pytest.mark.parametrize("value", ['"Infinity"', "Infinity", "-Infinity", "NaN", '"nan"', "1e999", "-1e999"])
+def test_non_finite_integers_are_reported_not_raised(value):
+    data, issues = parse_llm_json('{"action_plan":[{"task":"x"}],"clarity_score":' + value + '}', SCRIBE_SCHEMA)
+    assert data["action_plan"] == [{"task": "x"}]
+    assert "clarity_score" not in data
+    assert issues == ["clarity_score: expected an integer"]
+
+
+def test_huge_integers_are_clamped_or_kept():
+    huge = "1" + "0" * 400
+    data, _ = parse_llm_json('{"action_plan":[{"task":"x"}],"clarity_score":' + huge + '}', SCRIBE_SCHEMA)
+    assert data["clarity_score"] == 100
+    data, issues = parse_llm_json('{"reply":"hi","question_count":"' + huge + '"}', DIAGNOSIS_SCHEMA)
+    assert "question_count" not in data
+    assert issues == ["question_count: expected an integer"]
@@ -0,0 +1,58 @@
+"""
+Precomputed mentor cards: same bytes from the in-memory and the mapped
+catalog, valid JSON in responses, nothing rebuilt or mutated per request.
+"""
+import json
+import pytest
+from catalog import load_version, map_version
+from mentor_cards import encode_payload, mentor_reason
+
+MENTORS = [
+    {"id": "m1", "name": "Asha", "bio": "Raised a Series A for a fintech startup in Bengaluru.",
+     "outcomes": "Closed $5M", "link": "https://example.com/asha"},
+    {"id": "m2", "name": "Ravi", "bio": "Scaled a D2C brand with growth marketing.",
+     "outcomes": "10x revenue", "link": "https://example.com/ravi",
+     "reasons": {"growth": "Ravi grew three D2C brands past ₹50Cr."}},
+    {"id": "m3", "name": "Mei", "bio": "Product-market fit coach for SaaS founders.",
+     "outcomes": "Found PMF twice", "link": "https://example.com/mei"},
+]
+
+
+@pytest.fixture
+def catalog_path(tmp_path):
+    path = tmp_path / "mentor_knowledge_base.json"
+    path.write_text(json.dumps(MENTORS))
+    return str(path)
+
+
+@pytest.mark.parametrize("build", [load_version, map_version])
+def test_cards_carry_the_category_reason(catalog_path, build):
+    version = build(catalog_path)
+    cards = [json.loads(bytes(c)) for c in version.match_cards("series a fundraising", "Fundraising")]
+    assert cards[0]["name"] == "Asha"
+    assert cards[0]["why_this_mentor"] == mentor_reason(MENTORS[0], "fundraising")
+    assert set(cards[0]) == {"id", "name", "bio", "outcomes", "link", "why_this_mentor"}
+
+    growth = [json.loads(bytes(c)) for c in version.match_cards("d2c growth", "Growth")]
+    assert growth[0]["why_this_mentor"] == "Ravi grew three D2C brands past ₹50Cr."  # stored at ingest
+
+
+def test_mapped_and_in_memory_cards_match(catalog_path):
+    loaded, mapped = load_version(catalog_path), map_version(catalog_path)
+    for query, category in [("fundraising", "Fundraising"), ("growth", "Growth"), ("saas pmf", "General")]:
+        assert [bytes(c) for c in loaded.match_cards(query, category)] == \
+               [bytes(c) for c in mapped.match_cards(query, category)]
+
+
+def test_payload_splices_cards_unchanged(catalog_path):
+    version = load_version(catalog_path)
+    first = version.match_cards("fundraising", "Fundraising")
+    payload = {"reply": "Done ✅", "cards": first, "conversation_state": "finalized"}
+    body = json.loads(encode_payload(payload))
+    assert body["reply"] == "Done ✅" and body["conversation_state"] == "finalized"
+    assert body["cards"] == [json.loads(bytes(c)) for c in first]
+    # Views of the version's buffer: nothing is rebuilt or mutated per request
+    again = version.match_cards("fundraising", "Fundraising")
+    assert all(isinstance(c, memoryview) and c.readonly for c in again)
+    assert [bytes(c) for c in again] == [bytes(c) for c in first]
+    assert json.loads(encode_payload({"reply": "", "cards": []}))["cards"] == []
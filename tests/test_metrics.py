@@ -0,0 +1,44 @@
+"""
+Instrumentation: every request gets an id and a Server-Timing breakdown,
+stages land in /metrics, and the middleware stays cheap.
+"""
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+import metrics
+from metrics import MetricsMiddleware, stage
+from benchmarks.micro import bench_instrumentation
+
+# Generous: measured ~130 µs per request on a 1-CPU machine
+MIDDLEWARE_OVERHEAD_BUDGET_US = 2000
+
+
+def make_app():
+    app = FastAPI()
+
+    @app.get("/items/{item_id}")
+    def item(item_id: str):
+        with stage("lookup"):
+            pass
+        return {"id": item_id}
+
+    app.add_middleware(MetricsMiddleware)
+    return app
+
+
+def test_request_id_and_server_timing():
+    response = TestClient(make_app()).get("/items/42")
+    assert response.status_code == 200
+    assert len(response.headers["x-request-id"]) == 16
+    assert response.headers["server-timing"].startswith("lookup;dur=")
+
+
+def test_stages_are_exported_by_route_template():
+    TestClient(make_app()).get("/items/7")
+    text = metrics.render()
+    assert 'clarity_stage_seconds_count{route="/items/{item_id}",stage="lookup"}' in text
+    assert 'clarity_http_request_seconds_count{method="GET",route="/items/{item_id}",status="200"}' in text
+
+
+def test_middleware_overhead_within_budget():
+    result = bench_instrumentation(requests=300, log_lines=1000)
+    assert result["middleware_overhead_us"] <= MIDDLEWARE_OVERHEAD_BUDGET_US, result
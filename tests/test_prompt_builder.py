@@ -0,0 +1,42 @@
+"""
+Prompt token counting: tiktoken's o200k_base by default, the local
+estimate when the encoding can't be loaded.
+"""
+import os
+import pytest
+import prompt_builder
+from prompt_builder import count_tokens, tokenizer_name
+
+TEXT = "Our D2C skincare brand is at $30k MRR, but 40% of customers churn in month one."
+
+
+@pytest.fixture
+def tokenizer(monkeypatch):
+    """Set PROMPT_TOKENIZER and reload the encoding."""
+    def use(name: str):
+        monkeypatch.setattr(prompt_builder, "PROMPT_TOKENIZER", name)
+        monkeypatch.setattr(prompt_builder, "_encoding", None)
+    return use
+
+
+def test_default_is_o200k_base():
+    if "PROMPT_TOKENIZER" in os.environ:
+        pytest.skip("PROMPT_TOKENIZER is set in the environment")
+    assert prompt_builder.PROMPT_TOKENIZER == "o200k_base"
+
+
+def test_unloadable_encoding_falls_back_to_the_estimate(tokenizer):
+    tokenizer("no_such_encoding")
+    assert tokenizer_name() == "estimate"
+    assert 15 <= count_tokens(TEXT) <= 40
+
+
+def test_tiktoken_counts_when_available(tokenizer):
+    tiktoken = pytest.importorskip("tiktoken")
+    tokenizer("o200k_base")
+    try:
+        expected = len(tiktoken.get_encoding("o200k_base").encode(TEXT))
+    except Exception:
+        pytest.skip("o200k_base could not be loaded")
+    assert tokenizer_name() == "o200k_base"
+    assert count_tokens(TEXT) == expected
@@ -0,0 +1,39 @@
+"""
+Mentor embeddings are only used with the catalog text and the embedder
+they were built from.
+"""
+import pytest
+import semantic_search
+from semantic_search import SemanticScorer, build_embedding_index, catalog_checksum
+
+MENTORS = [
+    {"id": f"m{i}", "name": f"Mentor {i}", "bio": f"Expert in {topic}.", "outcomes": "Raised Series A"}
+    for i, topic in enumerate(["fundraising", "growth", "pricing", "hiring", "retention", "sales"] * 5)
+]
+
+
+@pytest.fixture
+def catalog_path(tmp_path):
+    path = str(tmp_path / "mentor_knowledge_base.json")
+    build_embedding_index(MENTORS, path)
+    return path
+
+
+def test_checksum_covers_the_embedded_text():
+    edited = [dict(MENTORS[0], bio="Expert in supply chain.")] + MENTORS[1:]
+    assert catalog_checksum(edited) != catalog_checksum(MENTORS)
+
+
+def test_embeddings_load_for_the_same_catalog(catalog_path):
+    assert SemanticScorer.load(MENTORS, catalog_path) is not None
+
+
+def test_edited_mentor_text_makes_embeddings_stale(catalog_path):
+    edited = [dict(MENTORS[0], bio="Expert in supply chain.")] + MENTORS[1:]
+    assert SemanticScorer.load(edited, catalog_path) is None
+
+
+@pytest.mark.parametrize("setting,value", [("EMBEDDING_DIM", 128), ("EMBEDDING_MODEL", "all-MiniLM-L6-v2")])
+def test_another_embedder_is_rejected(catalog_path, monkeypatch, setting, value):
+    monkeypatch.setattr(semantic_search, setting, value)
+    assert SemanticScorer.load(MENTORS, catalog_path) is None
@@ -0,0 +1,100 @@
+"""
+Sessions change only when saved: the memory store hands out copies, and
+a chat turn that is refused or still waiting on the LLM isn't visible to
+other requests. Turns and uploads merge only their own fields, so one
+landing during the other loses nothing.
+"""
+import json
+import pytest
+from fastapi.testclient import TestClient
+import backend
+import llm_client
+from admission import Overloaded
+from extraction_cache import ExtractionCache
+from session_store import MemorySessionStore, SQLiteSessionStore, new_session
+from benchmarks.fake_graph import FakeGraph
+
+REPLY = json.dumps({"reply": "Tell me more.", "category": "Growth", "conversation_state": "gathering_info"})
+
+
+def test_memory_store_returns_copies():
+    store = MemorySessionStore()
+    session = new_session()
+    store.save("s", session)
+    session["history"].append({"role": "user", "content": "after save"})
+
+    loaded = store.get("s")
+    loaded["history"].append({"role": "user", "content": "not saved"})
+    assert store.get("s")["history"] == []
+
+
+@pytest.mark.parametrize("kind", ["memory", "sqlite"])
+def test_update_merges_only_the_given_fields(tmp_path, kind):
+    store = MemorySessionStore() if kind == "memory" else SQLiteSessionStore(str(tmp_path / "sessions.db"))
+    store.save("s", dict(new_session(), history=[{"role": "user", "content": "hi"}], user_message_count=1))
+    merged = store.update("s", {"file_context": "pitch deck"})
+    assert merged["history"] == [{"role": "user", "content": "hi"}]
+    assert store.get("s")["file_context"] == "pitch deck"
+    assert store.get("s")["user_message_count"] == 1
+    assert store.update("missing", {"file_context": "notes"}) == dict(new_session(), file_context="notes")
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(backend, "SESSIONS", MemorySessionStore())
+    return TestClient(backend.app)
+
+
+def test_refused_turn_is_not_stored(client, monkeypatch):
+    async def answer(messages, *args, **kwargs):
+        return REPLY
+    monkeypatch.setattr(llm_client, "chat_completion", answer)
+    session_id = client.post("/chat/message", json={"message": "We sell skincare online"}).json()["session_id"]
+
+    async def refuse(messages, *args, **kwargs):
+        raise Overloaded("queue_full", 2)
+    monkeypatch.setattr(llm_client, "chat_completion", refuse)
+    response = client.post("/chat/message", json={"session_id": session_id, "message": "Churn is 40%"})
+    assert response.status_code == 503
+
+    session = backend.SESSIONS.get(session_id)
+    assert [m["content"] for m in session["history"]] == ["We sell skincare online", "Tell me more."]
+    assert session["user_message_count"] == 1
+
+
+def test_turn_in_flight_is_not_visible(client, monkeypatch):
+    seen = []
+
+    async def answer(messages, *args, **kwargs):
+        stored = backend.SESSIONS.get(session_id) if session_id else None
+        seen.append(None if stored is None else len(stored["history"]))
+        return REPLY
+    monkeypatch.setattr(llm_client, "chat_completion", answer)
+
+    session_id = None
+    session_id = client.post("/chat/message", json={"message": "We sell skincare online"}).json()["session_id"]
+    client.post("/chat/message", json={"session_id": session_id, "message": "Churn is 40%"})
+    assert seen == [None, 2]
+    assert len(backend.SESSIONS.get(session_id)["history"]) == 4
+
+
+def test_upload_during_a_turn_keeps_both(client, monkeypatch, tmp_path):
+    async def answer(messages, *args, **kwargs):
+        if session_id:
+            upload = client.post("/upload", files={"file": ("notes.txt", b"Churn is 40% in month one.")},
+                                 data={"session_id": session_id})
+            assert upload.status_code == 200
+        return REPLY
+    monkeypatch.setattr(llm_client, "chat_completion", answer)
+    monkeypatch.setattr(backend, "extraction_cache", ExtractionCache(str(tmp_path / "cache")))
+    monkeypatch.setattr(backend, "EXTRACTED_FILES_DIR", str(tmp_path))
+    monkeypatch.setattr(backend, "db", FakeGraph(latency=0))
+
+    session_id = None
+    session_id = client.post("/chat/message", json={"message": "We sell skincare online"}).json()["session_id"]
+    client.post("/chat/message", json={"session_id": session_id, "message": "Churn is the problem"})
+
+    session = backend.SESSIONS.get(session_id)
+    assert session["file_context"] == "Churn is 40% in month one."
+    assert len(session["history"]) == 4
+    assert session["user_message_count"] == 2
@@ -0,0 +1,41 @@
+"""
+Structured logging: `extra` keys that clash with LogRecord attributes are
+renamed instead of raising.
+"""
+import io
+import json
+import logging
+import pytest
+from structured_logging import JsonFormatter, get_logger
+
+
+@pytest.fixture
+def captured():
+    stream = io.StringIO()
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(JsonFormatter())
+    logger = logging.getLogger("clarity")
+    logger.addHandler(handler)
+    yield stream
+    logger.removeHandler(handler)
+
+
+def test_reserved_extra_keys_are_prefixed(captured):
+    logger = get_logger("test_structured_logging")
+    logger.warning("Upload failed", extra={"filename": "memo.pdf", "name": "x", "error": "boom"})
+    entry = json.loads(captured.getvalue().splitlines()[-1])
+    assert entry["extra_filename"] == "memo.pdf"
+    assert entry["extra_name"] == "x"
+    assert entry["error"] == "boom"
+    assert entry["logger"] == "clarity.test_structured_logging"
+
+
+def test_exception_logging_keeps_the_traceback(captured):
+    logger = get_logger("test_structured_logging")
+    try:
+        raise ValueError("bad file")
+    except ValueError:
+        logger.exception("Text extraction failed", extra={"upload_filename": "deck.pptx"})
+    entry = json.loads(captured.getvalue().splitlines()[-1])
+    assert entry["upload_filename"] == "deck.pptx"
+    assert "ValueError: bad file" in entry["exception"]
@@ -0,0 +1,105 @@
+"""
+Table profiles: the same summary whether a file is read in one chunk or
+many, every Excel sheet, noisy numbers ("$1,200", "12%") read as numbers,
+and only text with a year or month name read as dates.
+"""
+import pandas as pd
+import pytest
+import table_profile
+from table_profile import profile_csv, profile_excel
+
+ROWS = 1000
+
+
+@pytest.fixture
+def table():
+    return pd.DataFrame({
+        "month": pd.date_range("2024-01-01", periods=ROWS, freq="D").strftime("%Y-%m-%d"),
+        "revenue": [f"${1000 + 10 * i:,}" for i in range(ROWS)],
+        "churn": [f"{5 - (i % 3)}%" for i in range(ROWS)],
+        "plan": ["pro" if i % 4 == 0 else "basic" for i in range(ROWS)],
+        "customer": [f"c{i}" for i in range(ROWS)],
+    })
+
+
+@pytest.fixture
+def csv_path(tmp_path, table):
+    path = tmp_path / "metrics.csv"
+    table.to_csv(path, index=False)
+    return str(path)
+
+
+def test_csv_profile(csv_path):
+    text = profile_csv(csv_path)
+    assert text.startswith("Table: 1,000 rows x 5 columns")
+    assert "- month (date, no missing): 2024-01-01 to 2026-09-26 (999 days)" in text
+    assert "- revenue (number, no missing): min 1,000, max 10,990" in text
+    assert "first 1,000 -> last 10,990 (+999.0%), trend rising" in text
+    assert "- churn (number, no missing): min 3, max 5" in text
+    assert "- plan (text, no missing): 2 distinct; top: basic (75%), pro (25%)" in text
+    assert "- customer (text, no missing): 1,000 distinct; e.g." in text
+    assert "First and last 5 rows:" in text
+    assert "c0" in text and "c999" in text and "c500" not in text
+
+
+def test_chunking_does_not_change_the_profile(csv_path, monkeypatch):
+    whole = profile_csv(csv_path)
+    monkeypatch.setattr(table_profile, "TABLE_CHUNK_ROWS", 64)
+    assert profile_csv(csv_path) == whole
+
+
+def test_row_limit(csv_path, monkeypatch):
+    monkeypatch.setattr(table_profile, "TABLE_CHUNK_ROWS", 64)
+    monkeypatch.setattr(table_profile, "MAX_TABLE_ROWS", 300)
+    text = profile_csv(csv_path)
+    assert text.startswith("Table: 300 rows x 5 columns (stopped at 300 rows)")
+    assert "last 3,990" in text
+
+
+def test_every_excel_sheet(tmp_path, table, monkeypatch):
+    monkeypatch.setattr(table_profile, "TABLE_CHUNK_ROWS", 64)
+    path = tmp_path / "metrics.xlsx"
+    with pd.ExcelWriter(path) as writer:
+        table.to_excel(writer, sheet_name="Revenue", index=False)
+        pd.DataFrame({"region": ["North", "South", None], "mrr": [10, 20, 30]}).to_excel(
+            writer, sheet_name="Regions", index=False)
+    text = profile_excel(str(path))
+    assert 'Sheet "Revenue": 1,000 rows x 5 columns' in text
+    assert "first 1,000 -> last 10,990" in text
+    assert 'Sheet "Regions": 3 rows x 2 columns' in text
+    assert "- region (text, 33% missing): 2 distinct" in text
+    assert "All 3 rows:" in text
+
+
+def test_empty_and_blank_columns(tmp_path):
+    path = tmp_path / "blank.csv"
+    path.write_text("a,b\n1,\n2,\n")
+    text = profile_csv(str(path))
+    assert "- a (number, no missing): min 1, max 2" in text
+    assert "- b: empty" in text
+
+
+@pytest.mark.parametrize("values", [["1-2", "3-4"], ["1/2", "3/4"], ["10 am", "2 pm"], ["0001-01-02", "0002-03-04"]])
+def test_date_like_text_without_a_year_stays_text(values):
+    assert table_profile.ColumnProfile._detect_kind(pd.Series(values)) == "text"
+
+
+@pytest.mark.parametrize("values", [["2024-01-05", "2024-02-01"], ["Jan 2024", "Mar 2024"], ["01/15/2024", "02/20/2024"]])
+def test_dates_with_a_year_or_month_name(values):
+    assert table_profile.ColumnProfile._detect_kind(pd.Series(values)) == "date"
+
+
+def test_semicolon_csv_is_not_read_as_dates(tmp_path):
+    path = tmp_path / "semicolon.csv"
+    path.write_text("a;b\n1;2\n3;4\n")
+    text = profile_csv(str(path))
+    assert "- a;b (text, no missing)" in text
+    assert "0001" not in text
+
+
+def test_header_only_csv(tmp_path):
+    path = tmp_path / "header.csv"
+    path.write_text("a,b\n")
+    text = profile_csv(str(path))
+    assert text.endswith("No rows (header only)")
+    assert "Empty DataFrame" not in text
@@ -0,0 +1,116 @@
+"""
+Upload limits: the size limit is enforced while the request body streams
+in (and from Content-Length before any of it is read), the file is hashed
+as it is written, and Word documents are capped like PDFs and slides.
+"""
+import asyncio
+import hashlib
+import docx
+import pytest
+from fastapi.testclient import TestClient
+from starlette.requests import Request
+import backend
+import file_processor
+from extraction_cache import ExtractionCache
+from benchmarks.fake_graph import FakeGraph
+
+BOUNDARY = "clarityboundary"
+
+
+def multipart_body(content: bytes, filename: str = "notes.txt", session_id: str = None) -> bytes:
+    parts = []
+    if session_id is not None:
+        parts.append(f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="session_id"\r\n\r\n{session_id}\r\n'.encode())
+    parts.append(f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="file"; filename="{filename}"\r\n'
+                 f'Content-Type: application/octet-stream\r\n\r\n'.encode() + content + b"\r\n")
+    return b"".join(parts) + f"--{BOUNDARY}--\r\n".encode()
+
+
+def streamed_request(chunks: list, content_length: int = None) -> tuple:
+    """A Request over the given body chunks, and the list of chunks it has read."""
+    headers = [(b"content-type", f"multipart/form-data; boundary={BOUNDARY}".encode())]
+    if content_length is not None:
+        headers.append((b"content-length", str(content_length).encode()))
+    read = []
+
+    async def receive():
+        if len(read) < len(chunks):
+            read.append(chunks[len(read)])
+            return {"type": "http.request", "body": read[-1], "more_body": len(read) < len(chunks)}
+        return {"type": "http.disconnect"}
+
+    scope = {"type": "http", "method": "POST", "path": "/upload", "headers": headers, "query_string": b""}
+    return Request(scope, receive), read
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setattr(backend, "extraction_cache", ExtractionCache(str(tmp_path / "cache")))
+    monkeypatch.setattr(backend, "EXTRACTED_FILES_DIR", str(tmp_path))
+    monkeypatch.setattr(backend, "db", FakeGraph(latency=0))
+    return TestClient(backend.app)
+
+
+def test_content_length_over_the_limit_is_refused_before_reading():
+    request, read = streamed_request([b"x" * 1024] * 4, content_length=10 * 1024 * 1024)
+    with pytest.raises(file_processor.FileTooLargeError):
+        asyncio.run(file_processor.receive_upload(request, max_bytes=1024 * 1024))
+    assert read == []
+
+
+def test_streamed_body_over_the_limit_stops_reading(tmp_path, monkeypatch):
+    monkeypatch.setattr(file_processor.tempfile, "tempdir", str(tmp_path))
+    body = multipart_body(b"x" * 4 * 1024 * 1024)
+    chunks = [body[i:i + 64 * 1024] for i in range(0, len(body), 64 * 1024)]
+    request, read = streamed_request(chunks)
+    with pytest.raises(file_processor.FileTooLargeError):
+        asyncio.run(file_processor.receive_upload(request, max_bytes=1024 * 1024))
+    assert len(read) < len(chunks) / 2
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_upload_is_hashed_as_it_is_written():
+    content = b"MRR grew to $30k; churn is 40% in the first month.\n" * 5000
+    body = multipart_body(content, filename="Notes.TXT", session_id="new")
+    request, _ = streamed_request([body[i:i + 4096] for i in range(0, len(body), 4096)])
+    path, content_hash, filename, fields = asyncio.run(file_processor.receive_upload(request))
+    try:
+        with open(path, "rb") as f:
+            assert f.read() == content
+        assert path.endswith(".txt")
+        assert content_hash == hashlib.blake2b(content, digest_size=20).hexdigest()
+        assert filename == "Notes.TXT"
+        assert fields == {"session_id": "new"}
+    finally:
+        file_processor.os.unlink(path)
+
+
+def test_upload_over_the_limit_is_a_413(client, monkeypatch):
+    monkeypatch.setattr(file_processor, "MAX_UPLOAD_BYTES", 1024)
+    response = client.post("/upload", files={"file": ("big.txt", b"x" * 4096)})
+    assert response.status_code == 413
+
+
+def test_upload_without_a_file_is_a_400(client):
+    response = client.post("/upload", data={"session_id": "new"})
+    assert response.status_code == 400
+
+
+def test_upload_attaches_to_the_session(client):
+    body = client.post("/upload", files={"file": ("notes.txt", b"Seed round closed.")},
+                       data={"session_id": "new"}).json()
+    assert body["filename"] == "notes.txt"
+    assert backend.SESSIONS.get(body["session_id"])["file_context"] == "Seed round closed."
+
+
+def test_docx_paragraphs_are_capped(tmp_path, monkeypatch):
+    monkeypatch.setattr(file_processor, "MAX_DOCX_PARAGRAPHS", 10)
+    path = tmp_path / "long.docx"
+    document = docx.Document()
+    for i in range(25):
+        document.add_paragraph(f"paragraph {i}")
+    document.save(str(path))
+    text = file_processor.extract_text_from_path(str(path), "long.docx")
+    assert "paragraph 9" in text
+    assert "paragraph 10" not in text
+    assert "[Truncated: first 10 of 25 paragraphs]" in text
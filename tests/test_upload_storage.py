@@ -0,0 +1,78 @@
+"""
+/upload storage: a failed Neo4j write is reported (neo4j_doc_id null) and
+not cached; a stored upload is cached (per extension and extractor
+version) and its JSON is named by content.
+"""
+import pytest
+from fastapi.testclient import TestClient
+import backend
+import file_processor
+from database import Database
+from extraction_cache import ExtractionCache
+from benchmarks.fake_graph import FakeGraph
+
+UPLOAD = ("notes.txt", b"MRR grew to $30k; churn is 40% in the first month.")
+
+
+class UnreachableGraph(Database):
+    async def _run(self, query: str, **params) -> list:
+        raise ConnectionError("Neo4j is down")
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setattr(backend, "extraction_cache", ExtractionCache(str(tmp_path / "cache")))
+    monkeypatch.setattr(backend, "EXTRACTED_FILES_DIR", str(tmp_path))
+    return TestClient(backend.app)
+
+
+def test_failed_neo4j_write_is_reported_and_not_cached(client, monkeypatch):
+    monkeypatch.setattr(backend, "db", UnreachableGraph())
+    body = client.post("/upload", files={"file": UPLOAD}).json()
+    assert body["status"] == "success"
+    assert body["saved_to"]["neo4j_doc_id"] is None
+    assert backend.extraction_cache.get(body["content_hash"]) is None
+
+    monkeypatch.setattr(backend, "db", FakeGraph(latency=0))
+    retried = client.post("/upload", files={"file": UPLOAD}).json()
+    assert not retried["cached"]
+    assert retried["saved_to"]["neo4j_doc_id"] is not None
+
+
+def test_stored_upload_is_cached_under_its_content_hash(client, monkeypatch):
+    monkeypatch.setattr(backend, "db", FakeGraph(latency=0))
+    first = client.post("/upload", files={"file": UPLOAD}).json()
+    assert first["saved_to"]["json_path"].endswith(f"{first['content_hash']}.json")
+
+    other = client.post("/upload", files={"file": ("notes.txt", b"A different file with the same name.")}).json()
+    assert other["saved_to"]["json_path"] != first["saved_to"]["json_path"]
+
+    again = client.post("/upload", files={"file": UPLOAD}).json()
+    assert again["cached"]
+    assert again["saved_to"] == first["saved_to"]
+
+
+def test_same_bytes_with_another_extension_are_parsed_again(client, monkeypatch):
+    monkeypatch.setattr(backend, "db", FakeGraph(latency=0))
+    data = b"month,mrr\n2024-01,1000\n2024-02,1200\n"
+    as_csv = client.post("/upload", files={"file": ("metrics.csv", data)}).json()
+    as_txt = client.post("/upload", files={"file": ("metrics.txt", data)}).json()
+    assert not as_txt["cached"]
+    assert as_txt["content"] == data.decode()
+    assert as_csv["content"] != as_txt["content"]
+
+
+def test_extractor_version_bump_misses_the_cache(client, monkeypatch):
+    monkeypatch.setattr(backend, "db", FakeGraph(latency=0))
+    assert not client.post("/upload", files={"file": UPLOAD}).json()["cached"]
+    monkeypatch.setattr(file_processor, "EXTRACTOR_VERSION", file_processor.EXTRACTOR_VERSION + 1)
+    assert not client.post("/upload", files={"file": UPLOAD}).json()["cached"]
+    assert client.post("/upload", files={"file": UPLOAD}).json()["cached"]
+
+
+def test_expired_extractions_are_parsed_again(tmp_path):
+    cache = ExtractionCache(str(tmp_path), ttl=60)
+    cache.put("key", {"content": "text"})
+    assert cache.get("key") == {"content": "text"}
+    cache.ttl = -1
+    assert cache.get("key") is None
@@ -129,8 +129,8 @@
     const fileNameEl = document.getElementById('file-name');
     const removeFileBtn = document.getElementById('remove-file');
 
-    let history = [];
-    let currentFileContext = null;
+    // Conversation history and file context live server-side under this id
+    let sessionId = null;
 
     const toggleWindow = () => {
         windowEl.style.display = windowEl.style.display === 'flex' ? 'none' : 'flex';
@@ -142,7 +142,6 @@
         div.innerHTML = text;
         msgContainer.appendChild(div);
         msgContainer.scrollTop = msgContainer.scrollHeight;
-        history.push({ role: role, content: text });
     };
 
     const addMentorCard = (mentor) => {
@@ -160,12 +159,32 @@
         msgContainer.scrollTop = msgContainer.scrollHeight;
     };
 
-    const addDocumentSavedBadge = (path) => {
+    // Shows render progress for a background document job, then a download link
+    const addDocumentJobBadge = (jobId) => {
         const div = document.createElement('div');
         div.className = 'doc-saved';
-        div.innerHTML = `✅ Document saved: <strong>${path.split('/').pop()}</strong>`;
+        div.innerHTML = '⏳ Generating your Mentor Context Pack...';
         msgContainer.appendChild(div);
         msgContainer.scrollTop = msgContainer.scrollHeight;
+
+        const poll = async () => {
+            try {
+                const res = await fetch(`${API_URL}/documents/jobs/${jobId}`);
+                const job = await res.json();
+                if (job.status === 'done') {
+                    div.innerHTML = `✅ Document saved: <a href="${API_URL}${job.download_url}" style="color:white;"><strong>${job.file_path.split('/').pop()}</strong></a>`;
+                    return;
+                }
+                if (job.status === 'failed' || !res.ok) {
+                    div.innerHTML = '❌ Document generation failed.';
+                    return;
+                }
+            } catch (err) {
+                console.error(err);
+            }
+            setTimeout(poll, 1000);
+        };
+        poll();
     };
 
     // File Upload Handler
@@ -177,6 +196,7 @@
 
         const formData = new FormData();
         formData.append('file', file);
+        formData.append('session_id', sessionId || 'new');
 
         try {
             const res = await fetch(`${API_URL}/upload`, {
@@ -186,7 +206,7 @@
             const data = await res.json();
 
             if (res.ok && data.status === 'success') {
-                currentFileContext = data.content;
+                sessionId = data.session_id || sessionId;
                 fileNameEl.textContent = file.name;
                 fileBadge.classList.add('active');
                 addMessage(`✅ <b>${file.name}</b> analyzed! I'll use this context in our chat.`, 'assistant');
@@ -200,11 +220,55 @@
     });
 
     removeFileBtn.addEventListener('click', () => {
-        currentFileContext = null;
+        if (sessionId) {
+            fetch(`${API_URL}/chat/session/${sessionId}/file`, { method: 'DELETE' }).catch(console.error);
+        }
         fileBadge.classList.remove('active');
         fileUpload.value = '';
     });
 
+    // Reads the SSE stream from /chat/message/stream.
+    // Calls onToken with reply text as it arrives and resolves with the final payload.
+    const streamChat = async (body, onToken) => {
+        const res = await fetch(`${API_URL}/chat/message/stream`, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json', 'Accept': 'text/event-stream' },
+            body: JSON.stringify(body)
+        });
+        if (!res.ok || !res.body) throw new Error(`Chat failed: ${res.status}`);
+
+        const reader = res.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        let final = null;
+
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) break;
+            buffer += decoder.decode(value, { stream: true });
+
+            let sep;
+            while ((sep = buffer.indexOf('\n\n')) !== -1) {
+                const frame = buffer.slice(0, sep);
+                buffer = buffer.slice(sep + 2);
+
+                let event = 'message';
+                const dataLines = [];
+                frame.split('\n').forEach(line => {
+                    if (line.startsWith('event:')) event = line.slice(6).trim();
+                    else if (line.startsWith('data:')) dataLines.push(line.slice(5).trimStart());
+                });
+                if (!dataLines.length) continue;
+
+                const data = JSON.parse(dataLines.join('\n'));
+                if (event === 'token') onToken(data.text);
+                else if (event === 'done') final = data;
+            }
+        }
+        if (!final) throw new Error('Stream ended without a final event');
+        return final;
+    };
+
     const handleSend = async () => {
         const text = input.value.trim();
         if (!text) return;
@@ -212,22 +276,27 @@
         addMessage(text, 'user');
         input.value = '';
 
+        // Placeholder bubble that fills in as tokens stream in
+        const bubble = document.createElement('div');
+        bubble.className = 'msg msg-assistant';
+        msgContainer.appendChild(bubble);
+
         try {
-            const res = await fetch(`${API_URL}/chat/message`, {
-                method: 'POST',
-                headers: { 'Content-Type': 'application/json' },
-                body: JSON.stringify({
-                    history: history,
-                    file_context: currentFileContext
-                })
+            const data = await streamChat({
+                session_id: sessionId,
+                message: text
+            }, (token) => {
+                bubble.textContent += token;
+                msgContainer.scrollTop = msgContainer.scrollHeight;
             });
-            const data = await res.json();
 
+            bubble.remove();
+            sessionId = data.session_id || sessionId;
             addMessage(data.reply, 'assistant');
 
-            // Show document saved badge
-            if (data.document_saved && data.document_path) {
-                addDocumentSavedBadge(data.document_path);
+            // Show document render progress / download link
+            if (data.document_saved && data.document_job_id) {
+                addDocumentJobBadge(data.document_job_id);
             }
 
             // Show mentor cards with tooltips
@@ -236,6 +305,7 @@
             }
         } catch (err) {
             console.error(err);
+            bubble.remove();
             addMessage("⚠️ ClarityOS is offline. Please check backend.", "assistant");
         }
     };